@@ -0,0 +1,42 @@
+"""order_and_alert_indexes
+
+Revision ID: 2f6b8d1a9c47
+Revises: 9d0a6f4b8c21
+Create Date: 2026-10-17 14:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f6b8d1a9c47'
+down_revision: Union[str, None] = '9d0a6f4b8c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ORDER_TABLES = ('mandi_farmer_orders', 'retailer_mandi_order')
+
+
+def upgrade() -> None:
+    # The order / alert tables are large and written constantly: on Postgres build
+    # the indexes CONCURRENTLY (outside the migration transaction) so writes aren't blocked.
+    with op.get_context().autocommit_block():
+        for table in ORDER_TABLES:
+            op.create_index(
+                f'ix_{table}_order_date_item', table, ['order_date', 'item'], unique=False,
+                postgresql_include=['price_per_kg', 'id'], postgresql_concurrently=True,
+            )
+        op.create_index(
+            'ix_alerts_user_id_created_at', 'alerts', ['user_id', sa.text('created_at DESC')], unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_alerts_user_id_created_at', table_name='alerts', postgresql_concurrently=True)
+        for table in ORDER_TABLES:
+            op.drop_index(f'ix_{table}_order_date_item', table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,36 @@
+"""user_location_gist
+
+Revision ID: 4c2d9e1f7a30
+Revises: ebaba2fc40a7
+Create Date: 2026-10-17 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c2d9e1f7a30'
+down_revision: Union[str, None] = 'ebaba2fc40a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # earthdistance is Postgres-only; other databases use the Python fallback in geo_sql.py
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS cube')
+    op.execute('CREATE EXTENSION IF NOT EXISTS earthdistance')
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_users_location_earth ON users '
+        'USING gist (ll_to_earth(CAST(latitude AS DOUBLE PRECISION), CAST(longitude AS DOUBLE PRECISION))) '
+        'WHERE latitude IS NOT NULL AND longitude IS NOT NULL'
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('DROP INDEX IF EXISTS ix_users_location_earth')
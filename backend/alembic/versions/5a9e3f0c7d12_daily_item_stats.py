@@ -0,0 +1,58 @@
+"""daily_item_stats
+
+Revision ID: 5a9e3f0c7d12
+Revises: e4b7c2f91a08
+Create Date: 2026-10-17 18:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a9e3f0c7d12'
+down_revision: Union[str, None] = 'e4b7c2f91a08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# side -> (order table, owner column); must match rollup.SIDES
+SIDES = {
+    'retailer': ('retailer_mandi_order', 'retailer_id'),
+    'mandi': ('mandi_farmer_orders', 'mandi_owner_id'),
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_item_stats',
+        sa.Column('side', sa.String(length=16), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('item', sa.String(length=100), nullable=False),
+        sa.Column('order_count', sa.Integer(), nullable=False),
+        sa.Column('priced_count', sa.Integer(), nullable=False),
+        sa.Column('price_sum', sa.Numeric(precision=16, scale=2), nullable=False),
+        sa.Column('price_sumsq', sa.Numeric(precision=20, scale=4), nullable=False),
+        sa.Column('price_min', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('price_max', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.PrimaryKeyConstraint('side', 'owner_id', 'day', 'item'),
+    )
+    # Backfill from the order tables: platform-wide rows (owner 0), then per owner
+    for side, (table, owner) in SIDES.items():
+        for owner_expr, owner_where, owner_group in (('0', '', ''), (owner, f'AND {owner} IS NOT NULL', f', {owner}')):
+            op.execute(f'''
+                INSERT INTO daily_item_stats (side, owner_id, day, item, order_count, priced_count,
+                                              price_sum, price_sumsq, price_min, price_max)
+                SELECT '{side}', {owner_expr}, order_date, COALESCE(item, ''), count(*), count(price_per_kg),
+                       COALESCE(sum(price_per_kg), 0), COALESCE(sum(price_per_kg * price_per_kg), 0),
+                       min(price_per_kg), max(price_per_kg)
+                FROM {table}
+                WHERE order_date IS NOT NULL {owner_where}
+                GROUP BY order_date, COALESCE(item, ''){owner_group}
+            ''')
+
+
+def downgrade() -> None:
+    op.drop_table('daily_item_stats')
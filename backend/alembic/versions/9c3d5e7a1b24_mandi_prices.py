@@ -0,0 +1,46 @@
+"""mandi_prices
+
+Revision ID: 9c3d5e7a1b24
+Revises: 5a9e3f0c7d12
+Create Date: 2026-10-17 21:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3d5e7a1b24'
+down_revision: Union[str, None] = '5a9e3f0c7d12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'mandi_prices',
+        sa.Column('crop', sa.String(length=100), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('mandi', sa.String(length=100), nullable=False),
+        sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('source', sa.String(length=16), nullable=False),
+        sa.PrimaryKeyConstraint('crop', 'day', 'mandi'),
+    )
+    # Backfill order prices from the rollup (as price_history.refresh_from_orders);
+    # simulated rows are generated by the server on startup
+    op.execute('''
+        INSERT INTO mandi_prices (crop, day, mandi, price, source)
+        SELECT lower(trim(s.item)), s.day, u.username,
+               round(sum(s.price_sum) / sum(s.priced_count), 2), 'orders'
+        FROM daily_item_stats s
+        JOIN mandi_owners o ON o.id = s.owner_id
+        JOIN users u ON u.id = o.user_id
+        WHERE s.side = 'mandi' AND s.owner_id <> 0 AND s.priced_count > 0 AND s.item <> ''
+        GROUP BY lower(trim(s.item)), s.day, u.username
+    ''')
+
+
+def downgrade() -> None:
+    op.drop_table('mandi_prices')
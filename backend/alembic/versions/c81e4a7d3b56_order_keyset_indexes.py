@@ -0,0 +1,36 @@
+"""order_keyset_indexes
+
+Revision ID: c81e4a7d3b56
+Revises: 2f6b8d1a9c47
+Create Date: 2026-10-17 15:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81e4a7d3b56'
+down_revision: Union[str, None] = '2f6b8d1a9c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ORDER_TABLES = ('mandi_farmer_orders', 'retailer_mandi_order')
+
+
+def upgrade() -> None:
+    # Order lists page on (order_date DESC, id DESC); a backward scan of this index
+    # serves each page directly. CONCURRENTLY so order writes aren't blocked.
+    with op.get_context().autocommit_block():
+        for table in ORDER_TABLES:
+            op.create_index(
+                f'ix_{table}_order_date_id', table, ['order_date', 'id'], unique=False,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in ORDER_TABLES:
+            op.drop_index(f'ix_{table}_order_date_id', table_name=table, postgresql_concurrently=True)
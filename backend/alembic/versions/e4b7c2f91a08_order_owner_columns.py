@@ -0,0 +1,114 @@
+"""order_owner_columns
+
+Revision ID: e4b7c2f91a08
+Revises: c81e4a7d3b56
+Create Date: 2026-10-17 16:30:00.000000
+
+Existing orders are attributed to an owner by destination coordinates.
+Orders the backfill can't attribute keep a NULL owner, and every order
+listing and export is owner-scoped, so they stop appearing in all of them.
+The migration logs how many orders per table were attributed.
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7c2f91a08'
+down_revision: Union[str, None] = 'c81e4a7d3b56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# order table -> (owner column, owner profile table). In both tables the buyer
+# is the destination of the order, so its location is (dest_lat, dest_long).
+OWNERS = {
+    'retailer_mandi_order': ('retailer_id', 'retailer'),
+    'mandi_farmer_orders': ('mandi_owner_id', 'mandi_owners'),
+}
+BATCH_ROWS = 50_000
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+def _backfill(table: str, column: str, owner_table: str) -> None:
+    """
+    Attribute existing orders to the owner registered at the order's
+    destination (coordinates equal to 4 decimals, ~11 m). Locations shared by
+    several owners are ambiguous and left NULL, as are orders with no match.
+    Runs in id batches, each committed on its own, so locks stay short.
+    """
+    update = f'''
+        UPDATE {table} SET {column} = owners.id
+        FROM (
+            SELECT min(p.id) AS id, ROUND(u.latitude, 4) AS lat, ROUND(u.longitude, 4) AS lng
+            FROM {owner_table} p JOIN users u ON u.id = p.user_id
+            WHERE u.latitude IS NOT NULL AND u.longitude IS NOT NULL
+            GROUP BY ROUND(u.latitude, 4), ROUND(u.longitude, 4)
+            HAVING count(*) = 1
+        ) AS owners
+        WHERE {table}.{column} IS NULL
+          AND ROUND({table}.dest_lat, 4) = owners.lat
+          AND ROUND({table}.dest_long, 4) = owners.lng
+    '''
+    if op.get_context().as_sql:  # offline --sql script: one statement, no batching
+        op.execute(update)
+        return
+
+    bind = op.get_bind()
+    lo, hi = bind.execute(sa.text(f'SELECT min(id), max(id) FROM {table}')).one()
+    if lo is None:
+        return
+    batch = sa.text(update + f' AND {table}.id BETWEEN :lo AND :hi')
+    for start in range(lo, hi + 1, BATCH_ROWS):
+        bind.execute(batch, {'lo': start, 'hi': start + BATCH_ROWS - 1})
+
+    attributed = bind.execute(sa.text(f'SELECT count(*) FROM {table} WHERE {column} IS NOT NULL')).scalar()
+    total = bind.execute(sa.text(f'SELECT count(*) FROM {table}')).scalar()
+    logger.info('%s.%s: attributed %d of %d orders; the rest stay NULL and drop out of owner-scoped '
+                'listings and exports', table, column, attributed, total)
+
+
+def upgrade() -> None:
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    for table, (column, owner_table) in OWNERS.items():
+        if postgres:
+            # NOT VALID: no full-table check (and lock) now; validated after the backfill
+            op.add_column(table, sa.Column(column, sa.Integer(), nullable=True))
+            op.execute(
+                f'ALTER TABLE {table} ADD CONSTRAINT fk_{table}_{column} FOREIGN KEY ({column}) '
+                f'REFERENCES {owner_table} (id) ON DELETE CASCADE NOT VALID'
+            )
+        else:
+            op.execute(
+                f'ALTER TABLE {table} ADD COLUMN {column} INTEGER '
+                f'REFERENCES {owner_table} (id) ON DELETE CASCADE'
+            )
+
+    with op.get_context().autocommit_block():
+        for table, (column, owner_table) in OWNERS.items():
+            _backfill(table, column, owner_table)
+            if postgres:
+                op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT fk_{table}_{column}')
+            op.create_index(
+                f'ix_{table}_owner_order_date_id', table, [column, 'order_date', 'id'], unique=False,
+                postgresql_concurrently=True,
+            )
+            # Every order listing is now owner-scoped; the global keyset index has no readers left
+            op.drop_index(f'ix_{table}_order_date_id', table_name=table, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, (column, _) in OWNERS.items():
+            op.create_index(
+                f'ix_{table}_order_date_id', table, ['order_date', 'id'], unique=False,
+                postgresql_concurrently=True,
+            )
+            op.drop_index(f'ix_{table}_owner_order_date_id', table_name=table, postgresql_concurrently=True)
+    for table, (column, _) in OWNERS.items():
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column(column)
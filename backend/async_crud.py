@@ -0,0 +1,131 @@
+"""
+Async CRUD endpoints on AsyncSession — the DB_ASYNC_CRUD counterpart of the
+hand-written sync handlers in farmer/, mandi/ and retailer/routes.py.
+
+Each call to `async_crud_router` builds list / create / get / update / delete
+for one model with the same paths, schemas, status codes, owner scoping and
+keyset pagination as the sync version (`date_column` pages newest-first by
+that date, like the order lists). Auth goes through the async claims-only dependency, so
+a request never waits for a threadpool slot: concurrency is bounded by the
+async connection pool instead.
+
+Usage:
+    async_router.include_router(async_crud_router(
+        path="/crops", model=Crop, create_schema=CropCreate, update_schema=CropUpdate,
+        response_schema=CropResponse, role="farmer", label="Crop", id_name="crop_id",
+        owner_column="farmer_id", owner_id=_farmer_id,
+    ))
+"""
+
+from datetime import date
+from typing import Callable, Optional, Type
+
+from fastapi import APIRouter, Depends, HTTPException, Path, status
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth import Principal, require_role
+from database import get_async_db
+from pagination import Keyset, apaginate
+from schemas import Page
+
+
+def async_crud_router(
+    *,
+    path: str,
+    model,
+    create_schema: Type[BaseModel],
+    update_schema: Type[BaseModel],
+    response_schema: Type[BaseModel],
+    role: str,
+    label: str,
+    id_name: str,
+    owner_column: Optional[str] = None,
+    owner_id: Optional[Callable[[Principal], int]] = None,
+    date_column: Optional[str] = None,
+) -> APIRouter:
+    router = APIRouter()
+    auth = require_role(role, claims_only=True)
+    owner_col = getattr(model, owner_column) if owner_column else None
+    keyset = Keyset(model.id, getattr(model, date_column) if date_column else None)
+
+    def _scoped(stmt, user: Principal):
+        if owner_col is not None:
+            stmt = stmt.where(owner_col == owner_id(user))
+        return stmt
+
+    async def _get_owned(db: AsyncSession, obj_id: int, user: Principal):
+        obj = (await db.scalars(_scoped(select(model).where(model.id == obj_id), user))).first()
+        if obj is None:
+            raise HTTPException(status_code=404, detail=f"{label} not found")
+        return obj
+
+    if date_column is None:
+        @router.get(path, response_model=Page[response_schema])
+        async def list_objects(
+            limit: Optional[int] = None,
+            after_id: Optional[int] = None,
+            current_user: Principal = Depends(auth),
+            db: AsyncSession = Depends(get_async_db),
+        ):
+            return await apaginate(db, _scoped(select(model), current_user), keyset, limit, after_id)
+    else:
+        @router.get(path, response_model=Page[response_schema])
+        async def list_objects_by_date(
+            limit: Optional[int] = None,
+            after_id: Optional[int] = None,
+            after_date: Optional[date] = None,
+            current_user: Principal = Depends(auth),
+            db: AsyncSession = Depends(get_async_db),
+        ):
+            return await apaginate(db, _scoped(select(model), current_user), keyset, limit, after_id, after_date)
+
+    @router.post(path, response_model=response_schema, status_code=status.HTTP_201_CREATED)
+    async def create_object(
+        payload: create_schema,
+        current_user: Principal = Depends(auth),
+        db: AsyncSession = Depends(get_async_db),
+    ):
+        values = payload.model_dump()
+        if owner_column:
+            values[owner_column] = owner_id(current_user)
+        obj = model(**values)
+        db.add(obj)
+        await db.commit()
+        await db.refresh(obj)
+        return obj
+
+    @router.get(f"{path}/{{{id_name}}}", response_model=response_schema)
+    async def get_object(
+        obj_id: int = Path(..., alias=id_name),
+        current_user: Principal = Depends(auth),
+        db: AsyncSession = Depends(get_async_db),
+    ):
+        return await _get_owned(db, obj_id, current_user)
+
+    @router.put(f"{path}/{{{id_name}}}", response_model=response_schema)
+    async def update_object(
+        payload: update_schema,
+        obj_id: int = Path(..., alias=id_name),
+        current_user: Principal = Depends(auth),
+        db: AsyncSession = Depends(get_async_db),
+    ):
+        obj = await _get_owned(db, obj_id, current_user)
+        for key, value in payload.model_dump(exclude_unset=True).items():
+            setattr(obj, key, value)
+        await db.commit()
+        await db.refresh(obj)
+        return obj
+
+    @router.delete(f"{path}/{{{id_name}}}", status_code=status.HTTP_204_NO_CONTENT)
+    async def delete_object(
+        obj_id: int = Path(..., alias=id_name),
+        current_user: Principal = Depends(auth),
+        db: AsyncSession = Depends(get_async_db),
+    ):
+        obj = await _get_owned(db, obj_id, current_user)
+        await db.delete(obj)
+        await db.commit()
+
+    return router
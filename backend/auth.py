@@ -1,17 +1,26 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from decimal import Decimal
+from typing import Dict, Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+import calendar
+import hashlib
+import itertools
 import os
+import secrets
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
 
+from password_pool import pwd_context
+
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production-min-32-chars")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -28,7 +37,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -45,39 +54,364 @@ def verify_token(token: str) -> Optional[dict]:
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, SessionLocal
+from starlette.concurrency import run_in_threadpool
+from cache import TTLCache
+from config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Decode JWT and return the authenticated User row."""
+@dataclass(frozen=True)
+class Principal:
+    """
+    Snapshot of the authenticated user plus their role profile id. Read-only:
+    handlers that change the user row load it from their session and call
+    `invalidate_principal` after committing.
+    """
+    id: int
+    username: str
+    role: str
+    contact: Optional[str]
+    latitude: Optional[Decimal]
+    longitude: Optional[Decimal]
+    profile_id: Optional[int]
+    token_version: int = 0
+
+
+# Per-process; other workers see profile changes once their entry's TTL runs out
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_MAXSIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+# user_id -> generation, part of every principal_cache key. An entry outlives
+# every principal cached before it was set, so once it expires (generation
+# back to 0) no stale principal is left to match; generations come from one
+# counter, so a user's never repeats.
+_principal_generation = TTLCache(maxsize=settings.PRINCIPAL_CACHE_MAXSIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS + 1)
+_generations = itertools.count(1)
+
+
+def invalidate_principal(user_id: int):
+    """Drop every cached principal for `user_id` (all tokens)."""
+    _principal_generation.set(str(user_id), next(_generations))
+
+
+class TokenDenyList:
+    """
+    Revocation state for stateless auth, kept small on purpose:
+      * per user, the lowest token version still accepted (bumped by "log out everywhere")
+      * individual revoked token ids (jti), each dropped once the token would have expired anyway
+
+    Checked in memory on every request. Revocations are also written to
+    token_revocations, and every worker folds new rows in with `sync()` every
+    AUTH_REVOCATION_SYNC_SECONDS, so a logout handled by one worker reaches
+    the others within that interval.
+    """
+
+    # Re-read rows this much older than the last sync, for commit lag and clock skew between workers
+    SYNC_MARGIN = timedelta(seconds=60)
+
+    def __init__(self):
+        self._min_version: Dict[int, int] = {}
+        self._jti: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._synced_at: Optional[datetime] = None
+
+    def _prune_locked(self):
+        now = time.time()
+        for k in [k for k, e in self._jti.items() if e < now]:
+            del self._jti[k]
+
+    def revoke_token(self, jti: str, exp: float):
+        with self._lock:
+            self._jti[jti] = exp
+            self._prune_locked()
+
+    def revoke_user(self, user_id: int, min_version: int):
+        with self._lock:
+            if min_version > self._min_version.get(user_id, 0):
+                self._min_version[user_id] = min_version
+
+    def is_revoked(self, payload: dict) -> bool:
+        if payload.get("jti") in self._jti:
+            return True
+        return payload.get("ver", 0) < self._min_version.get(payload.get("user_id"), 0)
+
+    def sync(self, db: Session):
+        """Apply revocations recorded (by any worker) since the last sync; the first sync reads them all."""
+        from models import TokenRevocation  # local import to avoid circular dependency
+
+        now = datetime.utcnow()
+        query = db.query(
+            TokenRevocation.user_id, TokenRevocation.jti, TokenRevocation.min_version, TokenRevocation.expires_at,
+        ).filter(TokenRevocation.expires_at > now)
+        if self._synced_at is not None:
+            query = query.filter(TokenRevocation.created_at >= self._synced_at - self.SYNC_MARGIN)
+        rows = query.all()
+        with self._lock:
+            for user_id, jti, min_version, expires_at in rows:
+                if jti is not None:
+                    self._jti[jti] = calendar.timegm(expires_at.utctimetuple())
+                elif min_version is not None and min_version > self._min_version.get(user_id, 0):
+                    self._min_version[user_id] = min_version
+            self._prune_locked()
+            self._synced_at = now
+
+    def __len__(self):
+        return len(self._min_version) + len(self._jti)
+
+
+deny_list = TokenDenyList()
+
+
+def load_token_versions(db: Session):
+    """Seed the deny-list with every user whose older tokens were revoked, and recent revocations. Called at startup."""
+    from models import User  # local import to avoid circular dependency
+
+    for user_id, version in db.query(User.id, User.token_version).filter(User.token_version > 0):
+        deny_list.revoke_user(user_id, version)
+    deny_list.sync(db)
+
+
+def _record_revocation(db: Session, user_id: int, expires_at: datetime,
+                       jti: Optional[str] = None, min_version: Optional[int] = None):
+    """Store a revocation for the other workers and drop rows no longer needed. Caller commits."""
+    from models import TokenRevocation  # local import to avoid circular dependency
+
+    now = datetime.utcnow()
+    db.query(TokenRevocation).filter(TokenRevocation.expires_at < now).delete(synchronize_session=False)
+    db.add(TokenRevocation(user_id=user_id, jti=jti, min_version=min_version, created_at=now, expires_at=expires_at))
+
+
+def revoke_access_token(payload: dict, db: Session):
+    """Revoke one access token (verified claims with a jti) in every worker."""
+    _record_revocation(db, payload["user_id"], datetime.utcfromtimestamp(payload["exp"]), jti=payload["jti"])
+    db.commit()
+    deny_list.revoke_token(payload["jti"], payload["exp"])
+
+
+def revoke_user_tokens(user_id: int, db: Session):
+    """Invalidate every token issued to `user_id` so far."""
     from models import User  # local import to avoid circular dependency
 
+    user = db.query(User).filter(User.id == user_id).first()
+    user.token_version = (user.token_version or 0) + 1
+    revoke_refresh_tokens(db, user_id=user_id)
+    # Tokens below the new version are all expired after one access-token lifetime
+    _record_revocation(
+        db, user_id, datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+        min_version=user.token_version,
+    )
+    db.commit()
+    deny_list.revoke_user(user_id, user.token_version)
+    invalidate_principal(user_id)
+
+
+# ── Refresh tokens ──────────────────────────────────────────────────────────
+# Opaque random strings; only their sha256 is stored. Each refresh rotates the
+# token, and presenting an already-rotated token revokes its whole family.
+
+def _hash_refresh_token(raw: str) -> str:
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def issue_refresh_token(user_id: int, db: Session, family_id: Optional[str] = None) -> str:
+    """Create a refresh token (new family unless `family_id` given). Caller commits."""
+    from models import RefreshToken  # local import to avoid circular dependency
+
+    raw = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        family_id=family_id or uuid.uuid4().hex,
+        token_hash=_hash_refresh_token(raw),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return raw
+
+
+def revoke_refresh_tokens(db: Session, user_id: Optional[int] = None, family_id: Optional[str] = None):
+    """Revoke every live refresh token of a user or a family. Caller commits."""
+    from models import RefreshToken  # local import to avoid circular dependency
+
+    query = db.query(RefreshToken).filter(RefreshToken.revoked_at.is_(None))
+    if user_id is not None:
+        query = query.filter(RefreshToken.user_id == user_id)
+    if family_id is not None:
+        query = query.filter(RefreshToken.family_id == family_id)
+    query.update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+
+
+def revoke_refresh_token(raw: str, user_id: int, db: Session):
+    """Revoke the session family of a refresh token held by `user_id` (logout). Caller commits."""
+    from models import RefreshToken  # local import to avoid circular dependency
+
+    family_id = (
+        db.query(RefreshToken.family_id)
+        .filter(RefreshToken.token_hash == _hash_refresh_token(raw), RefreshToken.user_id == user_id)
+        .scalar()
+    )
+    if family_id is not None:
+        revoke_refresh_tokens(db, family_id=family_id)
+
+
+def rotate_refresh_token(raw: str, db: Session):
+    """Exchange a refresh token for (user, new refresh token), or raise 401."""
+    from models import RefreshToken  # local import to avoid circular dependency
+
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    token = db.query(RefreshToken).filter(RefreshToken.token_hash == _hash_refresh_token(raw)).first()
+    if token is None:
+        raise invalid
+    if token.expires_at < datetime.utcnow():
+        raise invalid
+
+    # Conditional update so two concurrent refreshes can't both rotate the same token
+    claimed = (
+        db.query(RefreshToken)
+        .filter(RefreshToken.id == token.id, RefreshToken.revoked_at.is_(None))
+        .update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+    )
+    if not claimed:
+        # Already rotated: the token leaked or was replayed — kill the whole session family
+        revoke_refresh_tokens(db, family_id=token.family_id)
+        db.commit()
+        raise invalid
+
+    new_raw = issue_refresh_token(token.user_id, db, family_id=token.family_id)
+    db.commit()
+    return token.user, new_raw
+
+
+def access_token_claims(user, db: Session) -> dict:
+    """JWT claims for `user`, including the role profile id and token version."""
+    from models import Farmer, MandiOwner, Retailer  # local import to avoid circular dependency
+
+    profile_model = {"farmer": Farmer, "mandi_owner": MandiOwner, "retailer": Retailer}.get(user.role)
+    profile_id = None
+    if profile_model is not None:
+        profile_id = db.query(profile_model.id).filter(profile_model.user_id == user.id).scalar()
+    return {
+        "sub": user.username,
+        "user_id": user.id,
+        "role": user.role,
+        "profile_id": profile_id,
+        "ver": user.token_version or 0,
+    }
+
+
+def _load_principal(user_id: int, db: Session) -> Optional[Principal]:
+    """User row and role profile id in one round-trip."""
+    from models import User, Farmer, MandiOwner, Retailer  # local import to avoid circular dependency
+
+    row = (
+        db.query(User, Farmer.id, MandiOwner.id, Retailer.id)
+        .outerjoin(Farmer, Farmer.user_id == User.id)
+        .outerjoin(MandiOwner, MandiOwner.user_id == User.id)
+        .outerjoin(Retailer, Retailer.user_id == User.id)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if row is None:
+        return None
+    user, farmer_id, mandi_owner_id, retailer_id = row
+    profile_id = {"farmer": farmer_id, "mandi_owner": mandi_owner_id, "retailer": retailer_id}.get(user.role)
+    return Principal(
+        id=user.id,
+        username=user.username,
+        role=user.role,
+        contact=user.contact,
+        latitude=user.latitude,
+        longitude=user.longitude,
+        profile_id=profile_id,
+        token_version=user.token_version or 0,
+    )
+
+
+def _verified_claims(token: str) -> dict:
     payload = verify_token(token)
-    if payload is None:
+    if payload is None or deny_list.is_revoked(payload):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user_id: int = payload.get("user_id")
-    if user_id is None:
+    if payload.get("user_id") is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+    return payload
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
 
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    """Decode JWT and return the authenticated principal (cached for a short TTL)."""
+    payload = _verified_claims(token)
+    user_id: int = payload["user_id"]
 
-def require_role(*roles: str):
-    """Factory that returns a dependency ensuring the user has one of the given roles."""
-    def role_checker(current_user=Depends(get_current_user)):
+    key = f"{user_id}:{_principal_generation.get(str(user_id)) or 0}:{token}"
+    principal = principal_cache.get(key)
+    if principal is None:
+        principal = _load_principal(user_id, db)
+        if principal is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        principal_cache.set(key, principal)
+    if payload.get("ver", 0) < principal.token_version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+    return principal
+
+
+def _current_user_with_own_session(token: str) -> Principal:
+    db = SessionLocal()
+    try:
+        return get_current_user(token, db)
+    finally:
+        db.close()
+
+
+async def get_token_principal(token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Stateless fast path: trust the verified claims and never touch the DB.
+    Only id / username / role / profile_id are populated. Falls back to
+    `get_current_user` when disabled or for tokens issued without a profile id.
+
+    Async with no DB dependency, so async handlers using it never hop onto the
+    request threadpool unless that fallback is taken.
+    """
+    if not settings.AUTH_STATELESS:
+        return await run_in_threadpool(_current_user_with_own_session, token)
+    payload = _verified_claims(token)
+    if "profile_id" not in payload:
+        return await run_in_threadpool(_current_user_with_own_session, token)
+    return Principal(
+        id=payload["user_id"],
+        username=payload.get("sub"),
+        role=payload.get("role"),
+        contact=None,
+        latitude=None,
+        longitude=None,
+        profile_id=payload["profile_id"],
+        token_version=payload.get("ver", 0),
+    )
+
+
+def require_role(*roles: str, claims_only: bool = False):
+    """
+    Factory that returns a dependency ensuring the user has one of the given roles.
+    `claims_only=True` is for handlers that need nothing beyond the user/profile ids:
+    they get the stateless principal when AUTH_STATELESS is on.
+    """
+    def check(current_user):
         if current_user.role not in roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Role '{current_user.role}' is not allowed. Required: {', '.join(roles)}",
             )
         return current_user
-    return role_checker
\ No newline at end of file
+
+    if claims_only:
+        async def claims_role_checker(current_user=Depends(get_token_principal)):
+            return check(current_user)
+        return claims_role_checker
+
+    def role_checker(current_user=Depends(get_current_user)):
+        return check(current_user)
+    return role_checker
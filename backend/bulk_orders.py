@@ -0,0 +1,306 @@
+"""
+Bulk order ingestion — POST /api/{mandi,retailer}/orders/bulk.
+
+Mandis upload a day's arrivals in one request instead of one POST /orders
+per order. The body is one of (by Content-Type):
+
+  * application/json                          — a JSON array of order objects
+  * application/x-ndjson (ndjson, jsonl)      — one order object per line
+  * text/csv                                  — header row of field names, then one order per row
+
+Fields are those of the single-order create schema; unknown fields / columns
+are ignored and empty CSV cells are null. Every order is owned by the caller.
+
+The body is spooled to a temp file (memory up to BULK_SPOOL_MEMORY_BYTES)
+and read back as a stream; NDJSON and CSV are parsed record by record, a
+JSON array is parsed whole. Records are validated and inserted in chunks of
+BULK_CHUNK_ROWS, each its own transaction:
+
+  * Postgres — `COPY ... FROM STDIN` (psycopg2 or psycopg 3)
+  * anything else — one executemany INSERT
+
+A record that fails validation (or wouldn't fit its column) is reported and
+skipped; the rest of the batch still goes in. If the database rejects a
+chunk anyway, it is split in halves and retried down to the offending rows.
+daily_item_stats is updated in the same transaction as each chunk.
+
+Response: {inserted, failed, errors: [{row, error}], errors_truncated};
+`row` is the 1-based record number (CSV: not counting the header, NDJSON:
+not counting blank lines). At most BULK_MAX_ERRORS errors are listed.
+
+A body that stops decoding (bad UTF-8, broken CSV quoting) is a 400 only
+while nothing has been committed. After that, the records read so far go
+in and the rest of the body is one "Unreadable body" error at the record
+where reading stopped.
+
+Usage:
+    router.include_router(bulk_orders_router(
+        model=MandiFarmerOrder, create_schema=MandiFarmerOrderCreate, role="mandi_owner",
+        owner_column="mandi_owner_id", owner_id=_mandi_owner_id,
+    ))
+"""
+
+import csv
+import io
+import json
+import math
+from datetime import date, datetime
+from tempfile import SpooledTemporaryFile
+from typing import Callable, Iterator, Tuple, Type
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Date, Numeric, insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import rollup
+from auth import Principal, require_role
+from config import settings
+from database import get_db, mark_wrote
+from schemas import BulkOrderResult
+
+FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+
+# ── Reading the body ────────────────────────────────────────────────────────
+
+def body_format(request: Request) -> str:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type must be one of: {', '.join(FORMATS)}",
+        )
+    return FORMATS[content_type]
+
+
+async def spool_body(request: Request) -> SpooledTemporaryFile:
+    """Copy the request body to a temp file (in memory while small), rewound."""
+    body = SpooledTemporaryFile(max_size=settings.BULK_SPOOL_MEMORY_BYTES)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > settings.BULK_MAX_BYTES:
+            body.close()
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Body larger than {settings.BULK_MAX_BYTES} bytes; split the upload",
+            )
+        body.write(chunk)
+    body.seek(0)
+    return body
+
+
+class UnreadableBody(ValueError):
+    """The body stops decoding / parsing as a whole (not one bad record)."""
+
+
+def _records(fmt: str, body) -> Iterator[Tuple[int, object]]:
+    """
+    (record number, parsed record or the parse error) for each record in the
+    body. If the body becomes unreadable, the last pair is (next record
+    number, UnreadableBody).
+    """
+    text = io.TextIOWrapper(body, encoding="utf-8-sig", newline="")
+    row = 0
+    try:
+        if fmt == "json":
+            try:
+                records = json.load(text)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+            if not isinstance(records, list):
+                raise HTTPException(status_code=400, detail="JSON body must be an array of orders")
+            yield from enumerate(records, 1)
+        elif fmt == "ndjson":
+            for line in text:
+                if not line.strip():
+                    continue
+                row += 1
+                try:
+                    yield row, json.loads(line)
+                except ValueError as e:
+                    yield row, ValueError(f"invalid JSON: {e}")
+        else:
+            for row, record in enumerate(csv.DictReader(text), 1):
+                record.pop(None, None)  # cells beyond the header
+                yield row, {k: (v if v != "" else None) for k, v in record.items()}
+    except (UnicodeDecodeError, csv.Error) as e:
+        yield row + 1, UnreadableBody(f"Unreadable body: {e}")
+    finally:
+        text.detach()
+
+
+# ── Validation ──────────────────────────────────────────────────────────────
+
+def _column_rules(model):
+    """Per-column checks the schema doesn't make: numeric precision, dates."""
+    limits, dates = {}, set()
+    for column in model.__table__.columns:
+        if isinstance(column.type, Numeric) and column.type.precision is not None:
+            limits[column.key] = 10 ** (column.type.precision - (column.type.scale or 0))
+        elif isinstance(column.type, Date):
+            dates.add(column.key)
+    return limits, dates
+
+
+def _validate(record, schema: Type[BaseModel], limits: dict, dates: set) -> dict:
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("expected an object")
+    values = schema.model_validate(record).model_dump()
+    for key, limit in limits.items():
+        value = values.get(key)
+        if value is not None and not (math.isfinite(value) and abs(value) < limit):
+            raise ValueError(f"{key}: out of range")
+    for key in dates:
+        if isinstance(values.get(key), datetime):
+            values[key] = values[key].date()
+    return values
+
+
+def _describe(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" if e["loc"] else e["msg"]
+            for e in error.errors()
+        )
+    return str(getattr(error, "orig", None) or error).strip().splitlines()[0]
+
+
+# ── Writing ─────────────────────────────────────────────────────────────────
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        return (value.replace("\\", "\\\\").replace("\t", "\\t")
+                .replace("\n", "\\n").replace("\r", "\\r"))
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _copy_rows(db: Session, model, columns, rows):
+    """COPY rows into the model's table (text format) on the session's connection."""
+    buf = io.StringIO()
+    for values in rows:
+        buf.write("\t".join(_copy_value(values[c]) for c in columns))
+        buf.write("\n")
+    sql = f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN"
+    cursor = db.connection().connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            buf.seek(0)
+            cursor.copy_expert(sql, buf)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buf.getvalue())
+    finally:
+        cursor.close()
+    mark_wrote(db)
+
+
+def _insert_rows(db: Session, model, columns, rows):
+    db.execute(insert(model.__table__), rows)
+
+
+class _Ingest:
+    def __init__(self, db: Session, model, columns):
+        self.db, self.model, self.columns = db, model, columns
+        self.side = rollup.SIDE_OF[model]
+        self.write = _copy_rows if db.get_bind().dialect.name == "postgresql" else _insert_rows
+        self.db_errors = (DBAPIError, db.get_bind().dialect.loaded_dbapi.Error)
+        self.result = {"inserted": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+    def fail(self, row: int, error: Exception):
+        self.result["failed"] += 1
+        if len(self.result["errors"]) < settings.BULK_MAX_ERRORS:
+            self.result["errors"].append({"row": row, "error": _describe(error)})
+        else:
+            self.result["errors_truncated"] = True
+
+    def flush(self, chunk):
+        """Insert [(row, values)] in one transaction; on rejection, bisect to the bad rows."""
+        rows = [values for _, values in chunk]
+        try:
+            self.write(self.db, self.model, self.columns, rows)
+            rollup.add_orders(self.db.connection(), self.side, rows)
+            self.db.commit()
+        except self.db_errors as e:
+            self.db.rollback()
+            if len(chunk) == 1:
+                self.fail(chunk[0][0], e)
+                return
+            half = len(chunk) // 2
+            self.flush(chunk[:half])
+            self.flush(chunk[half:])
+            return
+        self.result["inserted"] += len(rows)
+
+
+def ingest_orders(db: Session, body, fmt: str, model, create_schema: Type[BaseModel],
+                  owner_column: str, owner_id: int) -> dict:
+    """Validate and insert every record of `body`; returns the BulkOrderResult dict."""
+    columns = [owner_column, *create_schema.model_fields]
+    limits, dates = _column_rules(model)
+    ingest = _Ingest(db, model, columns)
+    chunk = []
+    for row, record in _records(fmt, body):
+        if isinstance(record, UnreadableBody):
+            if not ingest.result["inserted"]:
+                raise HTTPException(status_code=400, detail=str(record))
+            # Earlier chunks are committed: a 400 would invite a retry that
+            # duplicates them, so report the rest of the body as a failed row
+            ingest.fail(row, record)
+            break
+        try:
+            values = _validate(record, create_schema, limits, dates)
+        except (ValueError, TypeError) as e:  # pydantic's ValidationError is a ValueError
+            ingest.fail(row, e)
+            continue
+        values[owner_column] = owner_id
+        chunk.append((row, values))
+        if len(chunk) >= settings.BULK_CHUNK_ROWS:
+            ingest.flush(chunk)
+            chunk = []
+    if chunk:
+        ingest.flush(chunk)
+    return ingest.result
+
+
+def bulk_orders_router(
+    *,
+    model,
+    create_schema: Type[BaseModel],
+    role: str,
+    owner_column: str,
+    owner_id: Callable[[Principal], int],
+) -> APIRouter:
+    router = APIRouter()
+
+    @router.post("/orders/bulk", response_model=BulkOrderResult)
+    async def bulk_create_orders(
+        request: Request,
+        current_user: Principal = Depends(require_role(role, claims_only=True)),
+        db: Session = Depends(get_db),
+    ):
+        """Create many orders from a JSON array, NDJSON or CSV body; bad rows are reported, not fatal."""
+        fmt = body_format(request)
+        owner = owner_id(current_user)
+        body = await spool_body(request)
+        try:
+            return await run_in_threadpool(ingest_orders, db, body, fmt, model, create_schema, owner_column, owner)
+        finally:
+            body.close()
+
+    return router
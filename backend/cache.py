@@ -0,0 +1,250 @@
+"""
+Small caching toolkit for outbound lookups.
+
+  * `TTLCache`      — in-process, size-bounded LRU with a per-entry TTL.
+  * `RedisBackend`  — optional shared tier so several uvicorn workers can reuse
+                      each other's entries (needs the `redis` package).
+  * `SQLiteBackend` — on-disk tier that survives restarts and is shared by
+                      workers on the same host.
+  * `Cache`         — what callers use: local LRU first, then the shared tier,
+                      with hit/miss counters for the stats endpoint.
+
+Usage:
+    from cache import Cache
+    weather_cache = Cache("weather", maxsize=2048, ttl=900)
+    hit = await weather_cache.get(key)
+    if hit is None:
+        hit = await fetch()
+        await weather_cache.set(key, hit)
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger("cache")
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisBackend:
+    """Shared cache tier in Redis. Values are stored as JSON with a TTL."""
+
+    def __init__(self, url: str, prefix: str):
+        self.prefix = prefix
+        self._client = aioredis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self._client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    async def delete(self, key: str):
+        await self._client.delete(self.prefix + key)
+
+
+class SQLiteBackend:
+    """
+    On-disk cache tier. Values are stored as JSON; the table is trimmed to
+    `maxsize` rows by least-recent access. Blocking sqlite calls run in a
+    worker thread so the event loop is never held up.
+    """
+
+    def __init__(self, path: str, maxsize: int):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=1.0)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_last_access ON cache (last_access)")
+            self._conn.commit()
+
+    def _get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Any, ttl: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now),
+            )
+            self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY last_access "
+                "LIMIT MAX(0, (SELECT COUNT(*) FROM cache) - ?))",
+                (self.maxsize,),
+            )
+            self._conn.commit()
+
+    def _delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._delete, key)
+
+
+def shared_backend_for(name: str) -> Optional[RedisBackend]:
+    """Build the shared tier configured in settings, or None for local-only caching."""
+    if not settings.CACHE_REDIS_URL:
+        return None
+    if aioredis is None:
+        logger.warning("CACHE_REDIS_URL is set but the `redis` package is not installed — using local cache only")
+        return None
+    return RedisBackend(settings.CACHE_REDIS_URL, prefix=f"supply1:{name}:")
+
+
+# name → Cache, so the stats endpoint can report on every cache in the process
+CACHES: Dict[str, "Cache"] = {}
+
+
+class Cache:
+    """Local LRU in front of an optional shared backend, with hit/miss counters."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float, shared=None):
+        self.name = name
+        self.ttl = ttl
+        self.local = TTLCache(maxsize, ttl)
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared_errors = 0
+        CACHES[name] = self
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.shared is not None:
+            try:
+                value = await self.shared.get(key)
+            except Exception as e:
+                # The shared tier is an optimisation — never fail a request over it
+                self.shared_errors += 1
+                logger.warning(f"Shared cache '{self.name}' get failed: {e}")
+            if value is not None:
+                self.shared_hits += 1
+                self.local.set(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, value, self.ttl)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Shared cache '{self.name}' set failed: {e}")
+
+    async def delete(self, key: str):
+        self.local.delete(key)
+        if self.shared is not None:
+            try:
+                await self.shared.delete(key)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning(f"Shared cache '{self.name}' delete failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "size": len(self.local),
+            "maxsize": self.local.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.shared_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.local.evictions,
+            "shared_backend": type(self.shared).__name__ if self.shared is not None else None,
+            "shared_errors": self.shared_errors,
+        }
+
+
+def cache_stats() -> dict:
+    return {name: c.stats() for name, c in CACHES.items()}
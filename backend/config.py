@@ -15,11 +15,58 @@ load_dotenv()
 class Settings:
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    DB_SSLMODE: str = os.getenv("DB_SSLMODE", "require")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))  # 0 = no limit
+    # Read replica for list / analytics reads; unset = everything on DATABASE_URL
+    DATABASE_REPLICA_URL: str = os.getenv("DATABASE_REPLICA_URL", "")
+    # A user's reads stay on the primary this long after they commit a write
+    DB_READ_YOUR_WRITES_SECONDS: float = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+    # After a failed replica connect, reads go to the primary this long before retrying
+    DB_REPLICA_RETRY_SECONDS: float = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+    # Async CRUD path (AsyncEngine) — asyncpg | psycopg
+    DB_ASYNC_CRUD: bool = os.getenv("DB_ASYNC_CRUD", "false").lower() in ("1", "true", "yes")
+    DB_ASYNC_DRIVER: str = os.getenv("DB_ASYNC_DRIVER", "asyncpg")
+    DB_ASYNC_POOL_SIZE: int = int(os.getenv("DB_ASYNC_POOL_SIZE", "20"))
+    # DATABASE_URL points at a PgBouncer-style pooler (transaction pooling): no client-side pool
+    DB_PGBOUNCER: bool = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+    # List endpoints (keyset pagination): page size when `limit` is omitted, and the cap
+    PAGE_SIZE_DEFAULT: int = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+    PAGE_SIZE_MAX: int = int(os.getenv("PAGE_SIZE_MAX", "200"))
+    # POST /orders/bulk: rows per validated insert (COPY on Postgres), body cap, errors listed
+    BULK_CHUNK_ROWS: int = int(os.getenv("BULK_CHUNK_ROWS", "5000"))
+    BULK_MAX_BYTES: int = int(os.getenv("BULK_MAX_BYTES", str(256 * 1024 * 1024)))
+    BULK_SPOOL_MEMORY_BYTES: int = int(os.getenv("BULK_SPOOL_MEMORY_BYTES", str(8 * 1024 * 1024)))
+    BULK_MAX_ERRORS: int = int(os.getenv("BULK_MAX_ERRORS", "1000"))
+    # GET .../export: rows fetched from the server-side cursor and written per batch
+    EXPORT_BATCH_ROWS: int = int(os.getenv("EXPORT_BATCH_ROWS", "5000"))
+    # daily_item_stats: the nightly reconcile rebuilds this many recent days (0 = all history)
+    ROLLUP_RECONCILE_DAYS: int = int(os.getenv("ROLLUP_RECONCILE_DAYS", "60"))
+    # mandi_prices: days of simulated history a new (crop, mock mandi) series starts with,
+    # days of order-sourced prices the hourly refresh rebuilds, mandis per price-history response
+    PRICE_HISTORY_SEED_DAYS: int = int(os.getenv("PRICE_HISTORY_SEED_DAYS", "400"))
+    PRICE_HISTORY_REFRESH_DAYS: int = int(os.getenv("PRICE_HISTORY_REFRESH_DAYS", "2"))
+    PRICE_HISTORY_MANDIS: int = int(os.getenv("PRICE_HISTORY_MANDIS", "5"))
 
     # Auth
     SECRET_KEY: str = os.getenv("secret_key", "changeme")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # Authenticated principals are cached briefly to skip the per-request user lookup
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+    PRINCIPAL_CACHE_MAXSIZE: int = int(os.getenv("PRINCIPAL_CACHE_MAXSIZE", "10000"))
+    # Trust verified JWT claims on CRUD endpoints without a DB lookup (revocation via in-memory deny-list)
+    AUTH_STATELESS: bool = os.getenv("AUTH_STATELESS", "true").lower() in ("1", "true", "yes")
+    # How often each worker pulls logouts made on other workers into its deny-list
+    AUTH_REVOCATION_SYNC_SECONDS: float = float(os.getenv("AUTH_REVOCATION_SYNC_SECONDS", "2"))
+    # bcrypt runs in its own bounded pool: thread | process | inline (shared request threadpool)
+    PASSWORD_POOL_KIND: str = os.getenv("PASSWORD_POOL_KIND", "thread")
+    PASSWORD_POOL_WORKERS: int = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_POOL_MAX_QUEUE: int = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "256"))
 
     # Twilio
     TWILIO_ACCOUNT_SID: str = os.getenv("TWILIO_ACCOUNT_SID", "")
@@ -31,5 +78,34 @@ class Settings:
     GROQ_API_KEY: str = os.getenv("GROQ", "")
     TAVILY_API_KEY: str = os.getenv("TAVILY_API_KEY", "") or os.getenv("TAVILY", "")
 
+    # Outbound HTTP (shared pooled clients for Groq / Tavily)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+    GROQ_TIMEOUT_SECONDS: float = float(os.getenv("GROQ_TIMEOUT_SECONDS", "30"))
+    TAVILY_TIMEOUT_SECONDS: float = float(os.getenv("TAVILY_TIMEOUT_SECONDS", "15"))
+
+    # Caching — optional Redis tier shared between uvicorn workers
+    CACHE_REDIS_URL: str = os.getenv("CACHE_REDIS_URL", "")
+    WEATHER_CACHE_TTL_SECONDS: float = float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "900"))
+    WEATHER_CACHE_MAXSIZE: int = int(os.getenv("WEATHER_CACHE_MAXSIZE", "2048"))
+    WEATHER_CACHE_CELL_DEG: float = float(os.getenv("WEATHER_CACHE_CELL_DEG", "0.1"))  # ~11 km
+    LLM_CACHE_BACKEND: str = os.getenv("LLM_CACHE_BACKEND", "memory")  # memory | sqlite | off
+    LLM_CACHE_SQLITE_PATH: str = os.getenv("LLM_CACHE_SQLITE_PATH", "llm_cache.sqlite3")
+    LLM_CACHE_TTL_SECONDS: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", "21600"))
+    LLM_CACHE_MAXSIZE: int = int(os.getenv("LLM_CACHE_MAXSIZE", "1000"))
+
+    # Spatial index over mandi / retailer locations
+    GEO_INDEX_CELL_DEG: float = float(os.getenv("GEO_INDEX_CELL_DEG", "0.25"))  # ~28 km
+    # SQL location queries: auto (earthdistance on Postgres) | earthdistance | python
+    GEO_SQL_BACKEND: str = os.getenv("GEO_SQL_BACKEND", "auto")
+
+    # Farmer /voice — local intent parser answers when at least this confident
+    INTENT_LOCAL_MIN_CONFIDENCE: float = float(os.getenv("INTENT_LOCAL_MIN_CONFIDENCE", "0.8"))
+
+    # Farmer /analyze — one overall deadline for weather + market + AI fan-out
+    ANALYZE_DEADLINE_SECONDS: float = float(os.getenv("ANALYZE_DEADLINE_SECONDS", "20"))
+
 
 settings = Settings()
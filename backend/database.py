@@ -1,24 +1,223 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-import os
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool
+from fastapi import Request
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+from config import settings  # noqa: E402
+
+DATABASE_URL = settings.DATABASE_URL
+DATABASE_REPLICA_URL = settings.DATABASE_REPLICA_URL
+
+logger = logging.getLogger("database")
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.waited = 0  # checkouts that took longer than 1 ms
+        self.timeouts = 0
+        self.wait_ms = deque(maxlen=1000)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self.stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited_ms = (time.perf_counter() - start) * 1000
+            with self.stats_lock:
+                self.checkouts += 1
+                if waited_ms > 1:
+                    self.waited += 1
+                self.wait_ms.append(waited_ms)
+
+
+def _engine_kwargs(url: str) -> dict:
+    backend = make_url(url).get_backend_name()
+    if backend != "postgresql":
+        return {}
+
+    connect_args = {"sslmode": settings.DB_SSLMODE}  # ensure SSL, no cert files
+    if settings.DB_PGBOUNCER:
+        # The pooler owns the connections: no client-side pool, no session-level
+        # startup options, no server-side prepared statements (psycopg 3).
+        if make_url(url).get_driver_name() == "psycopg":
+            connect_args["prepare_threshold"] = None
+        return {"connect_args": connect_args, "poolclass": NullPool}
+
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    return {
+        "connect_args": connect_args,
+        "poolclass": TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _make_engine(url: str):
+    eng = create_engine(url, **_engine_kwargs(url))
+    if settings.DB_PGBOUNCER and settings.DB_STATEMENT_TIMEOUT_MS and eng.dialect.name == "postgresql":
+        # Transaction pooling forgets session settings, so apply the timeout per transaction
+        @event.listens_for(eng, "begin")
+        def _set_statement_timeout(conn):
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}")
+    return eng
+
 
 # Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"sslmode": "require"},  # ensure SSL, no cert files
-)
+engine = _make_engine(DATABASE_URL)
+replica_engine = _make_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
 Base = declarative_base()
 
-def get_db():
+
+def _writer_key(request: Request) -> Optional[str]:
+    # The bearer token identifies "this user" well enough for read-your-writes;
+    # it's only used to pick an engine, never trusted for access control.
+    return request.headers.get("authorization")
+
+
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["writer"] = _writer_key(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# ── Read replica routing ────────────────────────────────────────────────────
+# Read-only dependencies (`get_read_db`) and the agents' query tools
+# (`read_session`) use the replica when DATABASE_REPLICA_URL is set, except:
+#   * the caller committed a write within DB_READ_YOUR_WRITES_SECONDS, so they
+#     see their own change rather than a lagging copy;
+#   * the replica refused a connection recently — reads fall back to the primary.
+
+class ReadRouter:
+    def __init__(self, window_s: float, retry_s: float):
+        self.window_s = window_s
+        self.retry_s = retry_s
+        self._writes: Dict[str, float] = {}  # writer key -> monotonic time of last commit
+        self._lock = threading.Lock()
+        self.down_until = 0.0
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.read_your_writes = 0
+        self.fallbacks = 0
+
+    def note_write(self, writer: str):
+        now = time.monotonic()
+        with self._lock:
+            self._writes[writer] = now
+            if len(self._writes) > 1000:
+                cutoff = now - self.window_s
+                self._writes = {k: t for k, t in self._writes.items() if t >= cutoff}
+
+    def recently_wrote(self, writer: Optional[str]) -> bool:
+        if writer is None:
+            return False
+        written = self._writes.get(writer)
+        return written is not None and time.monotonic() - written < self.window_s
+
+    def replica_up(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self):
+        self.down_until = time.monotonic() + self.retry_s
+        self.fallbacks += 1
+
+    def stats(self) -> dict:
+        return {
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "read_your_writes": self.read_your_writes,
+            "fallbacks": self.fallbacks,
+            "replica_down": not self.replica_up(),
+        }
+
+
+read_router = ReadRouter(settings.DB_READ_YOUR_WRITES_SECONDS, settings.DB_REPLICA_RETRY_SECONDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _flushed(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bulk_write(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _committed(session):
+    if session.info.pop("wrote", False) and session.info.get("writer"):
+        read_router.note_write(session.info["writer"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _rolled_back(session):
+    session.info.pop("wrote", None)
+
+
+def mark_wrote(session: Session):
+    """Record a write issued below the ORM (COPY, raw cursor) for read-your-writes."""
+    session.info["wrote"] = True
+
+
+def read_session(writer: Optional[str] = None) -> Session:
+    """Session for read-only work: the replica when usable, otherwise the primary."""
+    if replica_engine is not None:
+        if read_router.recently_wrote(writer):
+            read_router.read_your_writes += 1
+        elif read_router.replica_up():
+            db = ReplicaSessionLocal()
+            try:
+                db.connection()  # check out now so a dead replica falls back here, not mid-handler
+            except exc.DBAPIError as e:
+                db.close()
+                read_router.mark_down()
+                logger.warning(f"Replica unavailable, reading from primary for {read_router.retry_s:.0f}s: {e}")
+            else:
+                read_router.replica_reads += 1
+                return db
+    read_router.primary_reads += 1
+    return SessionLocal()
+
+
+def request_read_session(request: Request) -> Session:
+    """`read_session` for the caller of `request` (read-your-writes per bearer token)."""
+    return read_session(_writer_key(request))
+
+
+def get_read_db(request: Request):
+    """Dependency for handlers that only read; see `read_session`."""
+    db = request_read_session(request)
     try:
         yield db
     finally:
@@ -27,3 +226,110 @@ def get_db():
 def init_db():
     from models import Base as ModelsBase
     ModelsBase.metadata.create_all(bind=engine)
+
+# ── Async engine ────────────────────────────────────────────────────────────
+# Parallel data-access layer for the async CRUD handlers. Created on first use
+# so the async driver (asyncpg / psycopg / aiosqlite) is only needed when used.
+
+_async_engine = None
+_async_sessionmaker = None
+
+
+def _async_engine_args(url: str):
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend == "sqlite":
+        return u.set(drivername="sqlite+aiosqlite"), {}
+    if backend != "postgresql":
+        raise RuntimeError(f"No async driver configured for {backend}")
+
+    driver = settings.DB_ASYNC_DRIVER
+    kwargs = {}
+    if driver == "asyncpg":
+        # asyncpg takes ssl / server_settings instead of libpq options
+        connect_args = {"ssl": settings.DB_SSLMODE}
+        if settings.DB_PGBOUNCER:
+            connect_args["statement_cache_size"] = 0
+        elif settings.DB_STATEMENT_TIMEOUT_MS:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    else:
+        connect_args = {"sslmode": settings.DB_SSLMODE}
+        if settings.DB_PGBOUNCER:
+            connect_args["prepare_threshold"] = None
+        elif settings.DB_STATEMENT_TIMEOUT_MS:
+            connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    kwargs["connect_args"] = connect_args
+    if settings.DB_PGBOUNCER:
+        kwargs["poolclass"] = NullPool
+    else:
+        kwargs.update({
+            "pool_size": settings.DB_ASYNC_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+            "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        })
+    return u.set(drivername=f"postgresql+{driver}"), kwargs
+
+
+def get_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        url, kwargs = _async_engine_args(DATABASE_URL)
+        _async_engine = create_async_engine(url, **kwargs)
+        _async_sessionmaker = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+    return _async_engine
+
+
+async def get_async_db(request: Request):
+    get_async_engine()
+    async with _async_sessionmaker() as session:
+        session.sync_session.info["writer"] = _writer_key(request)
+        yield session
+
+
+async def dispose_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = _async_sessionmaker = None
+
+
+def _queue_pool_stats(pool) -> dict:
+    return {
+        "pool_class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+        "timeout_seconds": pool.timeout(),
+    }
+
+
+def pool_stats() -> dict:
+    """Checkout / overflow / wait-time figures for the admin endpoint."""
+    pool = engine.pool
+    stats = {"pool_class": type(pool).__name__, "pgbouncer": settings.DB_PGBOUNCER}
+    if isinstance(pool, QueuePool):
+        stats.update(_queue_pool_stats(pool))
+    if isinstance(pool, TimedQueuePool):
+        with pool.stats_lock:
+            waits = sorted(pool.wait_ms)
+            stats.update({
+                "checkouts": pool.checkouts,
+                "checkouts_waited": pool.waited,
+                "checkout_timeouts": pool.timeouts,
+                "wait_ms": {
+                    "p50": round(waits[len(waits) // 2], 2) if waits else None,
+                    "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2) if waits else None,
+                    "max": round(waits[-1], 2) if waits else None,
+                },
+            })
+    if replica_engine is not None:
+        stats["replica"] = read_router.stats()
+        if isinstance(replica_engine.pool, QueuePool):
+            stats["replica"].update(_queue_pool_stats(replica_engine.pool))
+    if _async_engine is not None and isinstance(_async_engine.pool, QueuePool):
+        stats["async"] = _queue_pool_stats(_async_engine.pool)
+    return stats
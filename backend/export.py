@@ -0,0 +1,213 @@
+"""
+Streaming exports — GET .../export for orders and alerts.
+
+The list endpoints are paged for screens; pulling a whole history through
+them means thousands of round trips. An export is one request whose rows
+are read with a server-side cursor (`yield_per`: a named cursor on
+Postgres) and written out a batch at a time, so memory stays at one batch
+of EXPORT_BATCH_ROWS whatever the table size.
+
+Formats (`format=`):
+  * ndjson  — one JSON object per line (default)
+  * csv     — header row, then one row per record
+  * parquet — one row group per batch; needs the optional `pyarrow` package
+
+Filters: `date_from` / `date_to` (inclusive, on the model's date column)
+and, for orders, `item`. Rows are always scoped to the caller (owner
+column) and come out oldest first.
+
+Reads go through `read_session`, i.e. the replica when configured. The
+session is opened here rather than via `get_read_db` because it has to
+outlive the handler: it is closed when the stream ends or the client goes
+away.
+
+Usage:
+    router.include_router(export_router(
+        path="/orders/export", model=MandiFarmerOrder, role="mandi_owner", name="mandi_orders",
+        owner_column="mandi_owner_id", owner_id=_mandi_owner_id, date_column="order_date",
+        item_column="item",
+    ))
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Callable, Iterator, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Boolean, Date, DateTime, Integer, Numeric, select
+from starlette.background import BackgroundTask
+
+from auth import Principal, get_token_principal, require_role
+from config import settings
+from database import request_read_session
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _plain(value):
+    """JSON / CSV representation of a column value."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _ndjson(columns, batches) -> Iterator[bytes]:
+    for rows in batches:
+        yield "".join(
+            json.dumps({c: _plain(v) for c, v in zip(columns, row)}, ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode()
+
+
+def _csv(columns, batches) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows([_plain(v) for v in row] for row in rows)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def _arrow_type(column):
+    kind = column.type
+    if isinstance(kind, Boolean):
+        return pa.bool_()
+    if isinstance(kind, Integer):
+        return pa.int64()
+    if isinstance(kind, Numeric):
+        return pa.float64()
+    if isinstance(kind, Date):
+        return pa.date32()
+    if isinstance(kind, DateTime):  # also TIMESTAMP
+        return pa.timestamp("us")
+    return pa.string()
+
+
+class _Drain(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def _parquet(table_columns, batches) -> Iterator[bytes]:
+    schema = pa.schema([(c.key, _arrow_type(c)) for c in table_columns])
+    sink = _Drain()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        for rows in batches:
+            data = list(zip(*rows))
+            writer.write_table(pa.table(
+                [pa.array([float(v) if isinstance(v, Decimal) else v for v in values], type=field.type)
+                 for values, field in zip(data, schema)],
+                schema=schema,
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_router(
+    *,
+    path: str,
+    model,
+    name: str,
+    owner_column: str,
+    owner_id: Callable[[Principal], int],
+    date_column: str,
+    role: Optional[str] = None,
+    item_column: Optional[str] = None,
+) -> APIRouter:
+    """GET `path` streaming `model` rows owned by the caller; any role when `role` is None."""
+    router = APIRouter()
+    auth = require_role(role, claims_only=True) if role else get_token_principal
+    table_columns = list(model.__table__.columns)
+    columns = [c.key for c in table_columns]
+    owner_col = getattr(model, owner_column)
+    date_col = getattr(model, date_column)
+    is_datetime = isinstance(date_col.type, DateTime)
+
+    def _bound(day: date, end: bool):
+        if not is_datetime:
+            return day
+        return datetime.combine(day + timedelta(days=1) if end else day, time.min)
+
+    @router.get(path)
+    def export_rows(
+        request: Request,
+        format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        item: Optional[str] = None,
+        current_user: Principal = Depends(auth),
+    ):
+        """Stream the caller's rows as NDJSON, CSV or Parquet (see export)."""
+        if format == "parquet" and pa is None:
+            raise HTTPException(status_code=501, detail="Parquet export needs the pyarrow package on the server")
+        if item is not None and item_column is None:
+            raise HTTPException(status_code=400, detail="This export has no item filter")
+
+        stmt = select(*model.__table__.columns).where(owner_col == owner_id(current_user))
+        if date_from is not None:
+            stmt = stmt.where(date_col >= _bound(date_from, end=False))
+        if date_to is not None:
+            stmt = stmt.where(date_col < _bound(date_to, end=True) if is_datetime else date_col <= date_to)
+        if item is not None:
+            stmt = stmt.where(getattr(model, item_column) == item)
+        stmt = stmt.order_by(date_col, model.id).execution_options(yield_per=settings.EXPORT_BATCH_ROWS)
+
+        db = request_read_session(request)
+
+        def batches():
+            try:
+                yield from db.execute(stmt).partitions()
+            finally:
+                db.close()
+
+        if format == "ndjson":
+            body = _ndjson(columns, batches())
+        elif format == "csv":
+            body = _csv(columns, batches())
+        else:
+            body = _parquet(table_columns, batches())
+        filename = f"{name}-{date.today().isoformat()}.{format}"
+        return StreamingResponse(
+            body,
+            media_type=MEDIA_TYPES[format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+            background=BackgroundTask(db.close),
+        )
+
+    return router
@@ -4,7 +4,7 @@ Farmer advisory agent — helps farmers with crop pricing and market intelligenc
 Uses `create_agent` with ChatGroq LLM.
 
 Flow:
-  1. Query the DB for farmer crops and recent mandi-farmer orders.
+  1. Query the DB for farmer crops and recent mandi prices (daily rollup).
   2. Fetch distinct farmer locations (latitude/longitude).
   3. Use Tavily to search for crop price trends and weather news.
   4. LLM generates actionable alerts for farmers.
@@ -16,15 +16,15 @@ import logging
 from datetime import datetime, timedelta
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func as sa_func
 
 from langchain.agents import create_agent
 from langchain_core.tools import tool
 from langchain_groq import ChatGroq
 
 from config import settings
-from database import SessionLocal
-from models import Farmer, Crop, MandiFarmerOrder, User, Alert
+from database import SessionLocal, read_session
+from models import Farmer, Crop, User, Alert
+import rollup
 
 logger = logging.getLogger("farmer_agent")
 
@@ -36,7 +36,7 @@ def get_farmer_crops(dummy: str = "") -> str:
     Return a JSON list of all crops being grown by farmers.
     Each entry has {farmer_id, username, crop_name, quantity, planted_date}.
     """
-    db: Session = SessionLocal()
+    db: Session = read_session()
     try:
         rows = (
             db.query(
@@ -73,28 +73,17 @@ def get_recent_mandi_prices(dummy: str = "") -> str:
     Fetch mandi-farmer orders from the past 7 days to understand current
     market prices. Returns {item, avg_price, min_price, max_price, total_orders}.
     """
-    db: Session = SessionLocal()
+    db: Session = read_session()
     try:
         week_ago = datetime.utcnow() - timedelta(days=7)
-        rows = (
-            db.query(
-                MandiFarmerOrder.item,
-                sa_func.avg(MandiFarmerOrder.price_per_kg).label("avg_price"),
-                sa_func.min(MandiFarmerOrder.price_per_kg).label("min_price"),
-                sa_func.max(MandiFarmerOrder.price_per_kg).label("max_price"),
-                sa_func.count(MandiFarmerOrder.id).label("total_orders"),
-            )
-            .filter(MandiFarmerOrder.order_date >= week_ago.date())
-            .group_by(MandiFarmerOrder.item)
-            .all()
-        )
+        rows = rollup.item_totals(db, "mandi", week_ago.date())
         results = [
             {
-                "item": r.item,
-                "avg_price": round(float(r.avg_price), 2) if r.avg_price else 0,
+                "item": r.item or None,
+                "avg_price": rollup.average(r.total_price, r.priced_orders),
                 "min_price": float(r.min_price) if r.min_price else 0,
                 "max_price": float(r.max_price) if r.max_price else 0,
-                "total_orders": r.total_orders,
+                "total_orders": int(r.total_orders),
             }
             for r in rows
         ]
@@ -111,7 +100,7 @@ def get_farmer_locations(dummy: str = "") -> str:
     Return a JSON list of distinct farmer locations (latitude, longitude)
     from the database. Used to make Tavily searches location-aware.
     """
-    db: Session = SessionLocal()
+    db: Session = read_session()
     try:
         rows = (
             db.query(User.latitude, User.longitude)
@@ -166,7 +155,7 @@ def get_all_farmer_user_ids(dummy: str = "") -> str:
     Return a JSON list of {user_id, username, latitude, longitude} for every
     farmer. Use this to know which user_ids to send alerts to.
     """
-    db: Session = SessionLocal()
+    db: Session = read_session()
     try:
         rows = (
             db.query(User.id, User.username, User.latitude, User.longitude)
@@ -1,14 +1,124 @@
 import os
 import json
-import httpx
+import hashlib
+import logging
+from contextvars import ContextVar
+from typing import Callable, List, Optional
 from dotenv import load_dotenv
 
+from cache import Cache, SQLiteBackend
+from config import settings
+from http_client import get_client
+from farmer.intent_parser import parse_intent
+from farmer.streaming import TopLevelFieldParser
+
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ")
 GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
 
-async def get_ai_recommendation(crop: str, quantity: float, lat: float, lng: float, weather_data: dict = None, mandi_data: list = None):
+logger = logging.getLogger("ai_advisor")
+
+
+# ── LLM response cache ──────────────────────────────────────────────────────
+# Keyed by a canonical hash of (model, messages, temperature, max_tokens); the
+# raw completion text is cached so callers parse it exactly as before, but
+# only once it parses — a truncated or non-JSON answer is never replayed.
+llm_cache = Cache(
+    "llm",
+    maxsize=settings.LLM_CACHE_MAXSIZE,
+    ttl=settings.LLM_CACHE_TTL_SECONDS,
+    shared=(
+        SQLiteBackend(settings.LLM_CACHE_SQLITE_PATH, settings.LLM_CACHE_MAXSIZE)
+        if settings.LLM_CACHE_BACKEND == "sqlite" else None
+    ),
+)
+
+# Routes call `track_llm_cache()` before invoking the advisor; every completion
+# made on behalf of that request appends HIT / MISS / BYPASS to the list, which
+# the route reports in the X-LLM-Cache header (the JSON body is unchanged).
+_llm_cache_log: ContextVar[Optional[List[str]]] = ContextVar("llm_cache_log", default=None)
+
+
+def track_llm_cache() -> List[str]:
+    log = _llm_cache_log.get()
+    if log is None:
+        log = []
+        _llm_cache_log.set(log)
+    return log
+
+
+def llm_cache_header(log: List[str]) -> str:
+    """Summarise a request's cache outcomes for the X-LLM-Cache header."""
+    if not log:
+        return "NONE"
+    if all(s == "HIT" for s in log):
+        return "HIT"
+    return "MISS" if "HIT" not in log else "PARTIAL"
+
+
+def llm_cache_key(payload: dict) -> str:
+    canonical = json.dumps(
+        {k: payload.get(k) for k in ("model", "messages", "temperature", "max_tokens")},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _json_object(content: str) -> dict:
+    """The JSON object in a completion (bare or wrapped in prose); ValueError if there is none."""
+    try:
+        value = json.loads(content)
+    except json.JSONDecodeError:
+        start = content.find('{')
+        end = content.rfind('}') + 1
+        if start == -1 or end <= start:
+            raise
+        value = json.loads(content[start:end])
+    if not isinstance(value, dict):
+        raise ValueError("completion is not a JSON object")
+    return value
+
+
+async def _cache_completion(key: str, content: str, validate: Optional[Callable[[str], object]]):
+    """Cache `content` unless `validate` rejects it — a truncated answer must not be replayed for hours."""
+    if validate is not None:
+        try:
+            validate(content)
+        except (ValueError, TypeError, KeyError):
+            logger.warning("LLM completion failed validation; not caching it")
+            return
+    await llm_cache.set(key, content)
+
+
+async def _chat_completion(payload: dict, headers: dict, bypass_cache: bool = False,
+                           validate: Optional[Callable[[str], object]] = None) -> str:
+    """
+    POST a chat completion to Groq and return the message content, via the
+    cache. Content is only cached if `validate(content)` doesn't raise.
+    """
+    log = _llm_cache_log.get()
+    use_cache = settings.LLM_CACHE_BACKEND != "off" and not bypass_cache
+    key = llm_cache_key(payload) if use_cache else None
+    if use_cache:
+        content = await llm_cache.get(key)
+        if content is not None:
+            if log is not None:
+                log.append("HIT")
+            return content
+
+    response = await get_client("groq").post(GROQ_URL, headers=headers, json=payload)
+    response.raise_for_status()
+    result = response.json()
+    content = result["choices"][0]["message"]["content"]
+    if use_cache:
+        await _cache_completion(key, content, validate)
+    if log is not None:
+        log.append("MISS" if use_cache else "BYPASS")
+    return content
+
+
+async def get_ai_recommendation(crop: str, quantity: float, lat: float, lng: float, weather_data: dict = None, mandi_data: list = None, bypass_cache: bool = False):
     """
     Uses Groq LLM to analyze market conditions and recommend best sell strategy.
     Returns trade-off analysis with multiple scenarios.
@@ -61,29 +171,30 @@ Analyze and provide a JSON response with this exact structure:
         "max_tokens": 2000
     }
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(GROQ_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        content = result["choices"][0]["message"]["content"]
-        
-        # Try to parse JSON
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            # Try to extract JSON from the response
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            if start != -1 and end > start:
-                return json.loads(content[start:end])
-            return {"error": "Could not parse AI response", "raw": content}
+    content = await _chat_completion(payload, headers, bypass_cache=bypass_cache, validate=_json_object)
+
+    # Try to parse JSON
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        # Try to extract JSON from the response
+        start = content.find('{')
+        end = content.rfind('}') + 1
+        if start != -1 and end > start:
+            return json.loads(content[start:end])
+        return {"error": "Could not parse AI response", "raw": content}
 
 
 async def parse_voice_command(text: str):
     """
-    Uses Groq to parse farmer's voice command into structured data.
+    Parses farmer's voice command into structured data.
     Handles: sell, grow/plant, harvest advice, price check, weather, general farming questions.
+    The local keyword parser answers first; Groq is only called when it is unsure.
     """
+    parsed, confidence = parse_intent(text)
+    if confidence >= settings.INTENT_LOCAL_MIN_CONFIDENCE:
+        return parsed
+
     headers = {
         "Authorization": f"Bearer {GROQ_API_KEY}",
         "Content-Type": "application/json"
@@ -116,26 +227,24 @@ Always respond with valid JSON only:
         "max_tokens": 200
     }
     
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        response = await client.post(GROQ_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        content = result["choices"][0]["message"]["content"]
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            if start != -1 and end > start:
-                return json.loads(content[start:end])
-            return {"action": "unknown", "original_text": text}
+    # Intent parsing is short — keep a tighter timeout than the provider default.
+    # Not cached: commands are free text and rarely repeat verbatim.
+    response = await get_client("groq").post(GROQ_URL, headers=headers, json=payload, timeout=15.0)
+    response.raise_for_status()
+    result = response.json()
+    content = result["choices"][0]["message"]["content"]
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        start = content.find('{')
+        end = content.rfind('}') + 1
+        if start != -1 and end > start:
+            return json.loads(content[start:end])
+        return {"action": "unknown", "original_text": text}
 
 
-async def ask_farming_question(question: str, crop: str = "", context: str = ""):
-    """
-    Uses Groq to answer any farming question and return structured UI data.
-    Returns title, advice cards, steps, and a spoken summary.
-    """
+def _farming_question_request(question: str, crop: str = "", context: str = ""):
+    """Headers and payload for an advice-card question (shared by the plain and streaming calls)."""
     headers = {
         "Authorization": f"Bearer {GROQ_API_KEY}",
         "Content-Type": "application/json"
@@ -177,18 +286,72 @@ Keep advice practical, specific to Indian farming conditions. Max 4 sections, 4
         "temperature": 0.3,
         "max_tokens": 1500
     }
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(GROQ_URL, headers=headers, json=payload)
+    return headers, payload
+
+
+def _parse_advice(content: str) -> dict:
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        start = content.find('{')
+        end = content.rfind('}') + 1
+        if start != -1 and end > start:
+            return json.loads(content[start:end])
+        return {"title": "Advice", "recommendation": content[:300], "sections": [], "steps": [], "spoken_summary": content[:100]}
+
+
+async def ask_farming_question(question: str, crop: str = "", context: str = "", bypass_cache: bool = False):
+    """
+    Uses Groq to answer any farming question and return structured UI data.
+    Returns title, advice cards, steps, and a spoken summary.
+    """
+    headers, payload = _farming_question_request(question, crop, context)
+    content = await _chat_completion(payload, headers, bypass_cache=bypass_cache, validate=_json_object)
+    return _parse_advice(content)
+
+
+async def stream_farming_question(question: str, crop: str = "", context: str = "", bypass_cache: bool = False):
+    """
+    Streaming variant of `ask_farming_question`. Yields ("token", text) as
+    Groq produces it, ("field", (name, value)) as soon as each top-level field
+    of the advice card is complete, and finally ("final", advice_dict).
+    Shares the response cache with the non-streaming call.
+    """
+    headers, payload = _farming_question_request(question, crop, context)
+    log = _llm_cache_log.get()
+    use_cache = settings.LLM_CACHE_BACKEND != "off" and not bypass_cache
+    key = llm_cache_key(payload) if use_cache else None
+    parser = TopLevelFieldParser()
+
+    content = await llm_cache.get(key) if use_cache else None
+    if content is not None:
+        if log is not None:
+            log.append("HIT")
+        for field in parser.feed(content):
+            yield "field", field
+        yield "final", _parse_advice(content)
+        return
+
+    parts = []
+    async with get_client("groq").stream("POST", GROQ_URL, headers=headers, json={**payload, "stream": True}) as response:
         response.raise_for_status()
-        result = response.json()
-        content = result["choices"][0]["message"]["content"]
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            if start != -1 and end > start:
-                return json.loads(content[start:end])
-            return {"title": "Advice", "recommendation": content[:300], "sections": [], "steps": [], "spoken_summary": content[:100]}
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+            if not delta:
+                continue
+            parts.append(delta)
+            yield "token", delta
+            for field in parser.feed(delta):
+                yield "field", field
 
+    content = "".join(parts)
+    if use_cache:
+        await _cache_completion(key, content, _json_object)
+    if log is not None:
+        log.append("MISS" if use_cache else "BYPASS")
+    yield "final", _parse_advice(content)
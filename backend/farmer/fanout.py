@@ -0,0 +1,105 @@
+"""
+Fan-out stage for endpoints that combine several slow outbound lookups.
+
+Each stage is an async callable. Stages without dependencies start at once;
+a stage with dependencies starts as soon as all of them have finished and
+receives their results (None for a dependency that failed or timed out).
+The whole fan-out shares one deadline — whatever has not finished by then is
+cancelled and reported as "timeout", so a single slow provider cannot hold
+the response hostage.
+
+Usage:
+    results, status = await run_fanout({
+        "weather": Stage(lambda: get_weather_data(lat, lng)),
+        "market":  Stage(lambda: search_market_info(crop)),
+        "ai":      Stage(lambda weather: get_ai_recommendation(..., weather_data=weather),
+                         depends_on=("weather",)),
+    }, deadline=20.0)
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger("fanout")
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_TIMEOUT = "timeout"
+
+
+@dataclass
+class Stage:
+    fn: Callable[..., Awaitable[Any]]
+    depends_on: Tuple[str, ...] = field(default_factory=tuple)
+
+
+def _status_for(result: Any) -> str:
+    """Lookups that swallow their own errors report them as {"status": "error"}."""
+    if isinstance(result, dict) and result.get("status") == STATUS_ERROR:
+        return STATUS_ERROR
+    return STATUS_OK
+
+
+async def run_fanout(stages: Dict[str, Stage], deadline: float) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Run `stages` concurrently under a single overall `deadline` (seconds).
+    Returns (results, status) — both keyed by stage name. Results of stages
+    that errored or timed out are None.
+    """
+    for name, stage in stages.items():
+        missing = [d for d in stage.depends_on if d not in stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s): {', '.join(missing)}")
+
+    results: Dict[str, Any] = {}
+    status: Dict[str, str] = {}
+    running: Dict[asyncio.Task, str] = {}
+    pending = dict(stages)
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    ends_at = started_at + deadline
+
+    def _launch_ready():
+        for name, stage in list(pending.items()):
+            if all(d in status for d in stage.depends_on):
+                args = [results.get(d) for d in stage.depends_on]
+                running[asyncio.ensure_future(stage.fn(*args))] = name
+                del pending[name]
+
+    _launch_ready()
+    while running:
+        remaining = ends_at - loop.time()
+        if remaining <= 0:
+            break
+        done, _ = await asyncio.wait(running, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            break
+        for task in done:
+            name = running.pop(task)
+            try:
+                results[name] = task.result()
+                status[name] = _status_for(results[name])
+            except Exception as e:
+                logger.warning(f"Fan-out stage '{name}' failed: {e}")
+                results[name] = None
+                status[name] = STATUS_ERROR
+        _launch_ready()
+
+    # Deadline hit: cancel whatever is still in flight, never-started stages time out too
+    for task, name in running.items():
+        task.cancel()
+        results[name] = None
+        status[name] = STATUS_TIMEOUT
+    for name in pending:
+        results[name] = None
+        status[name] = STATUS_TIMEOUT
+    if running or pending:
+        logger.warning(
+            f"Fan-out deadline of {deadline}s reached after "
+            f"{round(loop.time() - started_at, 2)}s — timed out: "
+            f"{', '.join(n for n, s in status.items() if s == STATUS_TIMEOUT)}"
+        )
+
+    return results, status
@@ -0,0 +1,140 @@
+"""
+Deterministic local parser for farmer voice commands.
+
+Runs before the Groq call in `parse_voice_command`: a keyword grammar plus a
+crop-synonym table (English, Hindi / Hinglish, Devanagari) pulls out the
+action, crop, quantity and unit. Each parse carries a confidence score; the
+LLM is only consulted when it falls below the configured threshold.
+
+Usage:
+    parsed, confidence = parse_intent("tamatar 2 quintal bechna hai")
+    # ({"action": "sell", "crop": "tomato", "quantity": 200.0, "unit": "kg", ...}, 0.95)
+"""
+
+import re
+from typing import Optional, Tuple
+
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+# canonical crop → spoken variants (keep canonical names in sync with CROP_PRICE_RANGES)
+CROP_SYNONYMS = {
+    "tomato": ["tomato", "tomatoes", "tamatar", "tamater", "tamaatar", "टमाटर"],
+    "onion": ["onion", "onions", "pyaz", "pyaaz", "piyaz", "kanda", "eerulli", "प्याज", "प्याज़"],
+    "potato": ["potato", "potatoes", "aloo", "alu", "batata", "आलू"],
+    "wheat": ["wheat", "gehun", "gehu", "gehoon", "गेहूं", "गेहूँ"],
+    "rice": ["rice", "paddy", "chawal", "chaawal", "dhan", "dhaan", "चावल", "धान"],
+    "chilli": ["chilli", "chillies", "chili", "chilies", "green chilli", "mirch", "mirchi", "hari mirch", "मिर्च", "मिर्ची"],
+    "carrot": ["carrot", "carrots", "gajar", "गाजर"],
+    "brinjal": ["brinjal", "brinjals", "eggplant", "baingan", "baigan", "badanekai", "बैंगन"],
+    "cabbage": ["cabbage", "patta gobhi", "patta gobi", "band gobhi", "band gobi", "पत्ता गोभी", "बंद गोभी"],
+    "cauliflower": ["cauliflower", "phool gobhi", "phool gobi", "phul gobhi", "gobhi", "gobi", "फूल गोभी", "गोभी"],
+    "banana": ["banana", "bananas", "kela", "kele", "केला", "केले"],
+    "mango": ["mango", "mangoes", "aam", "आम"],
+    "grape": ["grape", "grapes", "angoor", "angur", "अंगूर"],
+    "apple": ["apple", "apples", "seb", "saib", "सेब"],
+    "sugarcane": ["sugarcane", "ganna", "ganne", "गन्ना", "गन्ने"],
+}
+
+# action → trigger words / phrases, most specific actions first
+ACTION_KEYWORDS = {
+    "sell": ["sell", "selling", "sale", "bech", "bechna", "bechni", "bechne", "bechu", "bechun", "bechoon", "bechunga",
+             "beche", "bechenge", "बेच", "बेचना", "बेचनी", "बेचूं", "बेचूँ"],
+    "check_price": ["price", "prices", "rate", "rates", "bhav", "bhaav", "daam", "dam", "kimat", "keemat", "mandi rate", "भाव", "दाम", "कीमत", "रेट"],
+    "check_weather": ["weather", "rain", "raining", "forecast", "baarish", "barish", "mausam", "मौसम", "बारिश"],
+    "harvest_advice": ["harvest", "harvesting", "cut", "katai", "kaatna", "todna", "ready", "तुड़ाई", "कटाई"],
+    "grow": ["grow", "growing", "planted", "plant", "sow", "sowed", "sown", "ugata", "ugaya", "uga", "ugana", "lagaya", "boya", "उगाता", "उगाया", "लगाया", "बोया"],
+    "farming_advice": ["pest", "pests", "fertilizer", "fertiliser", "khad", "disease", "keeda", "keede", "spray", "irrigation", "protect", "how to", "kaise", "कीड़े", "खाद"],
+}
+
+# unit → multiplier to kilograms
+UNITS = {
+    "kg": 1, "kgs": 1, "kilo": 1, "kilos": 1, "kilogram": 1, "kilograms": 1, "किलो": 1,
+    "quintal": 100, "quintals": 100, "qtl": 100, "क्विंटल": 100,
+    "ton": 1000, "tons": 1000, "tonne": 1000, "tonnes": 1000, "टन": 1000,
+}
+
+_NUMBER = r"(\d+(?:\.\d+)?)"
+_QUANTITY_RE = re.compile(_NUMBER + r"\s*(" + "|".join(sorted(UNITS, key=len, reverse=True)) + r")?(?=\s|$)")
+_AGE_RE = re.compile(_NUMBER + r"\s*(?:months?|mahine|mahina|महीने|महीना)(?=\s|$)")
+_NON_WORD_RE = re.compile(r"[^0-9a-z\u0900-\u097f.]+")
+_DIGIT_LETTER_RE = re.compile(r"(\d)(?=[a-z\u0900-\u097f])")
+
+
+def _normalize(text: str) -> str:
+    """Lowercase, strip punctuation and split "250kg" into "250 kg"; padded with spaces."""
+    text = _NON_WORD_RE.sub(" ", text.lower())
+    text = _DIGIT_LETTER_RE.sub(r"\1 ", text)
+    text = re.sub(r"\.(?!\d)", " ", text)
+    return f" {' '.join(text.split())} "
+
+
+def _find(padded: str, phrases) -> bool:
+    return any(f" {p} " in padded for p in phrases)
+
+
+def find_crop(padded: str) -> Optional[str]:
+    # Prefer the longest matching phrase, so "phool gobhi" beats "gobhi"
+    best, best_len = None, 0
+    for crop, names in CROP_SYNONYMS.items():
+        for name in names:
+            if len(name) > best_len and f" {name} " in padded:
+                best, best_len = crop, len(name)
+    return best
+
+
+def parse_intent(text: str) -> Tuple[dict, float]:
+    """
+    Parse a command without calling the LLM. Returns (parsed, confidence);
+    `parsed` has the same keys the LLM prompt asks for.
+    """
+    padded = _normalize(text)
+    crop = find_crop(padded)
+    actions = [a for a, words in ACTION_KEYWORDS.items() if _find(padded, words)]
+
+    quantity, unit, bare_number = None, None, None
+    for m in _QUANTITY_RE.finditer(padded):
+        if m.group(2):
+            quantity, unit = round(float(m.group(1)) * UNITS[m.group(2)], 2), "kg"
+            break
+        if bare_number is None:
+            bare_number = float(m.group(1))
+    age = _AGE_RE.search(padded)
+    age_months = float(age.group(1)) if age else None
+    if age_months is not None and age_months.is_integer():
+        age_months = int(age_months)
+
+    # "rate" and "sell" together usually means "what rate can I sell at" —
+    # a quantity settles it as a sale, otherwise it's ambiguous.
+    if actions[:2] == ["sell", "check_price"] and quantity is not None:
+        actions = ["sell"]
+    # Age in months is a strong harvest signal ("tomato 3 months old, ready?")
+    if "harvest_advice" in actions and len(actions) > 1 and age_months is not None:
+        actions = ["harvest_advice"]
+
+    parsed = {"action": "general", "crop": crop, "quantity": quantity, "unit": unit, "details": text.strip()}
+    if age_months is not None:
+        parsed["age_months"] = age_months
+
+    if not actions:
+        return parsed, 0.0
+    action = actions[0]
+    parsed["action"] = action
+    if len(actions) > 1:
+        return parsed, 0.4
+
+    if action == "sell":
+        if quantity is None and bare_number is not None and age_months is None:
+            # "sell 300 tomato" — farmers mean kilograms; don't count it as fully explicit
+            parsed["quantity"], parsed["unit"] = bare_number, "kg"
+        confidence = 0.95 if crop and quantity else 0.85 if crop else 0.3
+    elif action in ("check_price", "grow"):
+        confidence = 0.9 if crop else 0.3
+    elif action == "check_weather":
+        # A crop or quantity alongside weather words is usually a question about
+        # something else ("kal rain hogi to tomato kaatu?") — let the LLM route it
+        confidence = 0.9 if crop is None and quantity is None else 0.5
+    elif action == "harvest_advice":
+        confidence = 0.85 if crop else 0.5
+    else:  # farming_advice — the answer comes from the LLM anyway, we only route it
+        confidence = 0.8 if crop else 0.6
+    return parsed, confidence
@@ -1,26 +1,41 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import List, Optional
 import random
+import zlib
 from datetime import datetime, timedelta
+import numpy as np
 
-from database import get_db
-from models import Farmer, Crop, User, Alert
+from database import get_db, get_read_db
+from models import Farmer, Crop, Alert
 from schemas import (
     FarmerProfileUpdate, FarmerProfileResponse,
-    CropCreate, CropUpdate, CropResponse,
+    CropCreate, CropUpdate, CropResponse, Page,
+)
+from auth import Principal, invalidate_principal, require_role
+from async_crud import async_crud_router
+from pagination import Keyset, paginate
+import price_history
+import price_simulator
+from farmer.ai_advisor import (
+    get_ai_recommendation, parse_voice_command, ask_farming_question,
+    stream_farming_question, track_llm_cache, llm_cache_header,
 )
-from auth import get_current_user, require_role
-from farmer.ai_advisor import get_ai_recommendation, parse_voice_command, ask_farming_question
 from farmer.weather import get_weather_data, search_market_info
 from farmer.alerts import categorize_alerts
+from farmer.fanout import Stage, run_fanout
+from farmer.streaming import sse_event
+from geo_index import mandi_index
+from geo_sql import users_within_radius, nearest_users
+from config import settings
 
 router = APIRouter(tags=["farmer"])
 
 
 # ── Helper ──────────────────────────────────────────────────────────────────
-def _get_farmer_profile(user: User, db: Session) -> Farmer:
+def _get_farmer_profile(user: Principal, db: Session) -> Farmer:
     """Return the Farmer row for the authenticated user, or 404."""
     farmer = db.query(Farmer).filter(Farmer.user_id == user.id).first()
     if not farmer:
@@ -28,14 +43,21 @@ def _get_farmer_profile(user: User, db: Session) -> Farmer:
     return farmer
 
 
+def _farmer_id(user: Principal) -> int:
+    """Return the farmer profile id cached on the principal, or 404."""
+    if user.profile_id is None:
+        raise HTTPException(status_code=404, detail="Farmer profile not found")
+    return user.profile_id
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 #  PROFILE
 # ═════════════════════════════════════════════════════════════════════════════
 
 @router.get("/profile", response_model=FarmerProfileResponse)
 def get_profile(
-    current_user: User = Depends(require_role("farmer")),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_role("farmer")),
+    db: Session = Depends(get_read_db),
 ):
     """Get the logged-in farmer's profile."""
     return _get_farmer_profile(current_user, db)
@@ -44,22 +66,23 @@ def get_profile(
 @router.put("/profile", response_model=FarmerProfileResponse)
 def update_profile(
     payload: FarmerProfileUpdate,
-    current_user: User = Depends(require_role("farmer")),
+    current_user: Principal = Depends(require_role("farmer")),
     db: Session = Depends(get_db),
 ):
     """Update the farmer's profile (contact, lat/lng, language)."""
     farmer = _get_farmer_profile(current_user, db)
 
     if payload.contact is not None:
-        current_user.contact = payload.contact
+        farmer.user.contact = payload.contact
     if payload.latitude is not None:
-        current_user.latitude = payload.latitude
+        farmer.user.latitude = payload.latitude
     if payload.longitude is not None:
-        current_user.longitude = payload.longitude
+        farmer.user.longitude = payload.longitude
     if payload.language is not None:
         farmer.language = payload.language
 
     db.commit()
+    invalidate_principal(current_user.id)
     db.refresh(farmer)
     return farmer
 
@@ -68,26 +91,28 @@ def update_profile(
 #  CROPS  (CRUD)
 # ═════════════════════════════════════════════════════════════════════════════
 
-@router.get("/crops", response_model=List[CropResponse])
+@router.get("/crops", response_model=Page[CropResponse])
 def list_crops(
-    current_user: User = Depends(require_role("farmer")),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+    current_user: Principal = Depends(require_role("farmer", claims_only=True)),
+    db: Session = Depends(get_read_db),
 ):
-    """List all crops belonging to the logged-in farmer."""
-    farmer = _get_farmer_profile(current_user, db)
-    return db.query(Crop).filter(Crop.farmer_id == farmer.id).all()
+    """List the logged-in farmer's crops, one page at a time (oldest first)."""
+    farmer_id = _farmer_id(current_user)
+    return paginate(db.query(Crop).filter(Crop.farmer_id == farmer_id), Keyset(Crop.id), limit, after_id)
 
 
 @router.post("/crops", response_model=CropResponse, status_code=status.HTTP_201_CREATED)
 def create_crop(
     payload: CropCreate,
-    current_user: User = Depends(require_role("farmer")),
+    current_user: Principal = Depends(require_role("farmer", claims_only=True)),
     db: Session = Depends(get_db),
 ):
     """Add a new crop for the farmer."""
-    farmer = _get_farmer_profile(current_user, db)
+    farmer_id = _farmer_id(current_user)
     crop = Crop(
-        farmer_id=farmer.id,
+        farmer_id=farmer_id,
         name=payload.name,
         quantity=payload.quantity,
         planted_date=payload.planted_date,
@@ -101,13 +126,13 @@ def create_crop(
 @router.get("/crops/{crop_id}", response_model=CropResponse)
 def get_crop(
     crop_id: int,
-    current_user: User = Depends(require_role("farmer")),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_role("farmer", claims_only=True)),
+    db: Session = Depends(get_read_db),
 ):
     """Get a single crop by ID."""
-    farmer = _get_farmer_profile(current_user, db)
+    farmer_id = _farmer_id(current_user)
     crop = db.query(Crop).filter(
-        Crop.id == crop_id, Crop.farmer_id == farmer.id
+        Crop.id == crop_id, Crop.farmer_id == farmer_id
     ).first()
     if not crop:
         raise HTTPException(status_code=404, detail="Crop not found")
@@ -118,13 +143,13 @@ def get_crop(
 def update_crop(
     crop_id: int,
     payload: CropUpdate,
-    current_user: User = Depends(require_role("farmer")),
+    current_user: Principal = Depends(require_role("farmer", claims_only=True)),
     db: Session = Depends(get_db),
 ):
     """Update an existing crop."""
-    farmer = _get_farmer_profile(current_user, db)
+    farmer_id = _farmer_id(current_user)
     crop = db.query(Crop).filter(
-        Crop.id == crop_id, Crop.farmer_id == farmer.id
+        Crop.id == crop_id, Crop.farmer_id == farmer_id
     ).first()
     if not crop:
         raise HTTPException(status_code=404, detail="Crop not found")
@@ -141,13 +166,13 @@ def update_crop(
 @router.delete("/crops/{crop_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_crop(
     crop_id: int,
-    current_user: User = Depends(require_role("farmer")),
+    current_user: Principal = Depends(require_role("farmer", claims_only=True)),
     db: Session = Depends(get_db),
 ):
     """Delete a crop."""
-    farmer = _get_farmer_profile(current_user, db)
+    farmer_id = _farmer_id(current_user)
     crop = db.query(Crop).filter(
-        Crop.id == crop_id, Crop.farmer_id == farmer.id
+        Crop.id == crop_id, Crop.farmer_id == farmer_id
     ).first()
     if not crop:
         raise HTTPException(status_code=404, detail="Crop not found")
@@ -155,6 +180,15 @@ def delete_crop(
     db.commit()
 
 
+# Async twin of the crop CRUD above, served instead when DB_ASYNC_CRUD is on
+async_router = APIRouter(tags=["farmer"])
+async_router.include_router(async_crud_router(
+    path="/crops", model=Crop, create_schema=CropCreate, update_schema=CropUpdate,
+    response_schema=CropResponse, role="farmer", label="Crop", id_name="crop_id",
+    owner_column="farmer_id", owner_id=_farmer_id,
+))
+
+
 # ─── Request / Response Models ───
 class FarmSetup(BaseModel):
     location: str = ""
@@ -168,6 +202,7 @@ class VoiceCommand(BaseModel):
     lat: float = 12.97
     lng: float = 77.59
     location: str = ""
+    bypass_cache: bool = False  # skip the LLM response cache
 
 class AnalyzeRequest(BaseModel):
     crop: str
@@ -175,6 +210,7 @@ class AnalyzeRequest(BaseModel):
     lat: float
     lng: float
     location: str = ""
+    bypass_cache: bool = False  # skip the LLM response cache
 
 class WeatherRequest(BaseModel):
     lat: float
@@ -202,23 +238,23 @@ CROP_PRICE_RANGES = {
     "grape": (50, 150), "apple": (80, 200), "sugarcane": (3, 5),
 }
 
-import math
+# Mock mandis share the grid index with registered mandi owners
+for _m in MOCK_MANDIS:
+    mandi_index.upsert(("mock", _m["id"]), _m["lat"], _m["lng"], _m)
 
-def haversine_distance(lat1, lng1, lat2, lng2):
-    R = 6371
-    dlat = math.radians(lat2 - lat1)
-    dlng = math.radians(lng2 - lng1)
-    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng/2)**2
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
-
-def get_mandis_with_prices(lat: float, lng: float, crop: str):
-    """Returns mandis sorted by distance with simulated prices"""
+def get_mandis_with_prices(lat: float, lng: float, crop: str, limit: Optional[int] = None,
+                           radius_km: Optional[float] = None):
+    """Returns the `limit` nearest mandis (optionally within `radius_km`) sorted by distance with simulated prices"""
     price_range = CROP_PRICE_RANGES.get(crop.lower(), (20, 50))
-    
+
+    if radius_km is not None:
+        nearby = mandi_index.within_radius_km(lat, lng, radius_km)[:limit]
+    else:
+        nearby = mandi_index.k_nearest(lat, lng, k=limit if limit is not None else len(mandi_index))
+
     mandis = []
-    for m in MOCK_MANDIS:
-        dist = haversine_distance(lat, lng, m["lat"], m["lng"])
+    for m, dist in nearby:
         price = round(random.uniform(*price_range), 2)
         transport_cost = round(dist * 2.5 + random.uniform(100, 500), 2)  # ₹/trip
         mandis.append({
@@ -228,45 +264,86 @@ def get_mandis_with_prices(lat: float, lng: float, crop: str):
             "transport_cost": transport_cost,
             "travel_time_min": round(dist * 1.8 + random.uniform(10, 30)),
         })
-    
-    mandis.sort(key=lambda x: x["distance_km"])
     return mandis
 
 
 # ─── Endpoints ───
 
+MAX_RADIUS_KM = 500
+
 @router.get("/mandis")
-async def get_nearby_mandis(lat: float = 12.97, lng: float = 77.59, crop: str = "tomato"):
+def get_nearby_mandis(lat: float = Query(12.97, ge=-90, le=90), lng: float = Query(77.59, ge=-180, le=180),
+                      crop: str = "tomato", limit: int = 20,
+                      radius_km: Optional[float] = Query(None, gt=0, le=MAX_RADIUS_KM)):
     """Get nearby mandis with current prices for a crop"""
-    mandis = get_mandis_with_prices(lat, lng, crop)
+    mandis = get_mandis_with_prices(lat, lng, crop, limit=min(max(limit, 1), 100), radius_km=radius_km)
     return {"mandis": mandis, "crop": crop, "total": len(mandis)}
 
 
+@router.get("/mandi-owners/nearby")
+def get_nearby_mandi_owners(
+    radius_km: Optional[float] = Query(None, gt=0, le=MAX_RADIUS_KM),
+    limit: int = 10,
+    current_user: Principal = Depends(require_role("farmer")),
+    db: Session = Depends(get_read_db),
+):
+    """Registered mandi owners closest to the farmer's saved location"""
+    if current_user.latitude is None or current_user.longitude is None:
+        raise HTTPException(status_code=400, detail="Set your farm location first")
+    lat, lng = float(current_user.latitude), float(current_user.longitude)
+    limit = min(max(limit, 1), 100)
+    if radius_km is not None:
+        rows = users_within_radius(db, lat, lng, radius_km, role="mandi_owner", limit=limit)
+    else:
+        rows = nearest_users(db, lat, lng, limit, role="mandi_owner")
+    owners = [
+        {
+            "user_id": u.id,
+            "username": u.username,
+            "contact": u.contact,
+            "lat": float(u.latitude),
+            "lng": float(u.longitude),
+            "distance_km": round(dist, 1),
+        }
+        for u, dist in rows
+    ]
+    return {"mandi_owners": owners, "total": len(owners)}
+
+
 @router.post("/analyze")
-async def analyze_sell(req: AnalyzeRequest):
+async def analyze_sell(req: AnalyzeRequest, response: Response = None):
     """AI-powered analysis: when & where to sell for best profit"""
+    cache_log = track_llm_cache()
     # Get mandi prices
-    mandis = get_mandis_with_prices(req.lat, req.lng, req.crop)
+    mandis = get_mandis_with_prices(req.lat, req.lng, req.crop, limit=5)
     mandi_data = [{"name": m["name"], "price_per_kg": m["price_per_kg"], "distance_km": m["distance_km"], "transport_cost": m["transport_cost"]} for m in mandis[:5]]
     
-    # Get weather
-    weather = await get_weather_data(req.lat, req.lng, req.location)
-    
-    # Get market info from Tavily
-    market_info = await search_market_info(req.crop, req.location or "Karnataka")
-    
-    # Get AI recommendation
-    ai_result = await get_ai_recommendation(
-        crop=req.crop,
-        quantity=req.quantity,
-        lat=req.lat,
-        lng=req.lng,
-        weather_data=weather,
-        mandi_data=mandi_data
-    )
+    # Weather and market lookups run concurrently; the AI call starts as soon
+    # as weather arrives. Everything shares one deadline.
+    results, sources_status = await run_fanout({
+        "weather": Stage(lambda: get_weather_data(req.lat, req.lng, req.location)),
+        "market_info": Stage(lambda: search_market_info(req.crop, req.location or "Karnataka")),
+        "ai_recommendation": Stage(
+            lambda weather: get_ai_recommendation(
+                crop=req.crop,
+                quantity=req.quantity,
+                lat=req.lat,
+                lng=req.lng,
+                weather_data=weather,
+                mandi_data=mandi_data,
+                bypass_cache=req.bypass_cache,
+            ),
+            depends_on=("weather",),
+        ),
+    }, deadline=settings.ANALYZE_DEADLINE_SECONDS)
+    weather = results["weather"]
+    market_info = results["market_info"]
+    ai_result = results["ai_recommendation"]
     
     # Generate alerts
     alerts = categorize_alerts(ai_result) if isinstance(ai_result, dict) else []
+    if response is not None:
+        response.headers["X-LLM-Cache"] = llm_cache_header(cache_log)
     
     return {
         "ai_recommendation": ai_result,
@@ -274,14 +351,23 @@ async def analyze_sell(req: AnalyzeRequest):
         "weather": weather,
         "market_info": market_info,
         "alerts": alerts,
+        "sources_status": sources_status,
         "request": {"crop": req.crop, "quantity": req.quantity}
     }
 
 
 @router.post("/voice")
-async def process_voice(cmd: VoiceCommand):
+async def process_voice(cmd: VoiceCommand, response: Response):
     """Parse voice command and trigger appropriate action — handles ALL farmer intents"""
-    parsed = await parse_voice_command(cmd.text)
+    cache_log = track_llm_cache()
+    result = await _handle_voice(cmd)
+    response.headers["X-LLM-Cache"] = llm_cache_header(cache_log)
+    return result
+
+
+async def _handle_voice(cmd: VoiceCommand, parsed: Optional[dict] = None):
+    if parsed is None:
+        parsed = await parse_voice_command(cmd.text)
     action = parsed.get("action", "unknown")
 
     # ── SELL ──
@@ -290,7 +376,8 @@ async def process_voice(cmd: VoiceCommand):
         crop = parsed["crop"]
         analysis = await analyze_sell(AnalyzeRequest(
             crop=crop, quantity=qty,
-            lat=cmd.lat, lng=cmd.lng, location=cmd.location
+            lat=cmd.lat, lng=cmd.lng, location=cmd.location,
+            bypass_cache=cmd.bypass_cache,
         ))
         # Enrich with timing factors
         factors = []
@@ -307,19 +394,13 @@ async def process_voice(cmd: VoiceCommand):
 
         # ── Price Forecast (7-day prediction) ──
         price_range = CROP_PRICE_RANGES.get(crop.lower(), (20, 50))
-        base = (price_range[0] + price_range[1]) / 2
         today = datetime.utcnow().date()
-        rng = random.Random(hash(crop) + today.toordinal())
+        rng = np.random.default_rng([zlib.crc32(crop.lower().encode()), today.toordinal()])
 
         # Simulate last 5 days of prices for the best mandi
         best_mandi_name = (analysis.get("mandis") or [{}])[0].get("name", "APMC Yeshwanthpur")
-        prices_last5 = []
-        p = base + rng.uniform(-3, 3)
-        for _ in range(30):
-            p += rng.uniform(-2, 2.3)
-            p = max(price_range[0] * 0.7, min(price_range[1] * 1.3, p))
-            prices_last5.append(round(p, 2))
-        prices_last5 = prices_last5[-5:]  # last 5 days
+        walk = price_simulator.range_walk(rng, 30, *price_range)
+        prices_last5 = walk[0, -5:, 0].round(2).tolist()  # last 5 days
 
         # Calculate trend and project 7 days
         avg_change = (prices_last5[-1] - prices_last5[0]) / len(prices_last5) if len(prices_last5) > 1 else 0
@@ -366,55 +447,135 @@ async def process_voice(cmd: VoiceCommand):
             "spoken_summary": f"बहुत अच्छा! आप {crop} उगा रहे हैं। मैं आपके लिए कीमतें ट्रैक करूँगा।"
         }
 
+    # ── CHECK WEATHER ──
+    elif action == "check_weather":
+        weather = await get_weather_data(cmd.lat, cmd.lng, cmd.location)
+        return {"parsed_command": parsed, "response_type": "weather", "weather": weather}
+
+    # ── CHECK PRICE ──
+    elif action == "check_price":
+        crop = parsed.get("crop", "tomato")
+        mandis = get_mandis_with_prices(cmd.lat, cmd.lng, crop, limit=5)
+        return {"parsed_command": parsed, "response_type": "price_check", "mandis": mandis[:5], "crop": crop}
+
+    # ── ADVICE CARD (harvest / farming / general; unknown tried as general) ──
+    question, crop, context = _advice_question(parsed, cmd)
+    try:
+        advice = await ask_farming_question(question, crop=crop, context=context, bypass_cache=cmd.bypass_cache)
+    except Exception:
+        if action in ADVICE_ACTIONS:
+            raise
+        return {"parsed_command": parsed, "response_type": "error", "message": "Sorry, I didn't understand. Try: 'sell 100kg tomato' or 'I grow wheat'"}
+    return {"parsed_command": parsed, "response_type": "advice_card", "advice": advice}
+
+
+ADVICE_ACTIONS = ("harvest_advice", "farming_advice", "general")
+
+
+def _advice_question(parsed: dict, cmd: VoiceCommand):
+    """
+    (question, crop, context) for the advice-card branches of /voice, or None
+    when the parsed command is answered some other way (sell, grow, weather, price).
+    """
+    action = parsed.get("action", "unknown")
+    if (action in ("sell", "grow") and parsed.get("crop")) or action in ("check_weather", "check_price"):
+        return None
+
     # ── HARVEST ADVICE ──
-    elif action == "harvest_advice":
+    if action == "harvest_advice":
         crop = parsed.get("crop", "")
         age = parsed.get("age_months", "")
         details = parsed.get("details", cmd.text)
         question = f"Should I harvest {crop}?" + (f" It's {age} months old." if age else "") + f" {details}"
-        advice = await ask_farming_question(question, crop=crop, context=f"Age: {age} months" if age else "")
-        return {"parsed_command": parsed, "response_type": "advice_card", "advice": advice}
+        return question, crop, f"Age: {age} months" if age else ""
 
     # ── FARMING ADVICE ──
-    elif action == "farming_advice":
+    if action == "farming_advice":
         crop = parsed.get("crop", "")
         details = parsed.get("details", cmd.text)
-        advice = await ask_farming_question(details or cmd.text, crop=crop)
-        return {"parsed_command": parsed, "response_type": "advice_card", "advice": advice}
+        return details or cmd.text, crop, ""
 
     # ── GENERAL QUESTION ──
-    elif action == "general":
+    if action == "general":
         details = parsed.get("details", cmd.text)
-        advice = await ask_farming_question(details or cmd.text)
-        return {"parsed_command": parsed, "response_type": "advice_card", "advice": advice}
-
-    # ── CHECK WEATHER ──
-    elif action == "check_weather":
-        weather = await get_weather_data(cmd.lat, cmd.lng, cmd.location)
-        return {"parsed_command": parsed, "response_type": "weather", "weather": weather}
-
-    # ── CHECK PRICE ──
-    elif action == "check_price":
-        crop = parsed.get("crop", "tomato")
-        mandis = get_mandis_with_prices(cmd.lat, cmd.lng, crop)
-        return {"parsed_command": parsed, "response_type": "price_check", "mandis": mandis[:5], "crop": crop}
+        return details or cmd.text, "", ""
 
     # ── UNKNOWN — try as general question ──
-    else:
-        try:
-            advice = await ask_farming_question(cmd.text)
-            return {"parsed_command": parsed, "response_type": "advice_card", "advice": advice}
-        except:
-            return {"parsed_command": parsed, "response_type": "error", "message": "Sorry, I didn't understand. Try: 'sell 100kg tomato' or 'I grow wheat'"}
+    return cmd.text, "", ""
 
 
 @router.post("/ask")
-async def ask_question(cmd: VoiceCommand):
+async def ask_question(cmd: VoiceCommand, response: Response):
     """General farming question endpoint — returns structured UI advice card"""
-    advice = await ask_farming_question(cmd.text, crop="", context=f"Location: {cmd.lat},{cmd.lng}")
+    cache_log = track_llm_cache()
+    advice = await ask_farming_question(cmd.text, crop="", context=f"Location: {cmd.lat},{cmd.lng}", bypass_cache=cmd.bypass_cache)
+    response.headers["X-LLM-Cache"] = llm_cache_header(cache_log)
     return {"response_type": "advice_card", "advice": advice}
 
 
+# ─── Streaming (Server-Sent Events) ───
+# Events: `token` (raw model text), `field` (a finished top-level advice field
+# such as title / recommendation / sections / steps), then `final` with exactly
+# the JSON the non-streaming endpoint returns, or `error`.
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+async def _stream_advice(question: str, crop: str, context: str, bypass_cache: bool, wrap):
+    try:
+        async for kind, data in stream_farming_question(question, crop=crop, context=context, bypass_cache=bypass_cache):
+            if kind == "token":
+                yield sse_event("token", {"text": data})
+            elif kind == "field":
+                yield sse_event("field", {"name": data[0], "value": data[1]})
+            else:
+                yield sse_event("final", wrap(data))
+    except Exception as e:
+        yield sse_event("error", {"message": str(e)})
+
+
+@router.post("/ask/stream")
+async def ask_question_stream(cmd: VoiceCommand):
+    """Streaming variant of /ask — advice card fields arrive as they are generated."""
+    events = _stream_advice(
+        cmd.text, "", f"Location: {cmd.lat},{cmd.lng}", cmd.bypass_cache,
+        wrap=lambda advice: {"response_type": "advice_card", "advice": advice},
+    )
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.post("/voice/stream")
+async def process_voice_stream(cmd: VoiceCommand):
+    """
+    Streaming variant of /voice. Advice-card intents stream token by token;
+    every other intent is answered with a single `final` event. A `parsed`
+    event with the parsed command is sent first.
+    """
+
+    async def events():
+        try:
+            parsed = await parse_voice_command(cmd.text)
+        except Exception as e:
+            yield sse_event("error", {"message": str(e)})
+            return
+        yield sse_event("parsed", parsed)
+        args = _advice_question(parsed, cmd)
+        if args is None:
+            try:
+                yield sse_event("final", await _handle_voice(cmd, parsed))
+            except Exception as e:
+                yield sse_event("error", {"message": str(e)})
+            return
+        question, crop, context = args
+        async for event in _stream_advice(
+            question, crop, context, cmd.bypass_cache,
+            wrap=lambda advice: {"parsed_command": parsed, "response_type": "advice_card", "advice": advice},
+        ):
+            yield event
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.post("/weather")
 async def get_weather(req: WeatherRequest):
     """Get weather for farmer's location"""
@@ -423,35 +584,39 @@ async def get_weather(req: WeatherRequest):
 
 
 # ═════════════════════════════════════════════════════════════════════════════
-#  PRICE HISTORY  (simulated 30-day time-series)
+#  PRICE HISTORY  (daily prices per mandi from the mandi_prices store)
 # ═════════════════════════════════════════════════════════════════════════════
 
 @router.get("/price-history")
-async def get_price_history(crop: str = "tomato", days: int = 30):
-    """Returns simulated daily price history for a crop across mandis.
-    Uses random-walk seeded by crop name for deterministic-ish data."""
-    price_range = CROP_PRICE_RANGES.get(crop.lower(), (20, 50))
-    base_price = (price_range[0] + price_range[1]) / 2
-    mandi_names = [m["name"] for m in MOCK_MANDIS[:5]]
+def get_price_history(
+    crop: str = "tomato",
+    days: int = Query(30, ge=1, le=3650),
+    mandi: Optional[List[str]] = Query(None),
+    layout: str = Query("rows", pattern="^(rows|columns)$"),
+    db: Session = Depends(get_read_db),
+):
+    """Daily price history for a crop across mandis, ending today.
+    Defaults to the PRICE_HISTORY_MANDIS mandis with the most prices in the range;
+    `mandi` (repeatable) picks them. layout=columns returns parallel arrays."""
     today = datetime.utcnow().date()
+    series = price_history.read_prices(
+        db, crop, today - timedelta(days=days - 1), today,
+        mandis=mandi, limit=None if mandi else settings.PRICE_HISTORY_MANDIS,
+    )
+    dates = [d.isoformat() for d in series.dates]
+    prices = series.prices.round(2).tolist()
 
-    # Seed by crop so same crop returns consistent data within a session
-    rng = random.Random(hash(crop) + today.toordinal())
-
-    history = []
-    for mandi_name in mandi_names:
-        price = base_price + rng.uniform(-5, 5)
-        for d in range(days):
-            date_str = (today - timedelta(days=days - 1 - d)).isoformat()
-            # Random walk with mean reversion
-            price += rng.uniform(-2, 2.3)  # slight upward bias
-            price = max(price_range[0] * 0.7, min(price_range[1] * 1.3, price))
-            history.append({
-                "date": date_str,
-                "mandi_name": mandi_name,
-                "price_per_kg": round(price, 2)
-            })
-
+    if layout == "columns":
+        return {
+            "crop": crop, "days": days, "dates": dates, "mandis": series.mandis,
+            "prices": [[None if p != p else p for p in row] for row in prices],  # NaN -> null
+        }
+    history = [
+        {"date": day, "mandi_name": name, "price_per_kg": p}
+        for name, row in zip(series.mandis, prices)
+        for day, p in zip(dates, row)
+        if p == p
+    ]
     return {"crop": crop, "days": days, "history": history}
 
 
@@ -461,8 +626,8 @@ async def get_price_history(crop: str = "tomato", days: int = 30):
 
 @router.get("/alerts")
 def get_farmer_alerts(
-    current_user: User = Depends(require_role("farmer")),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_role("farmer", claims_only=True)),
+    db: Session = Depends(get_read_db),
 ):
     """Get all alerts for the logged-in farmer, newest first."""
     alerts = (
@@ -497,7 +662,7 @@ class FarmSetupRequest(BaseModel):
 @router.put("/setup")
 def setup_farm(
     payload: FarmSetupRequest,
-    current_user: User = Depends(require_role("farmer")),
+    current_user: Principal = Depends(require_role("farmer")),
     db: Session = Depends(get_db),
 ):
     """One-step farm setup: updates location, creates initial crop."""
@@ -505,11 +670,12 @@ def setup_farm(
 
     # Update location if provided
     if payload.lat is not None:
-        current_user.latitude = payload.lat
+        farmer.user.latitude = payload.lat
     if payload.lng is not None:
-        current_user.longitude = payload.lng
+        farmer.user.longitude = payload.lng
 
     db.commit()
+    invalidate_principal(current_user.id)
 
     # Create initial crop if farmer has no crops yet
     existing_crops = db.query(Crop).filter(Crop.farmer_id == farmer.id).all()
@@ -529,8 +695,8 @@ def setup_farm(
     db.refresh(farmer)
     return {
         "status": "ok",
-        "lat": float(current_user.latitude) if current_user.latitude else None,
-        "lng": float(current_user.longitude) if current_user.longitude else None,
+        "lat": float(farmer.user.latitude) if farmer.user.latitude else None,
+        "lng": float(farmer.user.longitude) if farmer.user.longitude else None,
         "location_name": payload.location_name,
         "crop_created": crop_created,
         "total_crops": len(existing_crops) + (1 if crop_created else 0),
@@ -0,0 +1,82 @@
+"""
+Helpers for streaming LLM answers to the browser as Server-Sent Events.
+
+  * `sse_event`           — format one SSE frame.
+  * `TopLevelFieldParser` — fed the model's JSON output chunk by chunk, it
+                            reports each top-level field (`title`,
+                            `recommendation`, `sections`, ...) as soon as its
+                            value is complete, long before the closing brace.
+"""
+
+import json
+from typing import Any, List, Tuple
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class TopLevelFieldParser:
+    """
+    Incremental scanner for a single JSON object. Only tracks string/escape
+    state and nesting depth, and never rescans characters it has already seen.
+    Text before the opening brace (stray markdown, whitespace) is ignored.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+        self.fields = {}
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume `chunk`; return the (field, value) pairs completed by it."""
+        completed = []
+        self._text += chunk
+        text = self._text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key is None and self._value_start is None:
+                        self._key = json.loads(text[self._key_start:i + 1])
+                continue
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None and self._value_start is None:
+                    self._key_start = i
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 1 and ch == "}":
+                    self._complete(text, i, completed)
+                self._depth -= 1
+            elif ch == ":" and self._depth == 1 and self._key is not None and self._value_start is None:
+                self._value_start = i + 1
+            elif ch == "," and self._depth == 1:
+                self._complete(text, i, completed)
+        self._pos = len(text)
+        return completed
+
+    def _complete(self, text: str, end: int, completed: list):
+        if self._key is not None and self._value_start is not None:
+            try:
+                value = json.loads(text[self._value_start:end])
+            except json.JSONDecodeError:
+                value = None
+            if value is not None:
+                self.fields[self._key] = value
+                completed.append((self._key, value))
+        self._key = None
+        self._key_start = None
+        self._value_start = None
@@ -1,19 +1,65 @@
+import math
 import os
-import httpx
 from dotenv import load_dotenv
 
+from cache import Cache, shared_backend_for
+from config import settings
+from http_client import get_client
+from singleflight import SingleFlight
+
 load_dotenv()
 
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 TAVILY_URL = "https://api.tavily.com/search"
 
+# Farmers in the same grid cell (or asking by the same place name) share one answer
+weather_cache = Cache(
+    "weather",
+    maxsize=settings.WEATHER_CACHE_MAXSIZE,
+    ttl=settings.WEATHER_CACHE_TTL_SECONDS,
+    shared=shared_backend_for("weather"),
+)
+
+# Identical lookups that arrive while one is already in flight wait for it
+weather_flight = SingleFlight("weather")
+market_flight = SingleFlight("market_info")
+
+
+def _grid_cell(lat: float, lng: float):
+    """Snap a point to its grid cell; returns (cell_id, cell_center_lat, cell_center_lng)."""
+    size = settings.WEATHER_CACHE_CELL_DEG
+    i, j = math.floor(lat / size), math.floor(lng / size)
+    return f"{i}:{j}", round((i + 0.5) * size, 4), round((j + 0.5) * size, 4)
+
+
+def weather_cache_key(lat: float, lng: float, location_name: str = "") -> str:
+    """Cache key — the normalized place name if given, otherwise the grid cell."""
+    if location_name.strip():
+        return "name:" + " ".join(location_name.lower().split())
+    return "cell:" + _grid_cell(lat, lng)[0]
+
 
 async def get_weather_data(lat: float, lng: float, location_name: str = ""):
     """
     Uses Tavily search to get current weather and forecast for the farmer's location.
+    Successful answers are cached per location (see `weather_cache_key`), and
+    concurrent misses for the same location share one Tavily call.
     """
-    query = f"current weather forecast {location_name} India temperature rain humidity wind today tomorrow" if location_name else f"weather forecast India latitude {lat} longitude {lng} today tomorrow"
-    
+    location = location_name or f"{lat}, {lng}"
+    key = weather_cache_key(lat, lng, location_name)
+    cached = await weather_cache.get(key)
+    if cached is not None:
+        return {**cached, "location": location}
+
+    weather = await weather_flight.do(key, lambda: _fetch_weather(key, lat, lng, location_name))
+    return {**weather, "location": location}
+
+
+async def _fetch_weather(key: str, lat: float, lng: float, location_name: str):
+    # Query for the cell centre so the cached answer fits every farmer in the cell
+    _, cell_lat, cell_lng = _grid_cell(lat, lng)
+    query = f"current weather forecast {location_name} India temperature rain humidity wind today tomorrow" if location_name else f"weather forecast India latitude {cell_lat} longitude {cell_lng} today tomorrow"
+
     payload = {
         "api_key": TAVILY_API_KEY,
         "query": query,
@@ -21,22 +67,23 @@ async def get_weather_data(lat: float, lng: float, location_name: str = ""):
         "max_results": 5,
         "include_answer": True
     }
-    
+
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(TAVILY_URL, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            
-            return {
-                "summary": data.get("answer", "Weather data not available"),
-                "sources": [
-                    {"title": r.get("title", ""), "url": r.get("url", ""), "snippet": r.get("content", "")[:200]}
-                    for r in data.get("results", [])[:3]
-                ],
-                "location": location_name or f"{lat}, {lng}",
-                "status": "success"
-            }
+        response = await get_client("tavily").post(TAVILY_URL, json=payload)
+        response.raise_for_status()
+        data = response.json()
+
+        weather = {
+            "summary": data.get("answer", "Weather data not available"),
+            "sources": [
+                {"title": r.get("title", ""), "url": r.get("url", ""), "snippet": r.get("content", "")[:200]}
+                for r in data.get("results", [])[:3]
+            ],
+            "location": location_name or f"{lat}, {lng}",
+            "status": "success"
+        }
+        await weather_cache.set(key, weather)
+        return weather
     except Exception as e:
         return {
             "summary": "Could not fetch weather data",
@@ -50,9 +97,16 @@ async def get_weather_data(lat: float, lng: float, location_name: str = ""):
 async def search_market_info(crop: str, region: str = "India"):
     """
     Uses Tavily to search current market prices and news for a crop.
+    Concurrent calls for the same crop and region share one Tavily call.
     """
+    key = (crop.strip().lower(), region.strip().lower())
+    result = await market_flight.do(key, lambda: _fetch_market_info(crop, region))
+    return {**result, "crop": crop, "region": region}
+
+
+async def _fetch_market_info(crop: str, region: str):
     query = f"{crop} mandi price today {region} market rate per kg"
-    
+
     payload = {
         "api_key": TAVILY_API_KEY,
         "query": query,
@@ -60,23 +114,22 @@ async def search_market_info(crop: str, region: str = "India"):
         "max_results": 5,
         "include_answer": True
     }
-    
+
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(TAVILY_URL, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            
-            return {
-                "summary": data.get("answer", "Market data not available"),
-                "sources": [
-                    {"title": r.get("title", ""), "url": r.get("url", ""), "snippet": r.get("content", "")[:200]}
-                    for r in data.get("results", [])[:3]
-                ],
-                "crop": crop,
-                "region": region,
-                "status": "success"
-            }
+        response = await get_client("tavily").post(TAVILY_URL, json=payload)
+        response.raise_for_status()
+        data = response.json()
+
+        return {
+            "summary": data.get("answer", "Market data not available"),
+            "sources": [
+                {"title": r.get("title", ""), "url": r.get("url", ""), "snippet": r.get("content", "")[:200]}
+                for r in data.get("results", [])[:3]
+            ],
+            "crop": crop,
+            "region": region,
+            "status": "success"
+        }
     except Exception as e:
         return {
             "summary": "Could not fetch market data",
@@ -0,0 +1,241 @@
+"""
+In-memory spatial index for mandi and retailer locations.
+
+A geohash-style grid: every point lives in a fixed-size lat/lng cell, so a
+radius query only looks at the cells overlapping its bounding box, and a
+k-nearest query searches rings of cells outward from the query point until
+no unseen cell can hold anything closer. Exact distances for the candidates
+come from one vectorized haversine pass over contiguous coordinate arrays
+(kept between queries, rebuilt after the index changes), and the k nearest
+are picked with `argpartition` — only those k are sorted.
+
+`k_nearest_batch` answers many query points at once with one (queries x
+points) distance matrix, chunked to stay bounded.
+
+Points are keyed (e.g. ("user", 17)) and can be inserted, moved or removed
+at any time — mandi owners and retailers are added as they register.
+
+Usage:
+    from geo_index import mandi_index
+    mandi_index.k_nearest(12.97, 77.59, k=5)       # [(payload, dist_km), ...]
+    mandi_index.within_radius_km(12.97, 77.59, 50)
+    mandi_index.k_nearest_batch(lats, lngs, k=5)   # one k_nearest list per query point
+"""
+
+import logging
+import math
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger("geo_index")
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.2
+
+# Beyond this many rings a full vectorized scan is cheaper than more cell lookups
+_MAX_RINGS = 12
+
+# Up to this many points, ranking all of them beats walking rings of cells
+_SMALL_INDEX = 256
+
+# Upper bound on elements in one batch distance matrix (~32 MB of float64)
+_BATCH_ELEMENTS = 4_000_000
+
+
+def haversine_km(lat1_rad, lng1_rad, lat2_rad, lng2_rad, cos_lat2=None):
+    """Vectorized haversine; arguments in radians and broadcastable against each other."""
+    if cos_lat2 is None:
+        cos_lat2 = np.cos(lat2_rad)
+    a = (np.sin((lat2_rad - lat1_rad) / 2) ** 2
+         + np.cos(lat1_rad) * cos_lat2 * np.sin((lng2_rad - lng1_rad) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GridIndex:
+    def __init__(self, name: str, cell_deg: float):
+        self.name = name
+        self.cell_deg = cell_deg
+        self._points: Dict[Hashable, Tuple[float, float, Any]] = {}
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        # Coordinates as radians in contiguous arrays, slot-aligned with _keys;
+        # None until the first query after a change
+        self._keys: List[Hashable] = []
+        self._slot: Dict[Hashable, int] = {}
+        self._arrays: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def upsert(self, key: Hashable, lat: float, lng: float, payload: Any):
+        """Insert a point, or move it if `key` is already indexed."""
+        with self._lock:
+            self._remove_locked(key)
+            self._points[key] = (float(lat), float(lng), payload)
+            self._cells.setdefault(self._cell(lat, lng), set()).add(key)
+            self._arrays = None
+
+    def remove(self, key: Hashable):
+        with self._lock:
+            self._remove_locked(key)
+
+    def _remove_locked(self, key: Hashable):
+        old = self._points.pop(key, None)
+        if old is not None:
+            self._arrays = None
+            cell = self._cell(old[0], old[1])
+            members = self._cells.get(cell)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._cells[cell]
+
+    def _arrays_locked(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(lat, lng, cos(lat)) of every point, in radians, slot order."""
+        if self._arrays is None:
+            self._keys = list(self._points)
+            self._slot = {key: i for i, key in enumerate(self._keys)}
+            n = len(self._keys)
+            lat = np.radians(np.fromiter((self._points[k][0] for k in self._keys), dtype=np.float64, count=n))
+            lng = np.radians(np.fromiter((self._points[k][1] for k in self._keys), dtype=np.float64, count=n))
+            self._arrays = (lat, lng, np.cos(lat))
+        return self._arrays
+
+    def _rank(self, keys, lat: float, lng: float, k: Optional[int] = None) -> List[Tuple[Any, float]]:
+        """Exact distances for `keys` (None = every point), closest first; the first `k` only if given."""
+        all_lat, all_lng, all_cos = self._arrays_locked()
+        if keys is None:
+            slots = np.arange(len(self._keys))
+        else:
+            slots = np.fromiter((self._slot[key] for key in keys), dtype=np.intp, count=len(keys))
+        if not len(slots):
+            return []
+        dist = haversine_km(math.radians(lat), math.radians(lng), all_lat[slots], all_lng[slots], all_cos[slots])
+        order = _top_k(dist, len(dist) if k is None else k)
+        return [(self._points[self._keys[slots[i]]][2], float(dist[i])) for i in order]
+
+    def within_radius_km(self, lat: float, lng: float, radius_km: float) -> List[Tuple[Any, float]]:
+        """Every point within `radius_km` of (lat, lng) as (payload, distance_km), closest first."""
+        dlat = radius_km / KM_PER_DEG_LAT
+        dlng = radius_km / (KM_PER_DEG_LAT * max(0.01, math.cos(math.radians(min(89.0, abs(lat) + dlat)))))
+        i0, j0 = self._cell(lat - dlat, lng - dlng)
+        i1, j1 = self._cell(lat + dlat, lng + dlng)
+        with self._lock:
+            if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self._points):
+                # More cells than points: ranking every point is cheaper than the walk
+                keys = None
+            else:
+                keys = []
+                for i in range(i0, i1 + 1):
+                    for j in range(j0, j1 + 1):
+                        keys.extend(self._cells.get((i, j), ()))
+            ranked = self._rank(keys, lat, lng)
+        return [(p, d) for p, d in ranked if d <= radius_km]
+
+    def k_nearest(self, lat: float, lng: float, k: int) -> List[Tuple[Any, float]]:
+        """The k points closest to (lat, lng) as (payload, distance_km), closest first."""
+        with self._lock:
+            if k <= 0 or not self._points:
+                return []
+            if k >= len(self._points) or len(self._points) <= _SMALL_INDEX:
+                return self._rank(None, lat, lng, k)
+
+            ci, cj = self._cell(lat, lng)
+            keys: List[Hashable] = []
+            for r in range(_MAX_RINGS + 1):
+                for i in range(ci - r, ci + r + 1):
+                    if i in (ci - r, ci + r):
+                        js = range(cj - r, cj + r + 1)
+                    else:
+                        js = (cj - r, cj + r)
+                    for j in js:
+                        keys.extend(self._cells.get((i, j), ()))
+                if len(keys) >= k:
+                    ranked = self._rank(keys, lat, lng, k)
+                    # Anything outside rings 0..r is at least r whole cells away
+                    lat_edge = min(89.0, abs(lat) + (r + 1) * self.cell_deg)
+                    bound_km = r * self.cell_deg * KM_PER_DEG_LAT * math.cos(math.radians(lat_edge))
+                    if ranked[k - 1][1] <= bound_km:
+                        return ranked
+            # Sparse neighbourhood — fall back to ranking everything
+            return self._rank(None, lat, lng, k)
+
+    def k_nearest_batch(self, lats, lngs, k: int) -> List[List[Tuple[Any, float]]]:
+        """k_nearest for each query point (lats[i], lngs[i]), from one vectorized distance matrix."""
+        q_lat = np.radians(np.asarray(lats, dtype=np.float64))[:, None]
+        q_lng = np.radians(np.asarray(lngs, dtype=np.float64))[:, None]
+        with self._lock:
+            n = len(self._points)
+            k = min(k, n)
+            if k <= 0:
+                return [[] for _ in range(len(q_lat))]
+            all_lat, all_lng, all_cos = self._arrays_locked()
+            payloads = [self._points[key][2] for key in self._keys]
+        out = []
+        step = max(1, _BATCH_ELEMENTS // n)
+        for start in range(0, len(q_lat), step):
+            dist = haversine_km(q_lat[start:start + step], q_lng[start:start + step],
+                                all_lat[None, :], all_lng[None, :], all_cos[None, :])
+            part = np.argpartition(dist, k - 1, axis=1)[:, :k] if k < n else np.tile(np.arange(n), (len(dist), 1))
+            part_dist = np.take_along_axis(dist, part, axis=1)
+            order = np.argsort(part_dist, axis=1, kind="stable")
+            idx = np.take_along_axis(part, order, axis=1).tolist()
+            part_dist = np.take_along_axis(part_dist, order, axis=1).tolist()
+            out.extend([(payloads[i], d) for i, d in zip(row_idx, row_dist)]
+                       for row_idx, row_dist in zip(idx, part_dist))
+        return out
+
+
+def _top_k(dist: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k smallest distances, sorted ascending."""
+    if k < len(dist):
+        part = np.argpartition(dist, k - 1)[:k]
+    else:
+        part = np.arange(len(dist))
+    return part[np.argsort(dist[part], kind="stable")]
+
+
+mandi_index = GridIndex("mandi", settings.GEO_INDEX_CELL_DEG)
+retailer_index = GridIndex("retailer", settings.GEO_INDEX_CELL_DEG)
+
+_INDEX_FOR_ROLE = {"mandi_owner": mandi_index, "retailer": retailer_index}
+
+
+def index_user_location(user):
+    """Add / move a registered mandi owner or retailer in the matching index."""
+    index = _INDEX_FOR_ROLE.get(user.role)
+    if index is None:
+        return
+    key = ("user", user.id)
+    if user.latitude is None or user.longitude is None:
+        index.remove(key)
+        return
+    lat, lng = float(user.latitude), float(user.longitude)
+    index.upsert(key, lat, lng, {
+        "id": f"user-{user.id}",
+        "user_id": user.id,
+        "name": user.username,
+        "lat": lat,
+        "lng": lng,
+    })
+
+
+def load_registered_locations(db):
+    """Index every mandi owner / retailer with coordinates. Called at startup."""
+    from models import User  # local import to avoid circular dependency
+
+    rows = (
+        db.query(User)
+        .filter(User.role.in_(list(_INDEX_FOR_ROLE)), User.latitude.isnot(None), User.longitude.isnot(None))
+        .all()
+    )
+    for user in rows:
+        index_user_location(user)
+    logger.info(f"Geo index loaded: {len(mandi_index)} mandis, {len(retailer_index)} retailers")
@@ -0,0 +1,104 @@
+"""
+Location queries over `users.latitude` / `users.longitude` pushed into SQL.
+
+On Postgres the `cube` + `earthdistance` extensions provide a GiST index on
+`ll_to_earth(latitude, longitude)` (see the `user_location_gist` migration):
+
+  * radius  — `earth_box(...) @> ll_to_earth(...)` is an index scan; the box is
+              slightly larger than the circle so rows are re-checked exactly.
+  * nearest — `ORDER BY ll_to_earth(...) <-> ll_to_earth(:lat, :lng)` walks the
+              GiST index in distance order (KNN), so only k rows are read.
+
+Any other database (SQLite in tests) falls back to a lat/lng bounding box in
+SQL plus exact haversine in Python — same results, more rows scanned.
+
+Distances are always reported with the app's haversine (6371 km sphere), so
+both backends return identical rows and numbers.
+
+Usage:
+    for user, dist_km in users_within_radius(db, 12.97, 77.59, 50, role="mandi_owner"):
+        ...
+"""
+
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Double, cast, func
+from sqlalchemy.orm import Session
+
+from config import settings
+from geo_index import haversine_km
+from models import User
+
+KM_PER_DEG_LAT = 111.2
+
+# The earthdistance sphere (earth() = 6378168 m) is ~0.1% larger than ours,
+# so SQL-side radius boxes get a little slack before the exact re-check.
+_SQL_RADIUS_SLACK = 1.01
+
+
+def use_earthdistance(db: Session) -> bool:
+    backend = settings.GEO_SQL_BACKEND
+    if backend == "python":
+        return False
+    if backend == "earthdistance":
+        return True
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _user_earth():
+    # Must match the indexed expression exactly for the planner to use it
+    return func.ll_to_earth(cast(User.latitude, Double), cast(User.longitude, Double))
+
+
+def _located_users(db: Session, role: Optional[str]):
+    query = db.query(User).filter(User.latitude.isnot(None), User.longitude.isnot(None))
+    if role is not None:
+        query = query.filter(User.role == role)
+    return query
+
+
+def _rank(users: List[User], lat: float, lng: float) -> List[Tuple[User, float]]:
+    if not users:
+        return []
+    lats = np.radians(np.array([float(u.latitude) for u in users]))
+    lngs = np.radians(np.array([float(u.longitude) for u in users]))
+    dist = haversine_km(math.radians(lat), math.radians(lng), lats, lngs)
+    order = np.argsort(dist, kind="stable")
+    return [(users[i], float(dist[i])) for i in order]
+
+
+def users_within_radius(
+    db: Session, lat: float, lng: float, radius_km: float,
+    role: Optional[str] = None, limit: Optional[int] = None,
+) -> List[Tuple[User, float]]:
+    """Users within `radius_km` of (lat, lng) as (user, distance_km), closest first."""
+    query = _located_users(db, role)
+    if use_earthdistance(db):
+        query = query.filter(
+            func.earth_box(func.ll_to_earth(lat, lng), radius_km * 1000 * _SQL_RADIUS_SLACK).op("@>")(_user_earth())
+        )
+    else:
+        dlat = radius_km / KM_PER_DEG_LAT
+        dlng = radius_km / (KM_PER_DEG_LAT * max(0.01, math.cos(math.radians(min(89.0, abs(lat) + dlat)))))
+        query = query.filter(
+            User.latitude.between(lat - dlat, lat + dlat),
+            User.longitude.between(lng - dlng, lng + dlng),
+        )
+    ranked = [(u, d) for u, d in _rank(query.all(), lat, lng) if d <= radius_km]
+    return ranked[:limit] if limit is not None else ranked
+
+
+def nearest_users(
+    db: Session, lat: float, lng: float, k: int, role: Optional[str] = None,
+) -> List[Tuple[User, float]]:
+    """The k users closest to (lat, lng) as (user, distance_km), closest first."""
+    if k <= 0:
+        return []
+    query = _located_users(db, role)
+    if use_earthdistance(db):
+        # Chord distance orders the same as great-circle distance
+        users = query.order_by(_user_earth().op("<->")(func.ll_to_earth(lat, lng))).limit(k).all()
+        return _rank(users, lat, lng)
+    return _rank(query.all(), lat, lng)[:k]
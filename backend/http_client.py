@@ -0,0 +1,78 @@
+"""
+Shared outbound HTTP clients — one pooled `httpx.AsyncClient` per provider.
+
+Clients are opened at app lifespan startup and closed on shutdown, so Groq
+and Tavily calls reuse keep-alive connections instead of paying a TCP + TLS
+handshake on every request. HTTP/2 is used when the `h2` package is installed.
+
+Usage:
+    from http_client import get_client
+    client = get_client("groq")
+    response = await client.post(GROQ_URL, json=payload)
+"""
+
+import logging
+from typing import Dict
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger("http_client")
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Default read/write timeout (seconds) per provider; requests may override it.
+PROVIDER_TIMEOUTS = {
+    "groq": settings.GROQ_TIMEOUT_SECONDS,
+    "tavily": settings.TAVILY_TIMEOUT_SECONDS,
+}
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _build_client(provider: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(PROVIDER_TIMEOUTS[provider], connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        http2=HTTP2_AVAILABLE,
+    )
+
+
+async def init_http_clients():
+    """Open one pooled client per provider. Called from the app lifespan."""
+    for provider in PROVIDER_TIMEOUTS:
+        if provider not in _clients:
+            _clients[provider] = _build_client(provider)
+    logger.info(f"Outbound HTTP clients ready: {', '.join(_clients)} (http2={HTTP2_AVAILABLE})")
+
+
+async def close_http_clients():
+    """Close every pooled client, draining keep-alive connections."""
+    for provider, client in list(_clients.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close {provider} HTTP client: {e}")
+    _clients.clear()
+
+
+def get_client(provider: str) -> httpx.AsyncClient:
+    """
+    Return the shared client for `provider`. Outside the app lifespan
+    (scripts, ad-hoc runs) a client is created lazily on first use.
+    """
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        if provider not in PROVIDER_TIMEOUTS:
+            raise ValueError(f"Unknown HTTP provider '{provider}'")
+        client = _clients[provider] = _build_client(provider)
+    return client
@@ -1,22 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Optional
 from pydantic import BaseModel
+from datetime import date
 
-from database import get_db
-from models import MandiOwner, MandiItem, MandiFarmerOrder, User
+from database import get_db, get_read_db
+from models import MandiOwner, MandiItem, MandiFarmerOrder
 from schemas import (
     MandiOwnerProfileUpdate, MandiOwnerProfileResponse,
     MandiItemCreate, MandiItemUpdate, MandiItemResponse,
-    MandiFarmerOrderCreate, MandiFarmerOrderUpdate, MandiFarmerOrderResponse,
+    MandiFarmerOrderCreate, MandiFarmerOrderUpdate, MandiFarmerOrderResponse, Page,
 )
-from auth import get_current_user, require_role
+from auth import Principal, invalidate_principal, require_role
+from async_crud import async_crud_router
+from bulk_orders import bulk_orders_router
+from export import export_router
+from pagination import Keyset, paginate
+from geo_index import index_user_location
 
 router = APIRouter(prefix="/api/mandi", tags=["Mandi"])
 
+ORDER_KEYSET = Keyset(MandiFarmerOrder.id, MandiFarmerOrder.order_date)
+
 
 # ── Helper ──────────────────────────────────────────────────────────────────
-def _get_mandi_profile(user: User, db: Session) -> MandiOwner:
+def _get_mandi_profile(user: Principal, db: Session) -> MandiOwner:
     """Return the MandiOwner row for the authenticated user, or 404."""
     mandi = db.query(MandiOwner).filter(MandiOwner.user_id == user.id).first()
     if not mandi:
@@ -24,14 +32,21 @@ def _get_mandi_profile(user: User, db: Session) -> MandiOwner:
     return mandi
 
 
+def _mandi_owner_id(user: Principal) -> int:
+    """Return the mandi owner profile id cached on the principal, or 404."""
+    if user.profile_id is None:
+        raise HTTPException(status_code=404, detail="Mandi owner profile not found")
+    return user.profile_id
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 #  PROFILE
 # ═════════════════════════════════════════════════════════════════════════════
 
 @router.get("/profile", response_model=MandiOwnerProfileResponse)
 def get_profile(
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_role("mandi_owner")),
+    db: Session = Depends(get_read_db),
 ):
     """Get the logged-in mandi owner's profile."""
     mandi = _get_mandi_profile(current_user, db)
@@ -41,22 +56,24 @@ def get_profile(
 @router.put("/profile", response_model=MandiOwnerProfileResponse)
 def update_profile(
     payload: MandiOwnerProfileUpdate,
-    current_user: User = Depends(require_role("mandi_owner")),
+    current_user: Principal = Depends(require_role("mandi_owner")),
     db: Session = Depends(get_db),
 ):
     """Update the mandi owner's profile (contact, lat/lng, language)."""
     mandi = _get_mandi_profile(current_user, db)
 
     if payload.contact is not None:
-        current_user.contact = payload.contact
+        mandi.user.contact = payload.contact
     if payload.latitude is not None:
-        current_user.latitude = payload.latitude
+        mandi.user.latitude = payload.latitude
     if payload.longitude is not None:
-        current_user.longitude = payload.longitude
+        mandi.user.longitude = payload.longitude
     if payload.language is not None:
         mandi.language = payload.language
 
     db.commit()
+    invalidate_principal(current_user.id)
+    index_user_location(mandi.user)
     db.refresh(mandi)
     return mandi
 
@@ -65,26 +82,29 @@ def update_profile(
 #  MANDI ITEMS  (CRUD)
 # ═════════════════════════════════════════════════════════════════════════════
 
-@router.get("/items", response_model=List[MandiItemResponse])
+@router.get("/items", response_model=Page[MandiItemResponse])
 def list_items(
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+    current_user: Principal = Depends(require_role("mandi_owner", claims_only=True)),
+    db: Session = Depends(get_read_db),
 ):
-    """List all items belonging to the logged-in mandi owner."""
-    mandi = _get_mandi_profile(current_user, db)
-    return db.query(MandiItem).filter(MandiItem.mandi_owner_id == mandi.id).all()
+    """List the logged-in mandi owner's items, one page at a time (oldest first)."""
+    mandi_id = _mandi_owner_id(current_user)
+    query = db.query(MandiItem).filter(MandiItem.mandi_owner_id == mandi_id)
+    return paginate(query, Keyset(MandiItem.id), limit, after_id)
 
 
 @router.post("/items", response_model=MandiItemResponse, status_code=status.HTTP_201_CREATED)
 def create_item(
     payload: MandiItemCreate,
-    current_user: User = Depends(require_role("mandi_owner")),
+    current_user: Principal = Depends(require_role("mandi_owner", claims_only=True)),
     db: Session = Depends(get_db),
 ):
     """Add a new item to the mandi's inventory."""
-    mandi = _get_mandi_profile(current_user, db)
+    mandi_id = _mandi_owner_id(current_user)
     item = MandiItem(
-        mandi_owner_id=mandi.id,
+        mandi_owner_id=mandi_id,
         item_name=payload.item_name,
         current_qty=payload.current_qty,
     )
@@ -97,13 +117,13 @@ def create_item(
 @router.get("/items/{item_id}", response_model=MandiItemResponse)
 def get_item(
     item_id: int,
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_role("mandi_owner", claims_only=True)),
+    db: Session = Depends(get_read_db),
 ):
     """Get a single mandi item by ID."""
-    mandi = _get_mandi_profile(current_user, db)
+    mandi_id = _mandi_owner_id(current_user)
     item = db.query(MandiItem).filter(
-        MandiItem.id == item_id, MandiItem.mandi_owner_id == mandi.id
+        MandiItem.id == item_id, MandiItem.mandi_owner_id == mandi_id
     ).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -114,13 +134,13 @@ def get_item(
 def update_item(
     item_id: int,
     payload: MandiItemUpdate,
-    current_user: User = Depends(require_role("mandi_owner")),
+    current_user: Principal = Depends(require_role("mandi_owner", claims_only=True)),
     db: Session = Depends(get_db),
 ):
     """Update an existing mandi item."""
-    mandi = _get_mandi_profile(current_user, db)
+    mandi_id = _mandi_owner_id(current_user)
     item = db.query(MandiItem).filter(
-        MandiItem.id == item_id, MandiItem.mandi_owner_id == mandi.id
+        MandiItem.id == item_id, MandiItem.mandi_owner_id == mandi_id
     ).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -137,13 +157,13 @@ def update_item(
 @router.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_item(
     item_id: int,
-    current_user: User = Depends(require_role("mandi_owner")),
+    current_user: Principal = Depends(require_role("mandi_owner", claims_only=True)),
     db: Session = Depends(get_db),
 ):
     """Delete a mandi item."""
-    mandi = _get_mandi_profile(current_user, db)
+    mandi_id = _mandi_owner_id(current_user)
     item = db.query(MandiItem).filter(
-        MandiItem.id == item_id, MandiItem.mandi_owner_id == mandi.id
+        MandiItem.id == item_id, MandiItem.mandi_owner_id == mandi_id
     ).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -155,37 +175,53 @@ def delete_item(
 #  MANDI ↔ FARMER ORDERS  (CRUD)
 # ═════════════════════════════════════════════════════════════════════════════
 
-@router.get("/orders", response_model=List[MandiFarmerOrderResponse])
+@router.get("/orders", response_model=Page[MandiFarmerOrderResponse])
 def list_orders(
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+    after_date: Optional[date] = None,
+    current_user: Principal = Depends(require_role("mandi_owner", claims_only=True)),
+    db: Session = Depends(get_read_db),
 ):
-    """List all mandi-farmer orders."""
-    return db.query(MandiFarmerOrder).all()
+    """List the logged-in mandi owner's orders, one page at a time (newest order_date first)."""
+    query = db.query(MandiFarmerOrder).filter(MandiFarmerOrder.mandi_owner_id == _mandi_owner_id(current_user))
+    return paginate(query, ORDER_KEYSET, limit, after_id, after_date)
 
 
 @router.post("/orders", response_model=MandiFarmerOrderResponse, status_code=status.HTTP_201_CREATED)
 def create_order(
     payload: MandiFarmerOrderCreate,
-    current_user: User = Depends(require_role("mandi_owner")),
+    current_user: Principal = Depends(require_role("mandi_owner", claims_only=True)),
     db: Session = Depends(get_db),
 ):
-    """Create a new mandi-farmer order."""
-    order = MandiFarmerOrder(**payload.model_dump())
+    """Create a mandi-farmer order owned by the logged-in mandi owner."""
+    order = MandiFarmerOrder(**payload.model_dump(), mandi_owner_id=_mandi_owner_id(current_user))
     db.add(order)
     db.commit()
     db.refresh(order)
     return order
 
 
+# Before /orders/{order_id}, which would otherwise take "export" as an id
+ORDER_EXPORT = export_router(
+    path="/orders/export", model=MandiFarmerOrder, role="mandi_owner", name="mandi_orders",
+    owner_column="mandi_owner_id", owner_id=_mandi_owner_id, date_column="order_date", item_column="item",
+)
+router.include_router(ORDER_EXPORT)
+
+
 @router.get("/orders/{order_id}", response_model=MandiFarmerOrderResponse)
 def get_order(
     order_id: int,
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_role("mandi_owner", claims_only=True)),
+    db: Session = Depends(get_read_db),
 ):
-    """Get a single order by ID."""
-    order = db.query(MandiFarmerOrder).filter(MandiFarmerOrder.id == order_id).first()
+    """Get one of the caller's orders by ID."""
+    order = (
+        db.query(MandiFarmerOrder)
+        .filter(MandiFarmerOrder.id == order_id, MandiFarmerOrder.mandi_owner_id == _mandi_owner_id(current_user))
+        .first()
+    )
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
@@ -195,11 +231,15 @@ def get_order(
 def update_order(
     order_id: int,
     payload: MandiFarmerOrderUpdate,
-    current_user: User = Depends(require_role("mandi_owner")),
+    current_user: Principal = Depends(require_role("mandi_owner", claims_only=True)),
     db: Session = Depends(get_db),
 ):
     """Update an existing mandi-farmer order."""
-    order = db.query(MandiFarmerOrder).filter(MandiFarmerOrder.id == order_id).first()
+    order = (
+        db.query(MandiFarmerOrder)
+        .filter(MandiFarmerOrder.id == order_id, MandiFarmerOrder.mandi_owner_id == _mandi_owner_id(current_user))
+        .first()
+    )
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
@@ -215,24 +255,51 @@ def update_order(
 @router.delete("/orders/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_order(
     order_id: int,
-    current_user: User = Depends(require_role("mandi_owner")),
+    current_user: Principal = Depends(require_role("mandi_owner", claims_only=True)),
     db: Session = Depends(get_db),
 ):
     """Delete a mandi-farmer order."""
-    order = db.query(MandiFarmerOrder).filter(MandiFarmerOrder.id == order_id).first()
+    order = (
+        db.query(MandiFarmerOrder)
+        .filter(MandiFarmerOrder.id == order_id, MandiFarmerOrder.mandi_owner_id == _mandi_owner_id(current_user))
+        .first()
+    )
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     db.delete(order)
     db.commit()
 
 
+# Many orders per request (JSON array / NDJSON / CSV): see bulk_orders
+router.include_router(bulk_orders_router(
+    model=MandiFarmerOrder, create_schema=MandiFarmerOrderCreate, role="mandi_owner",
+    owner_column="mandi_owner_id", owner_id=_mandi_owner_id,
+))
+
+
+# Async twin of the item / order CRUD above, served instead when DB_ASYNC_CRUD is on
+async_router = APIRouter(prefix="/api/mandi", tags=["Mandi"])
+async_router.include_router(async_crud_router(
+    path="/items", model=MandiItem, create_schema=MandiItemCreate, update_schema=MandiItemUpdate,
+    response_schema=MandiItemResponse, role="mandi_owner", label="Item", id_name="item_id",
+    owner_column="mandi_owner_id", owner_id=_mandi_owner_id,
+))
+async_router.include_router(ORDER_EXPORT)
+async_router.include_router(async_crud_router(
+    path="/orders", model=MandiFarmerOrder, create_schema=MandiFarmerOrderCreate,
+    update_schema=MandiFarmerOrderUpdate, response_schema=MandiFarmerOrderResponse,
+    role="mandi_owner", label="Order", id_name="order_id",
+    owner_column="mandi_owner_id", owner_id=_mandi_owner_id, date_column="order_date",
+))
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 #  SUPPLY CHAIN INTELLIGENCE
 # ═════════════════════════════════════════════════════════════════════════════
 
 from mandi.supply_chain import (
     get_supply_overview, detect_stress_signals, forecast_prices,
-    get_truck_fleet, get_interventions, run_scenario,
+    get_truck_fleet, get_interventions, run_scenario, get_nearby_retailers,
 )
 
 
@@ -253,8 +320,8 @@ def supply_stress():
 
 
 @router.get("/supply-chain/forecast")
-def supply_forecast(days: int = 7):
-    return forecast_prices(days)
+def supply_forecast(days: int = 7, db: Session = Depends(get_read_db)):
+    return forecast_prices(db, days)
 
 
 @router.get("/supply-chain/trucks")
@@ -262,6 +329,11 @@ def supply_trucks():
     return get_truck_fleet()
 
 
+@router.get("/supply-chain/retailers")
+def supply_retailers(lat: float = 12.97, lng: float = 77.59, radius_km: Optional[float] = None, limit: int = 10):
+    return get_nearby_retailers(lat, lng, radius_km, min(max(limit, 1), 100))
+
+
 @router.get("/supply-chain/interventions")
 def supply_interventions():
     return get_interventions()
@@ -7,17 +7,23 @@ import random
 import math
 from datetime import datetime, timedelta
 
+import numpy as np
 
-# ── Crop catalog ──
+import price_history
+import price_simulator
+from geo_index import retailer_index
+
+
+# ── Crop catalog ── (key: crop name in mandi_prices)
 CROPS = [
-    {"name": "Tomato", "emoji": "🍅", "base_price": 45, "volatility": 0.15, "season": "kharif"},
-    {"name": "Onion", "emoji": "🧅", "base_price": 35, "volatility": 0.25, "season": "rabi"},
-    {"name": "Potato", "emoji": "🥔", "base_price": 25, "volatility": 0.10, "season": "rabi"},
-    {"name": "Rice", "emoji": "🍚", "base_price": 55, "volatility": 0.05, "season": "kharif"},
-    {"name": "Wheat", "emoji": "🌾", "base_price": 30, "volatility": 0.08, "season": "rabi"},
-    {"name": "Carrot", "emoji": "🥕", "base_price": 40, "volatility": 0.12, "season": "rabi"},
-    {"name": "Cabbage", "emoji": "🥬", "base_price": 20, "volatility": 0.18, "season": "kharif"},
-    {"name": "Green Chilli", "emoji": "🌶️", "base_price": 60, "volatility": 0.30, "season": "kharif"},
+    {"name": "Tomato", "key": "tomato", "emoji": "🍅", "base_price": 45, "volatility": 0.15, "season": "kharif"},
+    {"name": "Onion", "key": "onion", "emoji": "🧅", "base_price": 35, "volatility": 0.25, "season": "rabi"},
+    {"name": "Potato", "key": "potato", "emoji": "🥔", "base_price": 25, "volatility": 0.10, "season": "rabi"},
+    {"name": "Rice", "key": "rice", "emoji": "🍚", "base_price": 55, "volatility": 0.05, "season": "kharif"},
+    {"name": "Wheat", "key": "wheat", "emoji": "🌾", "base_price": 30, "volatility": 0.08, "season": "rabi"},
+    {"name": "Carrot", "key": "carrot", "emoji": "🥕", "base_price": 40, "volatility": 0.12, "season": "rabi"},
+    {"name": "Cabbage", "key": "cabbage", "emoji": "🥬", "base_price": 20, "volatility": 0.18, "season": "kharif"},
+    {"name": "Green Chilli", "key": "chilli", "emoji": "🌶️", "base_price": 60, "volatility": 0.30, "season": "kharif"},
 ]
 
 RETAILERS = [
@@ -29,6 +35,9 @@ RETAILERS = [
     {"id": 6, "name": "Nature's Cart - Malleshwaram", "lat": 13.0035, "lng": 77.5710, "demand": "high"},
 ]
 
+for _r in RETAILERS:
+    retailer_index.upsert(("mock", _r["id"]), _r["lat"], _r["lng"], _r)
+
 TRUCKS = [
     {"id": "TRK-001", "driver": "Raju", "capacity_kg": 2000, "type": "Mini Truck"},
     {"id": "TRK-002", "driver": "Suresh", "capacity_kg": 5000, "type": "Medium Truck"},
@@ -174,32 +183,37 @@ def detect_stress_signals(mandi_lat=12.97, mandi_lng=77.59):
     }
 
 
-def forecast_prices(days=7):
-    """Price forecasts for all crops"""
-    rng = _seed()
+def forecast_prices(db, days=7):
+    """Price forecasts for all crops, from the last 14 days of mandi_prices"""
     today = datetime.utcnow().date()
     forecasts = []
 
+    crops, histories = [], []
     for c in CROPS:
-        history = []
-        price = c["base_price"] + rng.uniform(-5, 5)
-        for d in range(14):
-            price += rng.uniform(-2, 2.5) * c["volatility"] * 10
-            price = max(c["base_price"] * 0.5, min(c["base_price"] * 2, price))
-            date = (today - timedelta(days=13 - d)).isoformat()
-            history.append({"date": date, "price": round(price, 2)})
-
-        # Forecast
-        last5 = [h["price"] for h in history[-5:]]
-        trend = (last5[-1] - last5[0]) / 5 if len(last5) > 1 else 0
-        predicted = []
-        fp = last5[-1]
-        for d in range(days):
-            fp += trend + rng.uniform(-1, 1) * c["volatility"] * 5
-            fp = max(c["base_price"] * 0.5, min(c["base_price"] * 2, fp))
-            date = (today + timedelta(days=d + 1)).isoformat()
-            predicted.append({"date": date, "price": round(fp, 2)})
-
+        # Market price: mean across mandis per day; days nobody priced are left out
+        series = price_history.read_prices(db, c["key"], today - timedelta(days=13), today)
+        history = [
+            {"date": d.isoformat(), "price": round(float(p), 2)}
+            for d, p in zip(series.dates, series.market()) if not math.isnan(p)
+        ]
+        if len(history) >= 2:
+            crops.append(c)
+            histories.append(history)
+    if not crops:
+        return {"forecasts": forecasts, "generated_at": datetime.utcnow().isoformat()}
+
+    # Forecast: every crop's walk in one go, continuing its last-5-day trend
+    last = np.array([h[-1]["price"] for h in histories])
+    trend = np.array([(h[-1]["price"] - h[-5:][0]["price"]) / 5 for h in histories])
+    walks = price_simulator.simulate(
+        np.random.default_rng(today.toordinal()), last[None, :], days,
+        noise=np.array([c["volatility"] for c in crops]) * 5, drift=trend,
+        low=last * 0.5, high=last * 2,
+    )[0].round(2)
+    dates = [(today + timedelta(days=d + 1)).isoformat() for d in range(days)]
+
+    for k, (c, history) in enumerate(zip(crops, histories)):
+        predicted = [{"date": date, "price": price} for date, price in zip(dates, walks[:, k].tolist())]
         trend_pct = round(((predicted[-1]["price"] - history[-1]["price"]) / history[-1]["price"]) * 100, 1)
         forecasts.append({
             "crop": c["name"], "emoji": c["emoji"],
@@ -257,6 +271,16 @@ def get_truck_fleet(mandi_lat=12.97, mandi_lng=77.59):
     }
 
 
+def get_nearby_retailers(mandi_lat=12.97, mandi_lng=77.59, radius_km=None, limit=10):
+    """Retailers closest to the mandi (mock + registered), optionally within radius_km"""
+    if radius_km is not None:
+        nearby = retailer_index.within_radius_km(mandi_lat, mandi_lng, radius_km)[:limit]
+    else:
+        nearby = retailer_index.k_nearest(mandi_lat, mandi_lng, k=limit)
+    retailers = [{**r, "distance_km": round(dist, 1)} for r, dist in nearby]
+    return {"retailers": retailers, "total": len(retailers), "mandi": {"lat": mandi_lat, "lng": mandi_lng}}
+
+
 def get_interventions():
     """AI-generated stabilizing interventions"""
     rng = _seed()
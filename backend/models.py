@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, Boolean, ForeignKey, Text, CheckConstraint, TIMESTAMP
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, Boolean, ForeignKey, Text, CheckConstraint, TIMESTAMP, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -11,8 +11,11 @@ class User(Base):
     password_hash = Column(String(255), nullable=False)
     role = Column(String(50), nullable=False)
     contact = Column(String(20))
+    # Indexed on Postgres via GiST over ll_to_earth(latitude, longitude) — see geo_sql.py
     latitude = Column(Numeric(10, 7))
     longitude = Column(Numeric(10, 7))
+    # Bumped to revoke every token issued so far (tokens carry it as "ver")
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     __table_args__ = (
         CheckConstraint("role IN ('farmer', 'mandi_owner', 'retailer', 'admin')", name='check_user_role'),
@@ -23,6 +26,7 @@ class User(Base):
     mandi_owner = relationship("MandiOwner", back_populates="user", uselist=False, cascade="all, delete-orphan")
     retailer = relationship("Retailer", back_populates="user", uselist=False, cascade="all, delete-orphan")
     alerts = relationship("Alert", back_populates="user", cascade="all, delete-orphan")
+    refresh_tokens = relationship("RefreshToken", back_populates="user", cascade="all, delete-orphan")
 
 
 class Farmer(Base):
@@ -78,6 +82,8 @@ class MandiFarmerOrder(Base):
     __tablename__ = "mandi_farmer_orders"
     
     id = Column(Integer, primary_key=True, index=True)
+    # The buying mandi; NULL for legacy rows the backfill couldn't attribute
+    mandi_owner_id = Column(Integer, ForeignKey("mandi_owners.id", ondelete="CASCADE"))
     src_lat = Column(Numeric(10, 7))
     src_long = Column(Numeric(10, 7))
     dest_lat = Column(Numeric(10, 7))
@@ -87,6 +93,15 @@ class MandiFarmerOrder(Base):
     price_per_kg = Column(Numeric(10, 2))
     order_date = Column(Date)
 
+    __table_args__ = (
+        # Weekly per-item aggregates in the agents: range on order_date, group by item.
+        # INCLUDE lets Postgres answer them from the index alone.
+        Index("ix_mandi_farmer_orders_order_date_item", "order_date", "item",
+              postgresql_include=["price_per_kg", "id"]),
+        # A mandi's own orders, newest first (list pagination and per-owner aggregates)
+        Index("ix_mandi_farmer_orders_owner_order_date_id", "mandi_owner_id", "order_date", "id"),
+    )
+
 
 class Retailer(Base):
     __tablename__ = "retailer"
@@ -117,6 +132,8 @@ class RetailerMandiOrder(Base):
     __tablename__ = "retailer_mandi_order"
     
     id = Column(Integer, primary_key=True, index=True)
+    # The buying retailer; NULL for legacy rows the backfill couldn't attribute
+    retailer_id = Column(Integer, ForeignKey("retailer.id", ondelete="CASCADE"))
     src_lat = Column(Numeric(10, 7))
     src_long = Column(Numeric(10, 7))
     dest_lat = Column(Numeric(10, 7))
@@ -126,6 +143,47 @@ class RetailerMandiOrder(Base):
     price_per_kg = Column(Numeric(10, 2))
     order_date = Column(Date)
 
+    __table_args__ = (
+        Index("ix_retailer_mandi_order_order_date_item", "order_date", "item",
+              postgresql_include=["price_per_kg", "id"]),
+        Index("ix_retailer_mandi_order_owner_order_date_id", "retailer_id", "order_date", "id"),
+    )
+
+
+class DailyItemStat(Base):
+    """
+    Per-day, per-item rollup of order prices, kept in step with the order
+    tables by `rollup` (see there). One row per (side, owner, day, item);
+    owner_id 0 holds the platform-wide totals.
+    """
+    __tablename__ = "daily_item_stats"
+
+    side = Column(String(16), primary_key=True)  # "retailer" (RetailerMandiOrder) | "mandi" (MandiFarmerOrder)
+    owner_id = Column(Integer, primary_key=True)  # retailer.id / mandi_owners.id; 0 = all owners
+    day = Column(Date, primary_key=True)
+    item = Column(String(100), primary_key=True)  # "" for orders without an item
+    order_count = Column(Integer, nullable=False, default=0)
+    priced_count = Column(Integer, nullable=False, default=0)  # orders with a price_per_kg
+    price_sum = Column(Numeric(16, 2), nullable=False, default=0)
+    price_sumsq = Column(Numeric(20, 4), nullable=False, default=0)
+    price_min = Column(Numeric(10, 2))
+    price_max = Column(Numeric(10, 2))
+
+
+class MandiPrice(Base):
+    """
+    Daily price per crop per mandi — the store behind price history and
+    forecasts (see `price_history`). Rows come from mandi orders or, for
+    mandis without orders, from the seeded simulator.
+    """
+    __tablename__ = "mandi_prices"
+
+    crop = Column(String(100), primary_key=True)  # lower-case item name, e.g. "tomato"
+    day = Column(Date, primary_key=True)
+    mandi = Column(String(100), primary_key=True)  # mandi owner's username, or a mock mandi's name
+    price = Column(Numeric(10, 2), nullable=False)  # ₹/kg; for orders, that day's average
+    source = Column(String(16), nullable=False)  # "orders" | "simulated"
+
 
 class Alert(Base):
     __tablename__ = "alerts"
@@ -137,4 +195,41 @@ class Alert(Base):
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
     
     # Relationships
-    user = relationship("User", back_populates="alerts")
\ No newline at end of file
+    user = relationship("User", back_populates="alerts")
+
+
+# Alert feed: newest alerts of one user
+Index("ix_alerts_user_id_created_at", Alert.user_id, Alert.created_at.desc())
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Every token rotated from the same login shares a family; reuse of a rotated token revokes it
+    family_id = Column(String(32), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)  # sha256 hex, never the raw token
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+    expires_at = Column(TIMESTAMP, nullable=False)
+    revoked_at = Column(TIMESTAMP)
+    
+    # Relationships
+    user = relationship("User", back_populates="refresh_tokens")
+
+
+class TokenRevocation(Base):
+    """
+    Access-token revocations, shared by every worker: each polls this table
+    into its in-memory deny-list (auth.TokenDenyList.sync). A row is either one
+    token (jti) or "every token of user_id below min_version"; it is only
+    needed until the tokens it covers would have expired anyway.
+    """
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    jti = Column(String(64))
+    min_version = Column(Integer)
+    created_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow, index=True)
+    expires_at = Column(TIMESTAMP, nullable=False, index=True)
@@ -0,0 +1,103 @@
+"""
+Keyset (cursor) pagination for the list endpoints.
+
+Pages are fetched with `WHERE key > cursor ORDER BY key LIMIT n + 1` instead of
+OFFSET, so every page costs the same index range scan however deep the client
+has paged, and the server never materialises more than one page.
+
+Two orderings:
+  * by id, oldest first                 — items / crops; cursor `after_id`
+  * by (date, id), newest first         — orders; cursor `after_date` + `after_id`.
+    Rows without a date come after every dated row, by id descending
+    (cursor: `after_id` alone). `after_date` alone means "older than that day".
+
+The extra (n + 1)th row only tells us whether another page exists; the
+response carries `next_cursor` built from the last row returned, or null.
+
+Usage:
+    keyset = Keyset(Order.id, Order.order_date)
+    return paginate(db.query(Order), keyset, limit, after_id, after_date)
+    return await apaginate(db, select(Order), keyset, limit, after_id, after_date)
+"""
+
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import tuple_
+
+from config import settings
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return settings.PAGE_SIZE_DEFAULT
+    return min(max(limit, 1), settings.PAGE_SIZE_MAX)
+
+
+class Keyset:
+    def __init__(self, id_col, date_col=None):
+        self.id_col = id_col
+        self.date_col = date_col
+
+    def statements(self, base, after_id: Optional[int], after_date: Optional[date]) -> List:
+        """
+        Ordered statements to run in turn until a page is full. Works on a
+        legacy Query or a 2.0 select() alike (both have filter / order_by / limit).
+        """
+        id_col, date_col = self.id_col, self.date_col
+        if date_col is None:
+            if after_id is not None:
+                base = base.filter(id_col > after_id)
+            return [base.order_by(id_col)]
+
+        stmts = []
+        in_undated = after_date is None and after_id is not None
+        if not in_undated:
+            dated = base.filter(date_col.isnot(None))
+            if after_date is not None and after_id is not None:
+                dated = dated.filter(tuple_(date_col, id_col) < tuple_(after_date, after_id))
+            elif after_date is not None:
+                dated = dated.filter(date_col < after_date)
+            stmts.append(dated.order_by(date_col.desc(), id_col.desc()))
+        undated = base.filter(date_col.is_(None))
+        if in_undated:
+            undated = undated.filter(id_col < after_id)
+        stmts.append(undated.order_by(id_col.desc()))
+        return stmts
+
+    def cursor(self, row) -> dict:
+        cursor = {"after_id": getattr(row, self.id_col.key)}
+        if self.date_col is not None:
+            cursor["after_date"] = getattr(row, self.date_col.key)
+        return cursor
+
+
+def _page(rows: list, limit: int, keyset: Keyset) -> dict:
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return {"items": rows, "next_cursor": keyset.cursor(rows[-1])}
+    return {"items": rows, "next_cursor": None}
+
+
+def paginate(query, keyset: Keyset, limit: Optional[int], after_id: Optional[int] = None,
+             after_date: Optional[date] = None) -> dict:
+    """One page of a sync Query as {"items", "next_cursor"}."""
+    limit = clamp_limit(limit)
+    rows = []
+    for stmt in keyset.statements(query, after_id, after_date):
+        rows += stmt.limit(limit + 1 - len(rows)).all()
+        if len(rows) > limit:
+            break
+    return _page(rows, limit, keyset)
+
+
+async def apaginate(db, stmt, keyset: Keyset, limit: Optional[int], after_id: Optional[int] = None,
+                    after_date: Optional[date] = None) -> dict:
+    """`paginate` for a select() on an AsyncSession."""
+    limit = clamp_limit(limit)
+    rows = []
+    for part in keyset.statements(stmt, after_id, after_date):
+        rows += (await db.scalars(part.limit(limit + 1 - len(rows)))).all()
+        if len(rows) > limit:
+            break
+    return _page(rows, limit, keyset)
@@ -0,0 +1,136 @@
+"""
+Bounded worker pool for bcrypt password hashing / verification.
+
+bcrypt is deliberately slow (~100-250 ms of CPU per call). Run inline in a
+sync endpoint it holds one of Starlette's threadpool slots for the whole
+hash, so a login storm starves every other sync endpoint. Here password work
+goes to its own small pool instead and the endpoint awaits it:
+
+  * PASSWORD_POOL_KIND=thread  — dedicated threads (the bcrypt C code releases the GIL)
+  * PASSWORD_POOL_KIND=process — separate processes, isolated from the API process
+  * PASSWORD_POOL_KIND=inline  — old behaviour, runs on the shared request threadpool
+
+Work beyond PASSWORD_POOL_MAX_QUEUE waiting jobs is rejected with 503 rather
+than queued without bound. `stats()` reports queue depth and wait/run times.
+
+Usage:
+    from password_pool import password_hasher
+    hashed = await password_hasher.hash(password)
+    ok = await password_hasher.verify(password, hashed)
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+
+logger = logging.getLogger("password_pool")
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Recent samples kept for the percentile figures in stats()
+_SAMPLES = 1000
+
+
+def _timed(fn_name: str, *args):
+    """Runs inside the pool; returns (result, wall-clock start, run seconds)."""
+    started = time.time()
+    result = getattr(pwd_context, fn_name)(*args)
+    return result, started, time.time() - started
+
+
+class PasswordHasher:
+    def __init__(self, kind: str, workers: int, max_queue: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.pending = 0  # submitted, not finished
+        self.completed = 0
+        self.rejected = 0
+        self._wait_ms = deque(maxlen=_SAMPLES)
+        self._run_ms = deque(maxlen=_SAMPLES)
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+                logger.info(f"Password pool started: {self.kind} × {self.workers}")
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    async def _run(self, fn_name: str, *args):
+        limit = self.workers + self.max_queue
+        if self.kind != "inline" and self.pending >= limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in attempts right now, please retry",
+                headers={"Retry-After": "2"},
+            )
+        self.pending += 1
+        submitted = time.time()
+        try:
+            if self.kind == "inline":
+                result, started, run_s = await run_in_threadpool(_timed, fn_name, *args)
+            else:
+                loop = asyncio.get_running_loop()
+                result, started, run_s = await loop.run_in_executor(self._get_executor(), _timed, fn_name, *args)
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self._wait_ms.append(max(0.0, started - submitted) * 1000)
+        self._run_ms.append(run_s * 1000)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run("verify", password, hashed)
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": min(self.pending, self.workers),
+            "queued": max(0, self.pending - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms": _percentiles(self._wait_ms),
+            "run_ms": _percentiles(self._run_ms),
+        }
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"p50": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 1)  # noqa: E731
+    return {"p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1], 1)}
+
+
+password_hasher = PasswordHasher(
+    kind=settings.PASSWORD_POOL_KIND,
+    workers=settings.PASSWORD_POOL_WORKERS,
+    max_queue=settings.PASSWORD_POOL_MAX_QUEUE,
+)
@@ -0,0 +1,232 @@
+"""
+`mandi_prices` — the daily price-history store.
+
+One row per (crop, day, mandi): the price a mandi paid for a crop that day.
+GET /api/farmer/price-history and the mandi price forecast both read it
+instead of re-simulating a random walk on every request; a read is one
+primary-key range scan (crop, then day) returned as a mandis x days array.
+
+Two sources fill it:
+
+  * orders    — mandi orders, via daily_item_stats (side "mandi"): the
+                day's average price_per_kg per mandi owner and item.
+                `refresh_from_orders()` rebuilds recent days; it runs
+                hourly and after the nightly rollup reconcile.
+  * simulated — `price_simulator.range_walk` for the mock mandis, so
+                charts have data before real orders do.
+                `extend_simulated()` backfills PRICE_HISTORY_SEED_DAYS on
+                first run and appends the missing days after that; each
+                series continues from its last stored price.
+
+Where both exist for the same (crop, day, mandi), the order price wins.
+
+Usage:
+    series = price_history.read_prices(db, "tomato", start, end)
+    series.prices          # float array, mandis x days, NaN where there is no price
+    series.market()        # per-day mean across mandis
+"""
+
+import logging
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Float, String, and_, delete, func, select, type_coerce
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import price_simulator
+from config import settings
+from models import DailyItemStat, MandiOwner, MandiPrice, User
+
+logger = logging.getLogger(__name__)
+
+INSERT_BATCH_ROWS = 5000
+
+
+def crop_key(item: str) -> str:
+    """Store key for an item / crop name: "Tomato " -> "tomato"."""
+    return item.strip().lower()
+
+
+# ── Reading ─────────────────────────────────────────────────────────────────
+
+@dataclass
+class PriceSeries:
+    """Prices of one crop over a date range, column-oriented."""
+    crop: str
+    dates: List[date]
+    mandis: List[str]
+    prices: np.ndarray  # float64, shape (len(mandis), len(dates)); NaN = no price that day
+
+    def market(self) -> np.ndarray:
+        """Mean price per day across mandis (NaN on days no mandi has a price)."""
+        seen = ~np.isnan(self.prices)
+        counts = seen.sum(axis=0)
+        totals = np.where(seen, self.prices, 0.0).sum(axis=0)
+        return np.divide(totals, counts, out=np.full(len(self.dates), np.nan), where=counts > 0)
+
+
+def prices_stmt(crop: str, start: date, end: date, mandis: Optional[Sequence[str]] = None):
+    """(mandi, day, price) rows of `crop` from `start` to `end` inclusive — a primary-key range."""
+    # day comes back as the driver's raw value (ISO text on SQLite, a date on
+    # Postgres) and numpy converts the whole column at once
+    stmt = select(
+        MandiPrice.mandi, type_coerce(MandiPrice.day, String), type_coerce(MandiPrice.price, Float),
+    ).where(MandiPrice.crop == crop_key(crop), MandiPrice.day >= start, MandiPrice.day <= end)
+    if mandis:
+        stmt = stmt.where(MandiPrice.mandi.in_(list(mandis)))
+    return stmt
+
+
+def read_prices(
+    db: Session,
+    crop: str,
+    start: date,
+    end: date,
+    mandis: Optional[Sequence[str]] = None,
+    limit: Optional[int] = None,
+) -> PriceSeries:
+    """
+    Prices of `crop` from `start` to `end` (inclusive), for `mandis` (default:
+    every mandi with a price in the range). With `limit`, keeps the mandis
+    with the most days priced, ties by name.
+    """
+    crop = crop_key(crop)
+    rows = db.connection().execute(prices_stmt(crop, start, end, mandis)).all()  # Core: plain tuples
+
+    dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    if not rows:
+        return PriceSeries(crop, dates, [], np.empty((0, len(dates))))
+    row_mandis, row_days, row_prices = zip(*rows)
+
+    counts = defaultdict(int)
+    for name in row_mandis:
+        counts[name] += 1
+    names = sorted(counts, key=lambda name: (-counts[name], name))[:limit]
+    position = {name: i for i, name in enumerate(names)}
+
+    m = np.fromiter((position.get(name, -1) for name in row_mandis), dtype=np.intp, count=len(rows))
+    d = (np.array(row_days, dtype="datetime64[D]") - np.datetime64(start, "D")).astype(np.intp)
+    keep = m >= 0
+    prices = np.full((len(names), len(dates)), np.nan)
+    prices[m[keep], d[keep]] = np.asarray(row_prices, dtype=np.float64)[keep]
+    return PriceSeries(crop, dates, names, prices)
+
+
+# ── Writing ─────────────────────────────────────────────────────────────────
+
+def _insert(dialect: str):
+    insert = pg_insert if dialect == "postgresql" else sqlite_insert
+    return insert(MandiPrice.__table__)
+
+
+def _write(db: Session, rows: List[dict], replace: bool) -> None:
+    dialect = db.get_bind().dialect.name
+    for i in range(0, len(rows), INSERT_BATCH_ROWS):
+        stmt = _insert(dialect)
+        if replace:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["crop", "day", "mandi"],
+                set_={"price": stmt.excluded.price, "source": stmt.excluded.source},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["crop", "day", "mandi"])
+        db.execute(stmt, rows[i:i + INSERT_BATCH_ROWS])
+
+
+def refresh_from_orders(db: Session, since: Optional[date] = None) -> int:
+    """Rebuild the order-sourced rows from `since` (None = all days) out of daily_item_stats; commits."""
+    stats = DailyItemStat
+    stmt = (
+        select(stats.item, stats.day, User.username, stats.price_sum, stats.priced_count)
+        .join(MandiOwner, MandiOwner.id == stats.owner_id)
+        .join(User, User.id == MandiOwner.user_id)
+        .where(stats.side == "mandi", stats.owner_id != 0, stats.priced_count > 0, stats.item != "")
+    )
+    if since is not None:
+        stmt = stmt.where(stats.day >= since)
+
+    # Items differing only in case / spacing are one crop
+    totals: Dict[Tuple[str, date, str], list] = defaultdict(lambda: [0, 0])
+    for item, day, mandi, price_sum, priced in db.execute(stmt):
+        total = totals[crop_key(item), day, mandi]
+        total[0] += price_sum
+        total[1] += priced
+
+    clear = delete(MandiPrice).where(MandiPrice.source == "orders")
+    if since is not None:
+        clear = clear.where(MandiPrice.day >= since)
+    db.execute(clear)
+    _write(db, [
+        {"crop": crop, "day": day, "mandi": mandi, "price": round(price_sum / priced, 2), "source": "orders"}
+        for (crop, day, mandi), (price_sum, priced) in totals.items()
+    ], replace=True)
+    db.commit()
+    return len(totals)
+
+
+def extend_simulated(
+    db: Session,
+    crop_ranges: Dict[str, Tuple[float, float]],
+    mandis: Sequence[str],
+    today: Optional[date] = None,
+) -> int:
+    """
+    Simulated prices for every crop in `crop_ranges` ((low, high) ₹/kg) at
+    every mandi in `mandis`, up to `today`; commits. Series continue from
+    their last simulated day; new series start PRICE_HISTORY_SEED_DAYS back.
+    """
+    today = today or date.today()
+    latest = (
+        select(MandiPrice.crop, MandiPrice.mandi, func.max(MandiPrice.day).label("day"))
+        .where(MandiPrice.source == "simulated")
+        .group_by(MandiPrice.crop, MandiPrice.mandi)
+        .subquery()
+    )
+    last = {
+        (crop, mandi): (day, float(price))
+        for crop, mandi, day, price in db.execute(
+            select(MandiPrice.crop, MandiPrice.mandi, MandiPrice.day, MandiPrice.price).join(latest, and_(
+                MandiPrice.crop == latest.c.crop, MandiPrice.mandi == latest.c.mandi, MandiPrice.day == latest.c.day,
+            ))
+        )
+    }
+
+    crops = {crop_key(crop): bounds for crop, bounds in crop_ranges.items()}
+    names, mandis = list(crops), list(mandis)
+    low = np.array([crops[crop][0] for crop in names], dtype=np.float64)
+    high = np.array([crops[crop][1] for crop in names], dtype=np.float64)
+
+    # A series resumes the day after its last simulated price (new ones
+    # PRICE_HISTORY_SEED_DAYS back, from NaN = near mid-range); usually every
+    # series resumes on the same day and this is one mandis x crops block
+    first_day = today - timedelta(days=settings.PRICE_HISTORY_SEED_DAYS - 1)
+    starts = defaultdict(lambda: np.full((len(mandis), len(names)), np.nan))
+    members = defaultdict(lambda: np.zeros((len(mandis), len(names)), dtype=bool))
+    for i, mandi in enumerate(mandis):
+        for j, crop in enumerate(names):
+            day, price = last.get((crop, mandi), (first_day - timedelta(days=1), np.nan))
+            start = day + timedelta(days=1)
+            if start <= today:
+                starts[start][i, j] = price
+                members[start][i, j] = True
+
+    rows = []
+    for start, include in members.items():
+        days = (today - start).days + 1
+        rng = np.random.default_rng(zlib.crc32(start.isoformat().encode()))
+        prices = price_simulator.range_walk(rng, days, low, high, start=starts[start]).round(2)
+        dates = [start + timedelta(days=t) for t in range(days)]
+        for i, j in zip(*np.nonzero(include)):
+            rows.extend(
+                {"crop": names[j], "day": day, "mandi": mandis[i], "price": price, "source": "simulated"}
+                for day, price in zip(dates, prices[i, :, j].tolist())
+            )
+    _write(db, rows, replace=False)
+    db.commit()
+    return len(rows)
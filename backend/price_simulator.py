@@ -0,0 +1,112 @@
+"""
+Vectorized price random walks (NumPy).
+
+Every simulated price in the app — the mock mandis' series in mandi_prices,
+the voice `sell` projection, the supply-chain forecast — is the same walk,
+per mandi and crop, one step a day:
+
+    p[t] = clip(p[t-1] + drift + reversion * (mean - p[t-1]) + U(-noise, noise), low, high)
+
+`simulate()` produces a whole (mandis, days, crops) block: the shocks come
+from one call on a seeded `np.random.Generator`, and the recurrence is
+solved in closed form BLOCK_DAYS days at a time (cumulative sums of
+discounted shocks), so the Python loop runs days / BLOCK_DAYS times instead
+of once per mandi, day and crop. Series that reach a bound within a block
+are redone one day at a time (vectorized over just those series), so the
+clamped price is what the next day builds on, exactly as in the formula.
+
+`range_walk()` is the walk the mock mandis use, parameterised by a crop's
+usual (low, high) price range.
+
+Usage:
+    rng = np.random.default_rng(seed)
+    prices = price_simulator.range_walk(rng, 365, low=np.array([15, 20]), high=np.array([55, 60]),
+                                        start=np.full((8, 2), np.nan))   # 8 mandis x 365 days x 2 crops
+"""
+
+import numpy as np
+
+BLOCK_DAYS = 32
+MAX_REVERSION = 0.5  # keeps (1 - reversion) ** -BLOCK_DAYS well inside float64
+
+# range_walk, as fractions of the crop's (high - low)
+NOISE = 0.05
+DRIFT = 0.004
+START_SPREAD = 0.125
+REVERSION = 0.05
+
+
+def simulate(
+    rng: np.random.Generator,
+    start,
+    days: int,
+    *,
+    noise,
+    drift=0.0,
+    mean=0.0,
+    reversion=0.0,
+    low=-np.inf,
+    high=np.inf,
+) -> np.ndarray:
+    """
+    `days` daily prices after `start` (shape (mandis, crops)); returns
+    (mandis, days, crops). The parameters are scalars or arrays that
+    broadcast to (mandis, crops), e.g. one value per crop.
+    """
+    start = np.asarray(start, dtype=np.float64)
+    if start.ndim != 2:
+        raise ValueError("start must be a (mandis, crops) array")
+    shape = start.shape
+    noise, drift, mean, reversion, low, high = (
+        np.broadcast_to(np.asarray(v, dtype=np.float64), shape)
+        for v in (noise, drift, mean, reversion, low, high)
+    )
+    if np.any((reversion < 0) | (reversion > MAX_REVERSION)):
+        raise ValueError(f"reversion must be between 0 and {MAX_REVERSION}")
+
+    # p[t] = decay * p[t-1] + step[t], with decay = 1 - reversion
+    decay = (1.0 - reversion)[:, None, :]
+    steps = rng.uniform(-1.0, 1.0, size=(shape[0], days, shape[1]))
+    steps *= noise[:, None, :]
+    steps += (drift + reversion * mean)[:, None, :]
+
+    out = np.empty_like(steps)
+    price = np.clip(start, low, high)
+    for first in range(0, days, BLOCK_DAYS):
+        block = steps[:, first:first + BLOCK_DAYS]
+        powers = decay ** np.arange(1, block.shape[1] + 1)[None, :, None]
+        # p[t] = decay^t * (p[0] + sum_{s<=t} decay^-s * step[s])
+        path = powers * (price[:, None, :] + np.cumsum(block / powers, axis=1))
+        # A clamped price is what the next day builds on, which the closed
+        # form can't express: redo the series that reach a bound day by day
+        crossed = ((path < low[:, None, :]) | (path > high[:, None, :])).any(axis=1)
+        if crossed.any():
+            m, c = np.nonzero(crossed)
+            p, d, lo, hi = price[m, c], decay[m, 0, c], low[m, c], high[m, c]
+            for t in range(block.shape[1]):
+                p = np.clip(d * p + block[m, t, c], lo, hi)
+                path[m, t, c] = p
+        out[:, first:first + BLOCK_DAYS] = path
+        price = path[:, -1]
+    return out
+
+
+def range_walk(rng: np.random.Generator, days: int, low, high, start=None) -> np.ndarray:
+    """
+    Mock mandi prices for crops priced `low`..`high` ₹/kg (arrays per crop):
+    noise and upward drift scale with the range, prices revert to mid-range
+    and stay within 0.7 x low .. 1.3 x high. `start` is (mandis, crops);
+    NaN entries (or start=None, one mandi) start near mid-range.
+    """
+    low, high = np.asarray(low, dtype=np.float64), np.asarray(high, dtype=np.float64)
+    width, mid = high - low, (low + high) / 2
+    if start is None:
+        start = np.full(np.atleast_2d(width).shape, np.nan)
+    start = np.array(start, dtype=np.float64)
+    fresh = np.isnan(start)
+    start[fresh] = (mid + START_SPREAD * width * rng.uniform(-1.0, 1.0, size=start.shape))[fresh]
+    return simulate(
+        rng, start, days,
+        noise=NOISE * width, drift=DRIFT * width, mean=mid, reversion=REVERSION,
+        low=low * 0.7, high=high * 1.3,
+    )
@@ -4,7 +4,7 @@ Demand-alert agent — runs on a cron schedule (or manually via API).
 Uses `from langchain.agents import create_agent` with langchain-groq LLM.
 
 Flow:
-  1. Query the DB for past-7-day retailer-mandi orders (sales data).
+  1. Read past-7-day retailer-mandi order totals (sales data) from the daily rollup.
   2. Fetch distinct retailer locations (latitude/longitude).
   3. Use Tavily to search for market / demand news near those locations.
   4. LLM decides whether to create alerts.
@@ -16,49 +16,38 @@ import logging
 from datetime import datetime, timedelta
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func as sa_func
 
 from langchain.agents import create_agent
 from langchain_core.tools import tool
 from langchain_groq import ChatGroq
 
 from config import settings
-from database import SessionLocal
-from models import RetailerMandiOrder, Retailer, User, Alert
+from database import SessionLocal, read_session
+from models import Retailer, User, Alert
+import rollup
 
 logger = logging.getLogger("demand_agent")
 
 
 # ── Custom DB tools ─────────────────────────────────────────────────────────
 @tool
-def get_past_week_sales(dummy: str = "") -> str:
+def get_past_week_sales(user_id: int = 0) -> str:
     """
     Fetch retailer-mandi orders from the past 7 days.
+    Pass a retailer's user_id to see only their orders; 0 = all retailers.
     Returns a JSON list of {item, total_orders, total_price, avg_price_per_kg,
     earliest_order, latest_order} grouped by item.
     """
-    db: Session = SessionLocal()
+    db: Session = read_session()
     try:
         week_ago = datetime.utcnow() - timedelta(days=7)
-        rows = (
-            db.query(
-                RetailerMandiOrder.item,
-                sa_func.count(RetailerMandiOrder.id).label("total_orders"),
-                sa_func.sum(RetailerMandiOrder.price_per_kg).label("total_price"),
-                sa_func.avg(RetailerMandiOrder.price_per_kg).label("avg_price_per_kg"),
-                sa_func.min(RetailerMandiOrder.order_date).label("earliest_order"),
-                sa_func.max(RetailerMandiOrder.order_date).label("latest_order"),
-            )
-            .filter(RetailerMandiOrder.order_date >= week_ago.date())
-            .group_by(RetailerMandiOrder.item)
-            .all()
-        )
+        rows = rollup.item_totals(db, "retailer", week_ago.date(), user_id)
         results = [
             {
-                "item": r.item,
-                "total_orders": r.total_orders,
+                "item": r.item or None,
+                "total_orders": int(r.total_orders),
                 "total_price": float(r.total_price) if r.total_price else 0,
-                "avg_price_per_kg": round(float(r.avg_price_per_kg), 2) if r.avg_price_per_kg else 0,
+                "avg_price_per_kg": rollup.average(r.total_price, r.priced_orders),
                 "earliest_order": str(r.earliest_order) if r.earliest_order else None,
                 "latest_order": str(r.latest_order) if r.latest_order else None,
             }
@@ -77,7 +66,7 @@ def get_retailer_locations(dummy: str = "") -> str:
     Return a JSON list of distinct retailer locations (latitude, longitude)
     from the database. Used to make Tavily searches location-aware.
     """
-    db: Session = SessionLocal()
+    db: Session = read_session()
     try:
         rows = (
             db.query(User.latitude, User.longitude)
@@ -132,7 +121,7 @@ def get_all_retailer_user_ids(dummy: str = "") -> str:
     Return a JSON list of {user_id, username, latitude, longitude} for every
     retailer. Use this to know which user_ids to send alerts to.
     """
-    db: Session = SessionLocal()
+    db: Session = read_session()
     try:
         rows = (
             db.query(User.id, User.username, User.latitude, User.longitude)
@@ -161,6 +150,7 @@ Your job is to help retailers prepare for upcoming demand surges.
 
 INSTRUCTIONS:
 1. First, call `get_past_week_sales` to see what items retailers ordered recently.
+   Call it again with a retailer's user_id to tailor an alert to that retailer's own orders.
 2. Call `get_retailer_locations` to know where the retailers are located.
 3. Call `get_all_retailer_user_ids` to get the list of retailers and their user IDs.
 4. Use `tavily_search_results_json` to search for recent news about
@@ -1,21 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Optional
+from datetime import date
 
-from database import get_db
-from models import Retailer, RetailerItem, RetailerMandiOrder, User
+from database import get_db, get_read_db
+from models import Retailer, RetailerItem, RetailerMandiOrder
 from schemas import (
     RetailerProfileUpdate, RetailerProfileResponse,
     RetailerItemCreate, RetailerItemUpdate, RetailerItemResponse,
-    RetailerMandiOrderCreate, RetailerMandiOrderUpdate, RetailerMandiOrderResponse,
+    RetailerMandiOrderCreate, RetailerMandiOrderUpdate, RetailerMandiOrderResponse, Page,
 )
-from auth import get_current_user, require_role
+from auth import Principal, invalidate_principal, require_role
+from async_crud import async_crud_router
+from bulk_orders import bulk_orders_router
+from export import export_router
+from pagination import Keyset, paginate
+from geo_index import index_user_location
 
 router = APIRouter(prefix="/api/retailer", tags=["Retailer"])
 
+ORDER_KEYSET = Keyset(RetailerMandiOrder.id, RetailerMandiOrder.order_date)
+
 
 # ── Helper ──────────────────────────────────────────────────────────────────
-def _get_retailer_profile(user: User, db: Session) -> Retailer:
+def _get_retailer_profile(user: Principal, db: Session) -> Retailer:
     """Return the Retailer row for the authenticated user, or 404."""
     retailer = db.query(Retailer).filter(Retailer.user_id == user.id).first()
     if not retailer:
@@ -23,14 +31,21 @@ def _get_retailer_profile(user: User, db: Session) -> Retailer:
     return retailer
 
 
+def _retailer_id(user: Principal) -> int:
+    """Return the retailer profile id cached on the principal, or 404."""
+    if user.profile_id is None:
+        raise HTTPException(status_code=404, detail="Retailer profile not found")
+    return user.profile_id
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 #  PROFILE
 # ═════════════════════════════════════════════════════════════════════════════
 
 @router.get("/profile", response_model=RetailerProfileResponse)
 def get_profile(
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_role("retailer")),
+    db: Session = Depends(get_read_db),
 ):
     """Get the logged-in retailer's profile."""
     retailer = _get_retailer_profile(current_user, db)
@@ -40,7 +55,7 @@ def get_profile(
 @router.put("/profile", response_model=RetailerProfileResponse)
 def update_profile(
     payload: RetailerProfileUpdate,
-    current_user: User = Depends(require_role("retailer")),
+    current_user: Principal = Depends(require_role("retailer")),
     db: Session = Depends(get_db),
 ):
     """Update the retailer's profile (contact, location, language)."""
@@ -48,17 +63,19 @@ def update_profile(
 
     # Update user-level fields
     if payload.contact is not None:
-        current_user.contact = payload.contact
+        retailer.user.contact = payload.contact
     if payload.latitude is not None:
-        current_user.latitude = payload.latitude
+        retailer.user.latitude = payload.latitude
     if payload.longitude is not None:
-        current_user.longitude = payload.longitude
+        retailer.user.longitude = payload.longitude
 
     # Update retailer-level fields
     if payload.language is not None:
         retailer.language = payload.language
 
     db.commit()
+    invalidate_principal(current_user.id)
+    index_user_location(retailer.user)
     db.refresh(retailer)
     return retailer
 
@@ -67,26 +84,29 @@ def update_profile(
 #  RETAILER ITEMS  (CRUD)
 # ═════════════════════════════════════════════════════════════════════════════
 
-@router.get("/items", response_model=List[RetailerItemResponse])
+@router.get("/items", response_model=Page[RetailerItemResponse])
 def list_items(
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+    current_user: Principal = Depends(require_role("retailer", claims_only=True)),
+    db: Session = Depends(get_read_db),
 ):
-    """List all items belonging to the logged-in retailer."""
-    retailer = _get_retailer_profile(current_user, db)
-    return db.query(RetailerItem).filter(RetailerItem.retailer_id == retailer.id).all()
+    """List the logged-in retailer's items, one page at a time (oldest first)."""
+    retailer_id = _retailer_id(current_user)
+    query = db.query(RetailerItem).filter(RetailerItem.retailer_id == retailer_id)
+    return paginate(query, Keyset(RetailerItem.id), limit, after_id)
 
 
 @router.post("/items", response_model=RetailerItemResponse, status_code=status.HTTP_201_CREATED)
 def create_item(
     payload: RetailerItemCreate,
-    current_user: User = Depends(require_role("retailer")),
+    current_user: Principal = Depends(require_role("retailer", claims_only=True)),
     db: Session = Depends(get_db),
 ):
     """Add a new item to the retailer's inventory."""
-    retailer = _get_retailer_profile(current_user, db)
+    retailer_id = _retailer_id(current_user)
     item = RetailerItem(
-        retailer_id=retailer.id,
+        retailer_id=retailer_id,
         name=payload.name,
         item=payload.item,
         quantity=payload.quantity,
@@ -100,13 +120,13 @@ def create_item(
 @router.get("/items/{item_id}", response_model=RetailerItemResponse)
 def get_item(
     item_id: int,
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_role("retailer", claims_only=True)),
+    db: Session = Depends(get_read_db),
 ):
     """Get a single retailer item by ID."""
-    retailer = _get_retailer_profile(current_user, db)
+    retailer_id = _retailer_id(current_user)
     item = db.query(RetailerItem).filter(
-        RetailerItem.id == item_id, RetailerItem.retailer_id == retailer.id
+        RetailerItem.id == item_id, RetailerItem.retailer_id == retailer_id
     ).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -117,13 +137,13 @@ def get_item(
 def update_item(
     item_id: int,
     payload: RetailerItemUpdate,
-    current_user: User = Depends(require_role("retailer")),
+    current_user: Principal = Depends(require_role("retailer", claims_only=True)),
     db: Session = Depends(get_db),
 ):
     """Update an existing retailer item."""
-    retailer = _get_retailer_profile(current_user, db)
+    retailer_id = _retailer_id(current_user)
     item = db.query(RetailerItem).filter(
-        RetailerItem.id == item_id, RetailerItem.retailer_id == retailer.id
+        RetailerItem.id == item_id, RetailerItem.retailer_id == retailer_id
     ).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -140,13 +160,13 @@ def update_item(
 @router.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_item(
     item_id: int,
-    current_user: User = Depends(require_role("retailer")),
+    current_user: Principal = Depends(require_role("retailer", claims_only=True)),
     db: Session = Depends(get_db),
 ):
     """Delete a retailer item."""
-    retailer = _get_retailer_profile(current_user, db)
+    retailer_id = _retailer_id(current_user)
     item = db.query(RetailerItem).filter(
-        RetailerItem.id == item_id, RetailerItem.retailer_id == retailer.id
+        RetailerItem.id == item_id, RetailerItem.retailer_id == retailer_id
     ).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -158,37 +178,53 @@ def delete_item(
 #  RETAILER ↔ MANDI ORDERS  (CRUD)
 # ═════════════════════════════════════════════════════════════════════════════
 
-@router.get("/orders", response_model=List[RetailerMandiOrderResponse])
+@router.get("/orders", response_model=Page[RetailerMandiOrderResponse])
 def list_orders(
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+    after_date: Optional[date] = None,
+    current_user: Principal = Depends(require_role("retailer", claims_only=True)),
+    db: Session = Depends(get_read_db),
 ):
-    """List all retailer-mandi orders."""
-    return db.query(RetailerMandiOrder).all()
+    """List the logged-in retailer's orders, one page at a time (newest order_date first)."""
+    query = db.query(RetailerMandiOrder).filter(RetailerMandiOrder.retailer_id == _retailer_id(current_user))
+    return paginate(query, ORDER_KEYSET, limit, after_id, after_date)
 
 
 @router.post("/orders", response_model=RetailerMandiOrderResponse, status_code=status.HTTP_201_CREATED)
 def create_order(
     payload: RetailerMandiOrderCreate,
-    current_user: User = Depends(require_role("retailer")),
+    current_user: Principal = Depends(require_role("retailer", claims_only=True)),
     db: Session = Depends(get_db),
 ):
-    """Create a new retailer-mandi order."""
-    order = RetailerMandiOrder(**payload.model_dump())
+    """Create a retailer-mandi order owned by the logged-in retailer."""
+    order = RetailerMandiOrder(**payload.model_dump(), retailer_id=_retailer_id(current_user))
     db.add(order)
     db.commit()
     db.refresh(order)
     return order
 
 
+# Before /orders/{order_id}, which would otherwise take "export" as an id
+ORDER_EXPORT = export_router(
+    path="/orders/export", model=RetailerMandiOrder, role="retailer", name="retailer_orders",
+    owner_column="retailer_id", owner_id=_retailer_id, date_column="order_date", item_column="item",
+)
+router.include_router(ORDER_EXPORT)
+
+
 @router.get("/orders/{order_id}", response_model=RetailerMandiOrderResponse)
 def get_order(
     order_id: int,
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_role("retailer", claims_only=True)),
+    db: Session = Depends(get_read_db),
 ):
-    """Get a single order by ID."""
-    order = db.query(RetailerMandiOrder).filter(RetailerMandiOrder.id == order_id).first()
+    """Get one of the caller's orders by ID."""
+    order = (
+        db.query(RetailerMandiOrder)
+        .filter(RetailerMandiOrder.id == order_id, RetailerMandiOrder.retailer_id == _retailer_id(current_user))
+        .first()
+    )
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
@@ -198,11 +234,15 @@ def get_order(
 def update_order(
     order_id: int,
     payload: RetailerMandiOrderUpdate,
-    current_user: User = Depends(require_role("retailer")),
+    current_user: Principal = Depends(require_role("retailer", claims_only=True)),
     db: Session = Depends(get_db),
 ):
     """Update an existing order."""
-    order = db.query(RetailerMandiOrder).filter(RetailerMandiOrder.id == order_id).first()
+    order = (
+        db.query(RetailerMandiOrder)
+        .filter(RetailerMandiOrder.id == order_id, RetailerMandiOrder.retailer_id == _retailer_id(current_user))
+        .first()
+    )
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
@@ -218,12 +258,39 @@ def update_order(
 @router.delete("/orders/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_order(
     order_id: int,
-    current_user: User = Depends(require_role("retailer")),
+    current_user: Principal = Depends(require_role("retailer", claims_only=True)),
     db: Session = Depends(get_db),
 ):
     """Delete an order."""
-    order = db.query(RetailerMandiOrder).filter(RetailerMandiOrder.id == order_id).first()
+    order = (
+        db.query(RetailerMandiOrder)
+        .filter(RetailerMandiOrder.id == order_id, RetailerMandiOrder.retailer_id == _retailer_id(current_user))
+        .first()
+    )
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     db.delete(order)
     db.commit()
+
+
+# Many orders per request (JSON array / NDJSON / CSV): see bulk_orders
+router.include_router(bulk_orders_router(
+    model=RetailerMandiOrder, create_schema=RetailerMandiOrderCreate, role="retailer",
+    owner_column="retailer_id", owner_id=_retailer_id,
+))
+
+
+# Async twin of the item / order CRUD above, served instead when DB_ASYNC_CRUD is on
+async_router = APIRouter(prefix="/api/retailer", tags=["Retailer"])
+async_router.include_router(async_crud_router(
+    path="/items", model=RetailerItem, create_schema=RetailerItemCreate, update_schema=RetailerItemUpdate,
+    response_schema=RetailerItemResponse, role="retailer", label="Item", id_name="item_id",
+    owner_column="retailer_id", owner_id=_retailer_id,
+))
+async_router.include_router(ORDER_EXPORT)
+async_router.include_router(async_crud_router(
+    path="/orders", model=RetailerMandiOrder, create_schema=RetailerMandiOrderCreate,
+    update_schema=RetailerMandiOrderUpdate, response_schema=RetailerMandiOrderResponse,
+    role="retailer", label="Order", id_name="order_id",
+    owner_column="retailer_id", owner_id=_retailer_id, date_column="order_date",
+))
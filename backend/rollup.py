@@ -0,0 +1,292 @@
+"""
+`daily_item_stats` — per-day, per-item order price rollup.
+
+The agents (and anything charting prices) want weekly count / sum / avg /
+min / max per item. Scanning the order tables for that grows with order
+volume; the rollup holds one row per (side, owner, day, item), so a 7-day
+read touches at most 7 x items rows per owner.
+
+Each order lands in two rows: its owner's, and the platform-wide one
+(owner_id 0). Orders without an order_date are not rolled up.
+
+Kept current incrementally: every ORM flush that inserts, updates or deletes
+an order folds the change into the affected rows in the same transaction.
+count, sum and sum of squares are simple deltas (an upsert); min / max can't
+be un-applied, so a row that lost a price has them re-read from that day's
+orders (an index range). Rows left with no orders are removed.
+
+Writes that bypass the ORM unit of work — `query.delete()`, raw SQL, owner
+deletes cascading in the database — are not seen here; the nightly
+`reconcile()` rebuilds recent days from the order tables (and with
+`since=None`, everything: `scripts/reconcile_rollup.py --all`).
+
+Usage:
+    import rollup   # once per process, registers the flush listeners
+    rows = rollup.item_totals(db, "retailer", since=date.today() - timedelta(days=7))
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import and_, case, delete, event, func, inspect, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import DailyItemStat, MandiFarmerOrder, MandiOwner, Retailer, RetailerMandiOrder
+
+logger = logging.getLogger(__name__)
+
+ALL_OWNERS = 0
+
+# side -> (order model, owner column, owner profile model)
+SIDES = {
+    "retailer": (RetailerMandiOrder, RetailerMandiOrder.retailer_id, Retailer),
+    "mandi": (MandiFarmerOrder, MandiFarmerOrder.mandi_owner_id, MandiOwner),
+}
+SIDE_OF = {model: side for side, (model, _, _) in SIDES.items()}
+_TRACKED = ("order_date", "item", "price_per_kg")
+
+_stats = DailyItemStat.__table__
+_KEY = ("side", "owner_id", "day", "item")
+
+
+# ── Incremental maintenance ─────────────────────────────────────────────────
+
+class _Delta:
+    __slots__ = ("orders", "priced", "total", "sumsq", "low", "high", "removed")
+
+    def __init__(self):
+        self.orders = self.priced = 0
+        self.total = self.sumsq = Decimal(0)
+        self.low = self.high = None
+        self.removed = False  # a price left this row: min / max need re-reading
+
+    def fold(self, price, sign: int):
+        self.orders += sign
+        if price is None:
+            return
+        price = Decimal(str(price))
+        self.priced += sign
+        self.total += sign * price
+        self.sumsq += sign * price * price
+        if sign > 0:
+            self.low = price if self.low is None else min(self.low, price)
+            self.high = price if self.high is None else max(self.high, price)
+        else:
+            self.removed = True
+
+
+def _day(value) -> Optional[date]:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _fold(deltas: dict, side: str, owner_id, order_date, item, price, sign: int):
+    day = _day(order_date)
+    if day is None:
+        return
+    owners = (ALL_OWNERS,) if owner_id is None else (ALL_OWNERS, owner_id)
+    for owner in owners:
+        deltas[(side, owner, day, item or "")].fold(price, sign)
+
+
+def add_orders(conn, side: str, orders) -> None:
+    """
+    Fold freshly inserted orders into the rollup, for writers that insert
+    without the ORM (bulk loads). `orders` are mappings with order_date,
+    item, price_per_kg and the side's owner column.
+    """
+    owner_key = SIDES[side][1].key
+    deltas = defaultdict(_Delta)
+    for o in orders:
+        _fold(deltas, side, o.get(owner_key), o.get("order_date"), o.get("item"), o.get("price_per_kg"), +1)
+    apply(conn, deltas)
+
+
+def _old(state, attr: str):
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(state.obj(), attr)  # not loaded yet: read it (the row still exists)
+
+
+def _collect(session: Session) -> dict:
+    deltas = defaultdict(_Delta)
+    for obj in session.new:
+        side = SIDE_OF.get(type(obj))
+        if side:
+            owner = SIDES[side][1].key
+            _fold(deltas, side, getattr(obj, owner), obj.order_date, obj.item, obj.price_per_kg, +1)
+    for obj in session.deleted:
+        side = SIDE_OF.get(type(obj))
+        if side:
+            state, owner = inspect(obj), SIDES[side][1].key
+            _fold(deltas, side, _old(state, owner), *(_old(state, a) for a in _TRACKED), -1)
+    for obj in session.dirty:
+        side = SIDE_OF.get(type(obj))
+        if not side or obj in session.deleted:
+            continue
+        state, owner = inspect(obj), SIDES[side][1].key
+        if not any(state.attrs[a].history.has_changes() for a in (owner, *_TRACKED)):
+            continue
+        _fold(deltas, side, _old(state, owner), *(_old(state, a) for a in _TRACKED), -1)
+        _fold(deltas, side, getattr(obj, owner), obj.order_date, obj.item, obj.price_per_kg, +1)
+    return deltas
+
+
+def _upsert(dialect: str):
+    insert = pg_insert if dialect == "postgresql" else sqlite_insert
+    stmt = insert(_stats)
+    new, old = stmt.excluded, _stats.c
+    return stmt.on_conflict_do_update(
+        index_elements=[old[k] for k in _KEY],
+        set_={
+            "order_count": old.order_count + new.order_count,
+            "priced_count": old.priced_count + new.priced_count,
+            "price_sum": old.price_sum + new.price_sum,
+            "price_sumsq": old.price_sumsq + new.price_sumsq,
+            "price_min": case((or_(old.price_min.is_(None), new.price_min < old.price_min), new.price_min),
+                              else_=old.price_min),
+            "price_max": case((or_(old.price_max.is_(None), new.price_max > old.price_max), new.price_max),
+                              else_=old.price_max),
+        },
+    )
+
+
+def _key_filter(key):
+    return and_(*(_stats.c[k] == v for k, v in zip(_KEY, key)))
+
+
+def order_filter(side: str, owner_id: int, day: date, item: str):
+    model, owner_col, _ = SIDES[side]
+    conds = [model.order_date == day, model.item == item if item else or_(model.item.is_(None), model.item == "")]
+    if owner_id != ALL_OWNERS:
+        conds.append(owner_col == owner_id)
+    return model, and_(*conds)
+
+
+def apply(conn, deltas: dict) -> None:
+    """Write folded deltas to daily_item_stats on `conn` (inside the caller's transaction)."""
+    changed = {k: d for k, d in deltas.items() if d.orders or d.priced or d.removed}
+    if not changed:
+        return
+    conn.execute(_upsert(conn.dialect.name), [
+        {
+            "side": key[0], "owner_id": key[1], "day": key[2], "item": key[3],
+            "order_count": d.orders, "priced_count": d.priced, "price_sum": d.total,
+            "price_sumsq": d.sumsq, "price_min": d.low, "price_max": d.high,
+        }
+        for key, d in changed.items()
+    ])
+    for key, d in changed.items():
+        if not d.removed:
+            continue
+        model, where = order_filter(*key)
+        conn.execute(
+            update(_stats).where(_key_filter(key)).values(
+                price_min=select(func.min(model.price_per_kg)).where(where).scalar_subquery(),
+                price_max=select(func.max(model.price_per_kg)).where(where).scalar_subquery(),
+            )
+        )
+    if any(d.orders < 0 for d in changed.values()):
+        conn.execute(delete(_stats).where(_stats.c.order_count <= 0, or_(
+            *(_key_filter(key) for key, d in changed.items() if d.orders < 0)
+        )))
+
+
+@event.listens_for(Session, "before_flush")
+def _before_flush(session, flush_context, instances):
+    session.info["rollup_deltas"] = _collect(session)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    deltas = session.info.pop("rollup_deltas", None)
+    if deltas:
+        apply(session.connection(), deltas)
+
+
+# ── Reconciliation ──────────────────────────────────────────────────────────
+
+def rebuild_select(side: str, by_owner: bool, since: Optional[date]):
+    model, owner_col, _ = SIDES[side]
+    item = func.coalesce(model.item, "")
+    owner = owner_col if by_owner else literal(ALL_OWNERS)
+    price = model.price_per_kg
+    stmt = (
+        select(
+            literal(side), owner, model.order_date, item,
+            func.count(), func.count(price), func.coalesce(func.sum(price), 0),
+            func.coalesce(func.sum(price * price, type_=_stats.c.price_sumsq.type), 0), func.min(price), func.max(price),
+        )
+        .where(model.order_date.isnot(None))
+        .group_by(model.order_date, item)
+    )
+    if by_owner:
+        stmt = stmt.where(owner_col.isnot(None)).group_by(owner_col)
+    if since is not None:
+        stmt = stmt.where(model.order_date >= since)
+    return stmt
+
+
+def reconcile(db: Session, since: Optional[date] = None) -> int:
+    """
+    Rebuild daily_item_stats from the order tables for days >= `since` (all
+    days when None) in one transaction. Returns the number of rows written.
+    """
+    columns = [
+        "side", "owner_id", "day", "item", "order_count", "priced_count",
+        "price_sum", "price_sumsq", "price_min", "price_max",
+    ]
+    cleared = delete(_stats) if since is None else delete(_stats).where(_stats.c.day >= since)
+    db.execute(cleared)
+    written = 0
+    for side in SIDES:
+        for by_owner in (False, True):
+            result = db.execute(_stats.insert().from_select(columns, rebuild_select(side, by_owner, since)))
+            written += result.rowcount
+    db.commit()
+    logger.info(f"daily_item_stats reconciled since {since or 'the beginning'}: {written} rows")
+    return written
+
+
+# ── Reads ───────────────────────────────────────────────────────────────────
+
+def item_totals_stmt(side: str, since: date, user_id: int = 0):
+    """
+    Per-item totals over days >= `since`: rows of (item, total_orders,
+    priced_orders, total_price, min_price, max_price, earliest_order,
+    latest_order). `user_id` selects one owner's orders (0 = platform-wide).
+    """
+    s = DailyItemStat
+    stmt = (
+        select(
+            s.item,
+            func.sum(s.order_count).label("total_orders"),
+            func.sum(s.priced_count).label("priced_orders"),
+            func.sum(s.price_sum).label("total_price"),
+            func.min(s.price_min).label("min_price"),
+            func.max(s.price_max).label("max_price"),
+            func.min(s.day).label("earliest_order"),
+            func.max(s.day).label("latest_order"),
+        )
+        .where(s.side == side, s.day >= since)
+        .group_by(s.item)
+    )
+    if user_id:
+        profile = SIDES[side][2]
+        return stmt.join(profile, profile.id == s.owner_id).where(profile.user_id == user_id)
+    return stmt.where(s.owner_id == ALL_OWNERS)
+
+
+def item_totals(db: Session, side: str, since: date, user_id: int = 0):
+    return db.execute(item_totals_stmt(side, since, user_id)).all()
+
+
+def average(total, count) -> float:
+    return round(float(total) / count, 2) if count else 0
@@ -1,7 +1,9 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import Generic, List, Optional, TypeVar
 from datetime import datetime, date
 
+T = TypeVar("T")
+
 class UserRegister(BaseModel):
     username: str = Field(..., min_length=3, max_length=100)
     password: str = Field(..., min_length=6)
@@ -28,6 +30,24 @@ class Token(BaseModel):
     role: str
     username: str
     user_id: int
+    refresh_token: Optional[str] = None
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None  # also ends this login's refresh-token session
+
+class PageCursor(BaseModel):
+    """Pass back as query parameters to get the next page."""
+    after_id: Optional[int] = None
+    after_date: Optional[date] = None
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[PageCursor] = None
+
 
 class UserResponse(BaseModel):
     id: int
@@ -108,6 +128,7 @@ class RetailerMandiOrderUpdate(BaseModel):
 
 class RetailerMandiOrderResponse(BaseModel):
     id: int
+    retailer_id: Optional[int] = None
     src_lat: Optional[float]
     src_long: Optional[float]
     dest_lat: Optional[float]
@@ -185,6 +206,7 @@ class MandiFarmerOrderUpdate(BaseModel):
 
 class MandiFarmerOrderResponse(BaseModel):
     id: int
+    mandi_owner_id: Optional[int] = None
     src_lat: Optional[float]
     src_long: Optional[float]
     dest_lat: Optional[float]
@@ -198,6 +220,18 @@ class MandiFarmerOrderResponse(BaseModel):
         from_attributes = True
 
 
+class BulkRowError(BaseModel):
+    row: int
+    error: str
+
+
+class BulkOrderResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkRowError]
+    errors_truncated: bool = False
+
+
 # ── Farmer Profile ──────────────────────────────────────────────────────────
 class FarmerProfileUpdate(BaseModel):
     contact: Optional[str] = Field(None, max_length=20)
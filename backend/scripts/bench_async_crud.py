@@ -0,0 +1,156 @@
+"""
+Load benchmark: sync CRUD handlers (Session, threadpool) vs the async CRUD
+path (AsyncSession, DB_ASYNC_CRUD) on GET /api/farmer/crops.
+
+With a Postgres DATABASE_URL the real server is used (tables must exist).
+Otherwise a SQLite file is used and every statement sleeps --db-latency-ms
+inside the driver's own thread, standing in for the network round-trip.
+That only blocks the connection, never the event loop, so both modes see
+the same "database".
+
+Keep --connections >= --concurrency: a sync request holds its connection
+until get_db's cleanup gets a threadpool slot, so a smaller sync pool can
+deadlock against the threadpool rather than merely queue.
+
+Usage (from backend/):
+    python scripts/bench_async_crud.py
+    python scripts/bench_async_crud.py --concurrency 400 --connections 400 --db-latency-ms 20
+    DATABASE_URL=postgresql://... python scripts/bench_async_crud.py --db-latency-ms 0
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+ap.add_argument("--requests", type=int, default=2000)
+ap.add_argument("--concurrency", type=int, default=200)
+ap.add_argument("--connections", type=int, default=200, help="DB pool size for both modes")
+ap.add_argument("--db-latency-ms", type=float, default=50, help="simulated per-statement latency (SQLite only)")
+args = ap.parse_args()
+
+USE_SQLITE = not os.getenv("DATABASE_URL", "").startswith("postgresql")
+if USE_SQLITE:
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_async.db")
+os.environ["DB_POOL_SIZE"] = os.environ["DB_ASYNC_POOL_SIZE"] = str(args.connections)
+os.environ["DB_MAX_OVERFLOW"] = "0"
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+import database  # noqa: E402
+
+if USE_SQLITE:
+    latency_s = args.db_latency_ms / 1000
+
+    def _add_latency(sqlite_conn):
+        if latency_s:
+            sqlite_conn.set_trace_callback(lambda _stmt: time.sleep(latency_s))
+
+    sync_engine = create_engine(
+        database.DATABASE_URL, pool_size=args.connections, max_overflow=0,
+        connect_args={"check_same_thread": False},
+    )
+    event.listen(sync_engine, "connect", lambda dbapi_conn, _rec: _add_latency(dbapi_conn))
+    database.engine = sync_engine
+    database.SessionLocal.configure(bind=sync_engine)
+
+    async_engine = create_async_engine(
+        database.DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"),
+        pool_size=args.connections, max_overflow=0, connect_args={"check_same_thread": False},
+    )
+    # aiosqlite runs each connection in its own thread; the trace callback sleeps there
+    event.listen(async_engine.sync_engine, "connect",
+                 lambda dbapi_conn, rec: _add_latency(rec.driver_connection._connection))
+    database._async_engine = async_engine
+    database._async_sessionmaker = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+import models  # noqa: E402
+from auth import access_token_claims, create_access_token  # noqa: E402
+from config import settings  # noqa: E402
+from farmer.routes import router as farmer_router, async_router as farmer_async_router  # noqa: E402
+
+
+def build_app(async_mode: bool) -> FastAPI:
+    app = FastAPI()
+    if async_mode:
+        app.include_router(farmer_async_router, prefix="/api/farmer")
+    app.include_router(farmer_router, prefix="/api/farmer")
+    return app
+
+
+def seed() -> dict:
+    if USE_SQLITE:
+        models.Base.metadata.create_all(database.engine)
+    db = database.SessionLocal()
+    user = db.query(models.User).filter(models.User.username == "bench_async").first()
+    if user is None:
+        user = models.User(username="bench_async", password_hash="-", role="farmer")
+        db.add(user)
+        db.commit()
+        farmer = models.Farmer(user_id=user.id, language="English")
+        db.add(farmer)
+        db.commit()
+        for i in range(5):
+            db.add(models.Crop(farmer_id=farmer.id, name=f"crop-{i}", quantity=i))
+        db.commit()
+    token = create_access_token(access_token_claims(user, db))
+    db.close()
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def load(app, headers):
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    remaining = iter(range(args.requests))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def worker():
+            for _ in remaining:
+                start = time.perf_counter()
+                r = await client.get("/api/farmer/crops", headers=headers)
+                assert r.status_code == 200, r.text
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": args.requests / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+async def main():
+    settings.AUTH_STATELESS = True  # identity from JWT claims in both modes
+    headers = seed()
+    results = {}
+    for mode in ("sync", "async"):
+        app = build_app(async_mode=(mode == "async"))
+        await load(app, headers)  # warm the pools
+        results[mode] = await load(app, headers)
+    await database.dispose_async_engine()  # aiosqlite worker threads keep the process alive
+
+    db_desc = f"SQLite + {args.db_latency_ms} ms/statement" if USE_SQLITE else "Postgres"
+    print(f"{args.requests} × GET /api/farmer/crops, concurrency {args.concurrency}, "
+          f"{args.connections} DB connections, {db_desc}\n")
+    print(f"{'mode':>6} | {'req/s':>8} | {'p50':>9} | {'p99':>9}")
+    print("-" * 42)
+    for mode, r in results.items():
+        print(f"{mode:>6} | {r['rps']:>8.0f} | {r['p50']:>7.1f}ms | {r['p99']:>7.1f}ms")
+    print(f"\nasync / sync throughput: {results['async']['rps'] / results['sync']['rps']:.2f}x "
+          "(sync handlers share the 40-thread request threadpool)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Benchmark GET /api/farmer/crops under the three auth modes:
+
+  * uncached  — identity looked up in the DB on every request
+  * cached    — principal cache in get_current_user
+  * stateless — verified JWT claims only, no identity queries
+
+Runs the real app in-process against an in-memory SQLite database. Use
+--db-latency-ms to add a per-query delay that stands in for the network
+round-trip to a hosted Postgres.
+
+Usage (from backend/):
+    python scripts/bench_auth_crops.py
+    python scripts/bench_auth_crops.py --requests 2000 --db-latency-ms 2
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+import database  # noqa: E402
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+database.engine = engine
+database.SessionLocal.configure(bind=engine)
+
+import auth  # noqa: E402
+import models  # noqa: E402
+from config import settings  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from server import app  # noqa: E402
+
+QUERIES = {"n": 0}
+
+
+def setup(client, crops):
+    client.post("/api/register", json={"username": "bench_farmer", "password": "bench-pass", "role": "farmer"})
+    token = client.post("/api/login", json={"username": "bench_farmer", "password": "bench-pass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(crops):
+        client.post("/api/farmer/crops", json={"name": f"crop-{i}", "quantity": i}, headers=headers)
+    return headers
+
+
+def run(client, headers, n):
+    QUERIES["n"] = 0
+    start = time.perf_counter()
+    for _ in range(n):
+        r = client.get("/api/farmer/crops", headers=headers)
+        assert r.status_code == 200, r.text
+    elapsed = time.perf_counter() - start
+    return n / elapsed, QUERIES["n"] / n
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--crops", type=int, default=5)
+    ap.add_argument("--db-latency-ms", type=float, default=1.0)
+    args = ap.parse_args()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(*_):
+        QUERIES["n"] += 1
+        if args.db_latency_ms:
+            time.sleep(args.db_latency_ms / 1000)
+
+    models.Base.metadata.create_all(engine)
+    with TestClient(app) as client:
+        headers = setup(client, args.crops)
+        results = {}
+
+        settings.AUTH_STATELESS = False
+        auth.principal_cache.maxsize = 0  # every set() is evicted immediately
+        results["uncached"] = run(client, headers, args.requests)
+
+        auth.principal_cache.maxsize = settings.PRINCIPAL_CACHE_MAXSIZE
+        run(client, headers, 1)  # warm
+        results["cached"] = run(client, headers, args.requests)
+
+        settings.AUTH_STATELESS = True
+        results["stateless"] = run(client, headers, args.requests)
+
+    base = results["uncached"][0]
+    print(f"{args.requests} × GET /api/farmer/crops, {args.db_latency_ms} ms simulated per query\n")
+    print(f"{'mode':>10} | {'req/s':>8} | {'queries/req':>11} | {'vs uncached':>11}")
+    print("-" * 50)
+    for mode, (rps, qpr) in results.items():
+        print(f"{mode:>10} | {rps:>8.0f} | {qpr:>11.1f} | {rps / base:>10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark the local voice-command parser against a sample corpus.
+
+Reports how many commands the local parser answers on its own (hit rate),
+how often those answers match the expected action / crop, and per-command
+latency. Everything below the threshold would fall through to Groq.
+
+Usage (from backend/):
+    python scripts/bench_intent_parser.py
+    python scripts/bench_intent_parser.py --threshold 0.7 --repeat 2000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from farmer.intent_parser import parse_intent, DEFAULT_MIN_CONFIDENCE  # noqa: E402
+
+# (command, expected action, expected crop)
+CORPUS = [
+    ("sell 250kg tomato", "sell", "tomato"),
+    ("I want to sell onion", "sell", "onion"),
+    ("sell 2 quintal wheat", "sell", "wheat"),
+    ("tamatar 100 kilo bechna hai", "sell", "tomato"),
+    ("pyaz 3 quintal bechni hai", "sell", "onion"),
+    ("aloo bechna hai 500 kg", "sell", "potato"),
+    ("mujhe 1 ton chawal bechna hai", "sell", "rice"),
+    ("sell 300 aloo", "sell", "potato"),
+    ("टमाटर 50 किलो बेचना है", "sell", "tomato"),
+    ("tomato rate today", "check_price", "tomato"),
+    ("what is price of onion", "check_price", "onion"),
+    ("pyaz ka bhav kya hai", "check_price", "onion"),
+    ("aaj gehun ka daam", "check_price", "wheat"),
+    ("phool gobhi ka rate batao", "check_price", "cauliflower"),
+    ("mirchi ki kimat", "check_price", "chilli"),
+    ("टमाटर का भाव", "check_price", "tomato"),
+    ("I grow tomato", "grow", "tomato"),
+    ("I planted carrot", "grow", "carrot"),
+    ("main tamatar ugata hoon", "grow", "tomato"),
+    ("maine baingan lagaya hai", "grow", "brinjal"),
+    ("should I cut tomato, 3 months old", "harvest_advice", "tomato"),
+    ("is my wheat ready?", "harvest_advice", "wheat"),
+    ("gehun ki katai kab karu", "harvest_advice", "wheat"),
+    ("what is the weather tomorrow", "check_weather", None),
+    ("kal baarish hogi kya", "check_weather", None),
+    ("mausam kaisa rahega", "check_weather", None),
+    ("how to protect wheat from pests", "farming_advice", "wheat"),
+    ("tomato mein keeda lag gaya", "farming_advice", "tomato"),
+    ("when to add fertilizer to rice", "farming_advice", "rice"),
+    ("how to protect from pests", "farming_advice", None),
+    ("what price can I sell tomato at", "sell", "tomato"),
+    ("which government scheme helps small farmers", "general", None),
+    ("tell me about drip irrigation subsidy", "general", None),
+    ("mera khet 2 acre hai kya lagau", "general", None),
+]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--threshold", type=float, default=DEFAULT_MIN_CONFIDENCE)
+    ap.add_argument("--repeat", type=int, default=1000, help="timing iterations per command")
+    args = ap.parse_args()
+
+    hits = correct = 0
+    latencies_us = []
+    misses = []
+    for text, want_action, want_crop in CORPUS:
+        parsed, confidence = parse_intent(text)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            parse_intent(text)
+        latencies_us.append((time.perf_counter() - start) / args.repeat * 1e6)
+
+        if confidence >= args.threshold:
+            hits += 1
+            if parsed["action"] == want_action and parsed.get("crop") == want_crop:
+                correct += 1
+            else:
+                misses.append((text, parsed["action"], parsed.get("crop"), want_action, want_crop))
+
+    n = len(CORPUS)
+    latencies_us.sort()
+    print(f"commands            : {n}")
+    print(f"threshold           : {args.threshold}")
+    print(f"local hit rate      : {hits}/{n} ({hits / n:.0%}) — remaining {n - hits} go to Groq")
+    print(f"local accuracy      : {correct}/{hits} ({(correct / hits if hits else 0):.0%})")
+    print(f"latency p50 / p99   : {statistics.median(latencies_us):.1f} µs / "
+          f"{latencies_us[min(n - 1, int(n * 0.99))]:.1f} µs per command")
+    for text, got_a, got_c, want_a, want_c in misses:
+        print(f"  wrong: {text!r} → {got_a}/{got_c}, expected {want_a}/{want_c}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Login-storm benchmark: tail latency of an unrelated sync endpoint
+(GET /api/health) while a burst of /api/login requests is in flight.
+
+Compares PASSWORD_POOL_KIND=inline (bcrypt on the shared request threadpool,
+the old behaviour) with the dedicated thread / process pool. Runs the real
+app in-process over httpx's ASGI transport with an in-memory SQLite DB.
+
+Usage (from backend/):
+    python scripts/bench_login_storm.py
+    python scripts/bench_login_storm.py --logins 200 --kinds inline thread process
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+import database  # noqa: E402
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+database.engine = engine
+database.SessionLocal.configure(bind=engine)
+
+import models  # noqa: E402
+import server  # noqa: E402
+from config import settings  # noqa: E402
+from password_pool import PasswordHasher, pwd_context  # noqa: E402
+
+USERS = 20
+PASSWORD = "storm-pass"
+
+
+def seed_users():
+    models.Base.metadata.create_all(engine)
+    db = database.SessionLocal()
+    hashed = pwd_context.hash(PASSWORD)
+    for i in range(USERS):
+        db.add(models.User(username=f"storm{i}", password_hash=hashed, role="admin"))
+    db.commit()
+    db.close()
+
+
+async def probe(client, stop, latencies, interval):
+    while not stop.is_set():
+        start = time.perf_counter()
+        r = await client.get("/api/health")
+        assert r.status_code == 200
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+
+
+async def run_mode(client, kind, logins, probe_interval):
+    server.password_hasher.shutdown()
+    server.password_hasher = PasswordHasher(kind, settings.PASSWORD_POOL_WORKERS, max_queue=logins)
+    latencies = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(client, stop, latencies, probe_interval))
+    await asyncio.sleep(0.3)  # idle baseline samples
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(
+        client.post("/api/login", json={"username": f"storm{i % USERS}", "password": PASSWORD})
+        for i in range(logins)
+    ))
+    storm_s = time.perf_counter() - start
+    stop.set()
+    await prober
+    server.password_hasher.shutdown()
+
+    ok = sum(1 for r in responses if r.status_code == 200)
+    latencies.sort()
+    return {
+        "kind": kind,
+        "ok": ok,
+        "storm_s": storm_s,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "max": latencies[-1],
+        "probes": len(latencies),
+    }
+
+
+async def main_async(args):
+    seed_users()
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        rows = [await run_mode(client, kind, args.logins, args.probe_interval_ms / 1000) for kind in args.kinds]
+
+    print(f"{args.logins} concurrent logins, /api/health probed every {args.probe_interval_ms} ms, "
+          f"password pool workers={settings.PASSWORD_POOL_WORKERS}, CPUs={os.cpu_count()}\n")
+    print(f"{'pool':>8} | {'logins ok':>9} | {'storm':>7} | {'health p50':>10} | {'p99':>9} | {'max':>9} | probes")
+    print("-" * 78)
+    for r in rows:
+        print(f"{r['kind']:>8} | {r['ok']:>9} | {r['storm_s']:>6.1f}s | {r['p50']:>8.1f}ms | "
+              f"{r['p99']:>7.1f}ms | {r['max']:>7.1f}ms | {r['probes']}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--logins", type=int, default=60)
+    ap.add_argument("--kinds", nargs="+", default=["inline", "thread"], choices=["inline", "thread", "process"])
+    ap.add_argument("--probe-interval-ms", type=float, default=20)
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark nearest-mandi lookup: the old per-request Python haversine loop +
+full sort versus geo_index.GridIndex (k-nearest and radius queries, and
+k_nearest_batch for many query points at once).
+
+Usage (from backend/):
+    python scripts/bench_nearest_mandi.py
+    python scripts/bench_nearest_mandi.py --sizes 10 1000 10000 100000 --k 5 --radius-km 50 --batch 1000
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings  # noqa: E402
+from geo_index import EARTH_RADIUS_KM, GridIndex  # noqa: E402
+
+# Rough bounding box of mainland India
+LAT_RANGE = (8.0, 32.0)
+LNG_RANGE = (68.0, 90.0)
+
+
+def synthetic_mandis(n, rng):
+    return [
+        {"id": i, "name": f"Mandi {i}", "lat": rng.uniform(*LAT_RANGE), "lng": rng.uniform(*LNG_RANGE)}
+        for i in range(n)
+    ]
+
+
+def haversine_distance(lat1, lng1, lat2, lng2):
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng/2)**2
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def loop_nearest(mandis, lat, lng, k):
+    """What get_mandis_with_prices used to do: distance to every mandi, sort all, slice."""
+    rows = [(m, haversine_distance(lat, lng, m["lat"], m["lng"])) for m in mandis]
+    rows.sort(key=lambda r: r[1])
+    return rows[:k]
+
+
+def loop_radius(mandis, lat, lng, radius_km):
+    return [r for r in loop_nearest(mandis, lat, lng, len(mandis)) if r[1] <= radius_km]
+
+
+def timeit(fn, queries):
+    start = time.perf_counter()
+    for lat, lng in queries:
+        fn(lat, lng)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 1_000, 10_000, 100_000])
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--radius-km", type=float, default=50.0)
+    ap.add_argument("--queries", type=int, default=200, help="query points per measurement")
+    ap.add_argument("--batch", type=int, default=1_000, help="query points for the batch comparison")
+    args = ap.parse_args()
+
+    rng = random.Random(42)
+    queries = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(args.queries)]
+
+    print(f"{'mandis':>8} | {'loop knn':>9} | {'grid knn':>9} | {'speedup':>7} | "
+          f"{'loop radius':>11} | {'grid radius':>11} | {'speedup':>7}")
+    print("-" * 84)
+    batch_rows = []
+    for n in args.sizes:
+        mandis = synthetic_mandis(n, rng)
+        index = GridIndex("bench", settings.GEO_INDEX_CELL_DEG)
+        for m in mandis:
+            index.upsert(m["id"], m["lat"], m["lng"], m)
+
+        # Sanity check: both approaches pick the same mandis
+        lat, lng = queries[0]
+        want = [m["id"] for m, _ in loop_nearest(mandis, lat, lng, args.k)]
+        got = [m["id"] for m, _ in index.k_nearest(lat, lng, args.k)]
+        assert want == got, f"mismatch at n={n}: {want} vs {got}"
+
+        sample = queries[:max(5, min(len(queries), 200_000 // max(n, 1)))]  # the loop is slow at large n
+        t_loop = timeit(lambda la, ln: loop_nearest(mandis, la, ln, args.k), sample)
+        t_grid = timeit(lambda la, ln: index.k_nearest(la, ln, args.k), queries)
+        t_loop_r = timeit(lambda la, ln: loop_radius(mandis, la, ln, args.radius_km), sample)
+        t_grid_r = timeit(lambda la, ln: index.within_radius_km(la, ln, args.radius_km), queries)
+
+        print(f"{n:>8} | {t_loop * 1e3:>7.3f}ms | {t_grid * 1e3:>7.3f}ms | {t_loop / t_grid:>6.1f}x | "
+              f"{t_loop_r * 1e3:>9.3f}ms | {t_grid_r * 1e3:>9.3f}ms | {t_loop_r / t_grid_r:>6.1f}x")
+
+        b_lats = [rng.uniform(*LAT_RANGE) for _ in range(args.batch)]
+        b_lngs = [rng.uniform(*LNG_RANGE) for _ in range(args.batch)]
+        got = [[m["id"] for m, _ in row] for row in index.k_nearest_batch(b_lats[:3], b_lngs[:3], args.k)]
+        want = [[m["id"] for m, _ in index.k_nearest(la, ln, args.k)] for la, ln in zip(b_lats[:3], b_lngs[:3])]
+        assert want == got, f"batch mismatch at n={n}: {want} vs {got}"
+        batch = list(zip(b_lats, b_lngs))
+        t_loop_b = timeit(lambda la, ln: loop_nearest(mandis, la, ln, args.k), sample) * args.batch
+        t_grid_b = timeit(lambda la, ln: index.k_nearest(la, ln, args.k), batch) * args.batch
+        start = time.perf_counter()
+        index.k_nearest_batch(b_lats, b_lngs, args.k)
+        t_batch = time.perf_counter() - start
+        batch_rows.append((n, t_loop_b, t_grid_b, t_batch))
+    print(f"\nk={args.k}, radius={args.radius_km} km, cell={settings.GEO_INDEX_CELL_DEG} deg; per-query times")
+
+    print(f"\n{'mandis':>8} | {'loop':>10} | {'k_nearest':>10} | {'batch':>10} | {'vs loop':>7}")
+    print("-" * 59)
+    for n, t_loop_b, t_grid_b, t_batch in batch_rows:
+        print(f"{n:>8} | {t_loop_b:>9.3f}s | {t_grid_b:>9.3f}s | {t_batch:>9.3f}s | "
+              f"{t_loop_b / t_batch:>6.1f}x")
+    print(f"\n{args.batch} query points: the loop and one k_nearest call per point (loop time "
+          f"extrapolated from a sample at large sizes) versus one k_nearest_batch call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark price_simulator against the per-day Python walk it replaced.
+
+For each size, times `range_walk` (one (mandis, days, crops) block) and the
+old shape of the code — a `random.Random` loop per mandi, crop and day with
+the same drift, mean reversion and clamping — and prints both with the
+speedup. The loop baseline is skipped above --loop-max steps.
+
+Usage (from backend/):
+    python scripts/bench_price_simulator.py
+    python scripts/bench_price_simulator.py --crops 15 --repeat 5 --sizes 5x30 500x365
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+import price_simulator  # noqa: E402
+
+DEFAULT_SIZES = ["5x30", "8x90", "50x365", "100x365", "500x365"]
+
+
+def loop_walk(rng: random.Random, mandis: int, days: int, low, high):
+    """The old per-day walk, with price_simulator.range_walk's parameters."""
+    out = []
+    for _ in range(mandis):
+        for lo, hi in zip(low, high):
+            width, mid = hi - lo, (lo + hi) / 2
+            floor, ceiling = lo * 0.7, hi * 1.3
+            price = mid + rng.uniform(-1, 1) * price_simulator.START_SPREAD * width
+            series = []
+            for _ in range(days):
+                price += (price_simulator.DRIFT * width + price_simulator.REVERSION * (mid - price)
+                          + rng.uniform(-1, 1) * price_simulator.NOISE * width)
+                price = max(floor, min(ceiling, price))
+                series.append(price)
+            out.append(series)
+    return out
+
+
+def best_of(repeat: int, fn) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="MANDISxDAYS")
+    ap.add_argument("--crops", type=int, default=15)
+    ap.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    ap.add_argument("--loop-max", type=int, default=5_000_000, help="skip the loop above this many steps")
+    args = ap.parse_args()
+
+    low = np.linspace(3, 80, args.crops)
+    high = low * 2.5
+    print(f"{'mandis x days':>14} {'steps':>10} {'numpy ms':>10} {'loop ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        mandis, days = (int(n) for n in size.lower().split("x"))
+        steps = mandis * days * args.crops
+        fast = best_of(args.repeat, lambda: price_simulator.range_walk(
+            np.random.default_rng(0), days, low, high, start=np.full((mandis, args.crops), np.nan),
+        ))
+        if steps <= args.loop_max:
+            slow = best_of(args.repeat, lambda: loop_walk(random.Random(0), mandis, days, low.tolist(), high.tolist()))
+            print(f"{size:>14} {steps:>10} {fast * 1000:>10.2f} {slow * 1000:>10.1f} {slow / fast:>7.0f}x")
+        else:
+            print(f"{size:>14} {steps:>10} {fast * 1000:>10.2f} {'-':>10} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
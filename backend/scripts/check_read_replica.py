@@ -0,0 +1,96 @@
+"""
+Walk the read-replica router through its cases against two local databases.
+
+By default the primary and the replica are two SQLite files. "Replication" is
+an explicit copy of the primary file, so the replica lags until told to catch
+up. Each step prints which engine served GET /api/farmer/crops and whether
+the new crop was visible.
+
+Point it at two real Postgres instances (a streaming replica) to check the
+same flow there; the explicit catch-up step then just waits for replay.
+
+Usage (from backend/):
+    python scripts/check_read_replica.py
+    DATABASE_URL=postgresql://...primary DATABASE_REPLICA_URL=postgresql://...replica \\
+        python scripts/check_read_replica.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if not os.getenv("DATABASE_REPLICA_URL"):
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/primary.db"
+    os.environ["DATABASE_REPLICA_URL"] = f"sqlite:///{tmp}/replica.db"
+os.environ.setdefault("DB_READ_YOUR_WRITES_SECONDS", "1")
+
+from sqlalchemy import create_engine  # noqa: E402
+
+import database  # noqa: E402
+import models  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from server import app  # noqa: E402
+
+SQLITE = database.engine.dialect.name == "sqlite"
+router = database.read_router
+
+
+def catch_up():
+    """Bring the replica level with the primary."""
+    if SQLITE:
+        src = sqlite3.connect(database.engine.url.database)
+        dst = sqlite3.connect(database.replica_engine.url.database)
+        src.backup(dst)
+        src.close()
+        dst.close()
+        database.replica_engine.dispose()
+    else:
+        time.sleep(2)
+
+
+def step(client, headers, label, crop_name):
+    before = router.stats()
+    crops = client.get("/api/farmer/crops", headers=headers).json()["items"]
+    after = router.stats()
+    served = "primary" if after["primary_reads"] > before["primary_reads"] else "replica"
+    visible = any(c["name"] == crop_name for c in crops)
+    print(f"  {label:<44} served by {served:<8} new crop visible: {visible}")
+
+
+def main():
+    if SQLITE:
+        models.Base.metadata.create_all(database.engine)
+        models.Base.metadata.create_all(database.replica_engine)
+
+    client = TestClient(app)
+    user = f"replica_check_{int(time.time())}"
+    client.post("/api/register", json={"username": user, "password": "check-pass", "role": "farmer"})
+    token = client.post("/api/login", json={"username": user, "password": "check-pass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    catch_up()
+
+    crop = f"crop-{int(time.time() * 1000)}"
+    assert client.post("/api/farmer/crops", json={"name": crop, "quantity": 1}, headers=headers).status_code == 201
+    print(f"primary: {database.engine.url!r}\nreplica: {database.replica_engine.url!r}\n")
+
+    step(client, headers, "right after the write", crop)
+    time.sleep(router.window_s + 0.1)
+    step(client, headers, "after the read-your-writes window", crop)
+    catch_up()
+    step(client, headers, "after the replica caught up", crop)
+
+    database.replica_engine = create_engine("sqlite:////nonexistent/dir/replica.db")
+    database.ReplicaSessionLocal.configure(bind=database.replica_engine)
+    step(client, headers, "replica unreachable", crop)
+    step(client, headers, "replica still marked down", crop)
+
+    print(f"\nrouter: {router.stats()}")
+
+
+if __name__ == "__main__":
+    main()
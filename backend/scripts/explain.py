@@ -0,0 +1,279 @@
+"""
+EXPLAIN the hot read queries and flag full-table scans.
+
+Queries covered (same shapes as the code that issues them):
+
+  * retailer_week_sales      — retailer agent get_past_week_sales (daily_item_stats)
+  * mandi_week_procurement   — mandi agent get_past_week_procurement / farmer
+                               agent get_recent_mandi_prices (daily_item_stats)
+  * retailer_own_week_sales  — get_past_week_sales for one retailer (user_id)
+  * rollup_day_min_max       — daily_item_stats min / max re-read after a delete
+  * retailer_order_page      — GET /api/retailer/orders, first page
+  * mandi_order_page         — GET /api/mandi/orders, first page
+  * farmer_alert_feed        — GET /api/farmer/alerts
+  * price_history_year       — GET /api/farmer/price-history?days=365 (mandi_prices)
+
+On Postgres each query runs under EXPLAIN (ANALYZE, BUFFERS); on SQLite it
+gets EXPLAIN QUERY PLAN plus a timed execution. A plan that scans a whole
+order / alert table is reported, and with --check the script exits 1, so it
+can guard index changes in CI.
+
+--seed fills the order tables (default 10M rows each, spread over the seeded
+retailers / mandi owners), users and alerts with synthetic data covering two
+years, rebuilds daily_item_stats and the order prices in mandi_prices, then
+ANALYZEs. Point DATABASE_URL at a
+scratch database for that — seeded rows are not cleaned up.
+
+Usage (from backend/):
+    python scripts/explain.py
+    python scripts/explain.py --check
+    DATABASE_URL=postgresql://.../explain_scratch python scripts/explain.py --seed --rows 10000000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func as sa_func, select, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from config import settings  # noqa: E402
+from database import engine  # noqa: E402
+from models import Alert, MandiFarmerOrder, MandiOwner, Retailer, RetailerMandiOrder, User  # noqa: E402
+from pagination import Keyset  # noqa: E402
+import price_history  # noqa: E402
+import rollup  # noqa: E402
+
+HOT_TABLES = {"mandi_farmer_orders", "retailer_mandi_order", "alerts", "daily_item_stats", "mandi_prices"}
+ITEMS = ["tomato", "onion", "potato", "wheat", "rice", "cabbage", "carrot", "chilli", "garlic", "ginger"]
+SEED_PREFIX = "explain_"
+
+
+# ── Hot queries ─────────────────────────────────────────────────────────────
+
+def _first_order_page(model, owner_col, owner_id):
+    keyset = Keyset(model.id, model.order_date)
+    base = select(model).where(owner_col == owner_id)
+    return keyset.statements(base, None, None)[0].limit(settings.PAGE_SIZE_DEFAULT + 1)
+
+
+def hot_queries(alert_user_id, retailer, mandi_owner_id):
+    queries = {}
+    week_ago = (datetime.utcnow() - timedelta(days=7)).date()
+    queries["retailer_week_sales"] = rollup.item_totals_stmt("retailer", week_ago)
+    queries["mandi_week_procurement"] = rollup.item_totals_stmt("mandi", week_ago)
+    queries["retailer_own_week_sales"] = rollup.item_totals_stmt("retailer", week_ago, retailer.user_id)
+    # What apply() runs for a row that lost a price: one day of one item
+    _, day_item = rollup.order_filter("mandi", rollup.ALL_OWNERS, week_ago, ITEMS[0])
+    queries["rollup_day_min_max"] = select(
+        sa_func.min(MandiFarmerOrder.price_per_kg), sa_func.max(MandiFarmerOrder.price_per_kg)
+    ).where(day_item)
+    queries["retailer_order_page"] = _first_order_page(RetailerMandiOrder, RetailerMandiOrder.retailer_id, retailer.id)
+    queries["mandi_order_page"] = _first_order_page(MandiFarmerOrder, MandiFarmerOrder.mandi_owner_id, mandi_owner_id)
+    queries["farmer_alert_feed"] = (
+        select(Alert).where(Alert.user_id == alert_user_id).order_by(Alert.created_at.desc()).limit(20)
+    )
+    today = datetime.utcnow().date()
+    queries["price_history_year"] = price_history.prices_stmt(ITEMS[0], today - timedelta(days=364), today)
+    return queries
+
+
+def _driver_sql(conn, stmt):
+    compiled = stmt.compile(dialect=conn.dialect)
+    if compiled.positional:
+        return compiled.string, tuple(compiled.params[k] for k in compiled.positiontup)
+    return compiled.string, compiled.params
+
+
+# ── Plans ───────────────────────────────────────────────────────────────────
+
+def _pg_nodes(node, depth=0):
+    yield depth, node
+    for child in node.get("Plans", []):
+        yield from _pg_nodes(child, depth + 1)
+
+
+def explain_postgres(conn, stmt):
+    sql, params = _driver_sql(conn, stmt)
+    plan = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    plan = plan[0]
+    lines, full_scans = [], []
+    for depth, node in _pg_nodes(plan["Plan"]):
+        relation = node.get("Relation Name")
+        desc = node["Node Type"]
+        if relation:
+            desc += f" on {relation}"
+        if node.get("Index Name"):
+            desc += f" using {node['Index Name']}"
+        hits = node.get("Shared Hit Blocks", 0) + node.get("Shared Read Blocks", 0)
+        lines.append(f"{'  ' * depth}{desc}  (rows={node.get('Actual Rows')}, "
+                     f"time={node.get('Actual Total Time')} ms, buffers={hits})")
+        if node["Node Type"] == "Seq Scan" and relation in HOT_TABLES:
+            full_scans.append(relation)
+    return lines, full_scans, plan["Execution Time"]
+
+
+def explain_sqlite(conn, stmt):
+    sql, params = _driver_sql(conn, stmt)
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    lines, full_scans = [], []
+    for row in rows:
+        detail = row[-1]
+        lines.append(detail)
+        # "SCAN t" is a full table walk; "SCAN t USING [COVERING] INDEX" / "SEARCH" are not
+        words = detail.split()
+        if words[0] == "SCAN" and words[1] in HOT_TABLES and "INDEX" not in detail:
+            full_scans.append(words[1])
+    start = time.perf_counter()
+    conn.exec_driver_sql(sql, params).fetchall()
+    return lines, full_scans, (time.perf_counter() - start) * 1000
+
+
+# ── Seeding ─────────────────────────────────────────────────────────────────
+
+def seed(conn, rows, users, alerts_per_user):
+    pg = conn.dialect.name == "postgresql"
+    params = {"prefix": SEED_PREFIX, "pattern": SEED_PREFIX + "%", "items": json.dumps(ITEMS)}
+
+    print(f"seeding {users:,} users (half retailers, half mandi owners) ...", flush=True)
+    if pg:
+        conn.execute(text("""
+            INSERT INTO users (username, password_hash, role)
+            SELECT :prefix || n, '-', 'farmer' FROM generate_series(1, :n) AS n
+            ON CONFLICT (username) DO NOTHING
+        """), {**params, "n": users})
+    else:
+        conn.execute(text("""
+            WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s WHERE n < :n)
+            INSERT OR IGNORE INTO users (username, password_hash, role, token_version)
+            SELECT :prefix || n, '-', 'farmer', 0 FROM s
+        """), {**params, "n": users})
+    ignore, conflict = ("", "ON CONFLICT (user_id) DO NOTHING") if pg else ("OR IGNORE", "")
+    for owner_table, parity in (("retailer", 0), ("mandi_owners", 1)):
+        conn.execute(text(f"""
+            INSERT {ignore} INTO {owner_table} (user_id)
+            SELECT id FROM users WHERE username LIKE :pattern AND id % 2 = {parity} {conflict}
+        """), params)
+
+    for table, column, owner_table in (("mandi_farmer_orders", "mandi_owner_id", "mandi_owners"),
+                                       ("retailer_mandi_order", "retailer_id", "retailer")):
+        print(f"seeding {rows:,} rows into {table} ...", flush=True)
+        owners = f"""
+            owners AS (
+                SELECT p.id, row_number() OVER (ORDER BY p.id) - 1 AS rn, count(*) OVER () AS total
+                FROM {owner_table} p JOIN users u ON u.id = p.user_id WHERE u.username LIKE :pattern
+            )"""
+        if pg:
+            conn.execute(text(f"""
+                WITH {owners}
+                INSERT INTO {table} ({column}, src_lat, src_long, dest_lat, dest_long, item, start_time,
+                                     price_per_kg, order_date)
+                SELECT owners.id, 8 + random() * 24, 68 + random() * 22, 8 + random() * 24, 68 + random() * 22,
+                       (CAST(:items AS jsonb) ->> floor(random() * {len(ITEMS)})::int),
+                       now() - random() * interval '730 days',
+                       round(CAST(10 + random() * 90 AS numeric), 2),
+                       current_date - floor(random() * 730)::int
+                FROM generate_series(1, :n) AS s(n)
+                JOIN owners ON owners.rn = s.n % owners.total
+            """), {**params, "n": rows})
+        else:
+            conn.execute(text(f"""
+                WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s WHERE n < :n), {owners}
+                INSERT INTO {table} ({column}, src_lat, src_long, dest_lat, dest_long, item, start_time,
+                                     price_per_kg, order_date)
+                SELECT owners.id, 8 + abs(random() % 24000) / 1000.0, 68 + abs(random() % 22000) / 1000.0,
+                       8 + abs(random() % 24000) / 1000.0, 68 + abs(random() % 22000) / 1000.0,
+                       json_extract(:items, '$[' || abs(random() % {len(ITEMS)}) || ']'),
+                       datetime('now', '-' || abs(random() % 63072000) || ' seconds'),
+                       round(10 + abs(random() % 9000) / 100.0, 2),
+                       date('now', '-' || abs(random() % 730) || ' days')
+                FROM s JOIN owners ON owners.rn = s.n % owners.total
+            """), {**params, "n": rows})
+
+    print(f"seeding {alerts_per_user} alerts per seeded user ...", flush=True)
+    if pg:
+        conn.execute(text("""
+            INSERT INTO alerts (user_id, message, seen, created_at)
+            SELECT u.id, 'seeded alert ' || k, random() < 0.5, now() - random() * interval '730 days'
+            FROM users u CROSS JOIN generate_series(1, :k) AS k
+            WHERE u.username LIKE :pattern
+        """), {**params, "k": alerts_per_user})
+    else:
+        conn.execute(text("""
+            WITH RECURSIVE s(k) AS (SELECT 1 UNION ALL SELECT k + 1 FROM s WHERE k < :k)
+            INSERT INTO alerts (user_id, message, seen, created_at)
+            SELECT u.id, 'seeded alert ' || s.k, abs(random() % 2),
+                   datetime('now', '-' || abs(random() % 63072000) || ' seconds')
+            FROM users u CROSS JOIN s
+            WHERE u.username LIKE :pattern
+        """), {**params, "k": alerts_per_user})
+    print("rebuilding daily_item_stats ...", flush=True)
+    with Session(bind=conn) as db:
+        rollup.reconcile(db)
+        price_history.refresh_from_orders(db)
+    conn.exec_driver_sql("ANALYZE")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--seed", action="store_true", help="insert synthetic rows first (scratch databases only)")
+    ap.add_argument("--rows", type=int, default=10_000_000, help="rows per order table when seeding")
+    ap.add_argument("--users", type=int, default=10_000, help="seeded users when seeding")
+    ap.add_argument("--alerts-per-user", type=int, default=100)
+    ap.add_argument("--check", action="store_true", help="exit 1 if any hot query full-scans a hot table")
+    args = ap.parse_args()
+
+    pg = engine.dialect.name == "postgresql"
+    if args.seed:
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            seed(conn, args.rows, args.users, args.alerts_per_user)
+        print(f"seeded in {time.perf_counter() - start:.0f}s\n")
+
+    with engine.connect() as conn:
+        alert_user_id = conn.execute(
+            text("SELECT user_id FROM alerts GROUP BY user_id ORDER BY count(*) DESC LIMIT 1")
+        ).scalar() or conn.execute(select(sa_func.min(User.id))).scalar() or 0
+        # Busiest owners: the worst case for per-owner queries
+        retailer = conn.execute(
+            select(Retailer.id, Retailer.user_id)
+            .join(RetailerMandiOrder, RetailerMandiOrder.retailer_id == Retailer.id)
+            .group_by(Retailer.id, Retailer.user_id).order_by(sa_func.count().desc()).limit(1)
+        ).first() or conn.execute(select(Retailer.id, Retailer.user_id).limit(1)).first()
+        mandi_owner_id = conn.execute(
+            select(MandiFarmerOrder.mandi_owner_id).where(MandiFarmerOrder.mandi_owner_id.isnot(None))
+            .group_by(MandiFarmerOrder.mandi_owner_id).order_by(sa_func.count().desc()).limit(1)
+        ).scalar() or conn.execute(select(sa_func.min(MandiOwner.id))).scalar() or 0
+        if retailer is None:
+            print("no retailers in the database; run with --seed first")
+            sys.exit(2)
+
+        regressions = []
+        for name, stmt in hot_queries(alert_user_id, retailer, mandi_owner_id).items():
+            lines, full_scans, ms = (explain_postgres if pg else explain_sqlite)(conn, stmt)
+            flag = f"  FULL SCAN: {', '.join(full_scans)}" if full_scans else ""
+            print(f"── {name}  {ms:.1f} ms{flag}")
+            for line in lines:
+                print(f"   {line}")
+            print()
+            if full_scans:
+                regressions.append(name)
+        conn.rollback()  # EXPLAIN ANALYZE executed the queries; nothing to keep
+
+    if regressions:
+        print(f"{len(regressions)} hot quer{'y' if len(regressions) == 1 else 'ies'} full-scan: {', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+    else:
+        print("all hot queries use an index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Rebuild daily_item_stats from the order tables, and optionally report drift.
+
+The server runs the same reconcile nightly (02:30 UTC) over the last
+ROLLUP_RECONCILE_DAYS days. Run this for a full rebuild (--all), after bulk
+SQL against the order tables, or with --check to compare the rollup with the
+orders without writing anything.
+
+Usage (from backend/):
+    python scripts/reconcile_rollup.py              # last ROLLUP_RECONCILE_DAYS days
+    python scripts/reconcile_rollup.py --days 7
+    python scripts/reconcile_rollup.py --all
+    python scripts/reconcile_rollup.py --all --check
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select  # noqa: E402
+
+from config import settings  # noqa: E402
+from database import SessionLocal  # noqa: E402
+from models import DailyItemStat  # noqa: E402
+import rollup  # noqa: E402
+
+
+def drift(db, since):
+    """Rows where daily_item_stats differs from the order tables, as (key, stored, expected)."""
+    stmt = select(DailyItemStat.__table__)
+    if since is not None:
+        stmt = stmt.where(DailyItemStat.day >= since)
+    stored = {tuple(r[:4]): tuple(r[4:]) for r in db.execute(stmt)}
+    expected = {}
+    for side in rollup.SIDES:
+        for by_owner in (False, True):
+            for r in db.execute(rollup.rebuild_select(side, by_owner, since)):
+                expected[tuple(r[:4])] = tuple(r[4:])
+
+    def same(a, b):
+        return a is not None and b is not None and all(
+            (x is None and y is None) or (x is not None and y is not None and abs(float(x) - float(y)) <= 1e-9 * max(1.0, abs(float(y))))
+            for x, y in zip(a, b)
+        )
+
+    return [
+        (key, stored.get(key), expected.get(key))
+        for key in sorted(stored.keys() | expected.keys(), key=str)
+        if not same(stored.get(key), expected.get(key))
+    ]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--days", type=int, default=settings.ROLLUP_RECONCILE_DAYS,
+                    help="rebuild days newer than this many days ago (0 = all)")
+    ap.add_argument("--all", action="store_true", help="rebuild every day")
+    ap.add_argument("--check", action="store_true", help="only report drift; exit 1 if any")
+    args = ap.parse_args()
+
+    days = 0 if args.all else args.days
+    since = (datetime.utcnow() - timedelta(days=days)).date() if days else None
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        if args.check:
+            rows = drift(db, since)
+            for key, stored, expected in rows[:20]:
+                print(f"  {key}: stored {stored} expected {expected}")
+            print(f"{len(rows)} drifted rows since {since or 'the beginning'} ({time.perf_counter() - start:.1f}s)")
+            sys.exit(1 if rows else 0)
+        written = rollup.reconcile(db, since)
+        print(f"rebuilt {written} rows since {since or 'the beginning'} in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -118,8 +118,19 @@ print(f"  ✅ Created: {success}  |  ❌ Failed: {failed}")
 
 # ── 5. Verify ───────────────────────────────────────────────────────────────
 print("\n=== Verification ===")
-items_resp = requests.get(f"{BASE_URL}/api/retailer/items", headers=HEADERS)
-orders_resp = requests.get(f"{BASE_URL}/api/retailer/orders", headers=HEADERS)
-print(f"Total items  in DB: {len(items_resp.json())}")
-print(f"Total orders in DB: {len(orders_resp.json())}")
+
+
+def count_all(path):
+    """Walk a paged list endpoint ({items, next_cursor}) to the end."""
+    total, params = 0, {}
+    while True:
+        page = requests.get(f"{BASE_URL}{path}", headers=HEADERS, params=params).json()
+        total += len(page["items"])
+        if not page["next_cursor"]:
+            return total
+        params = {k: v for k, v in page["next_cursor"].items() if v is not None}
+
+
+print(f"Total items  in DB: {count_all('/api/retailer/items')}")
+print(f"Total orders in DB: {count_all('/api/retailer/orders')}")
 print("\n🎉 Done! Retailer data seeded successfully.")
@@ -3,22 +3,39 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from datetime import timedelta
+from datetime import datetime, timedelta
 from typing import Optional
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
-from database import get_db, init_db, engine
-from models import User, Farmer, MandiOwner, Retailer, RetailerItem, RetailerMandiOrder, Base
-from retailer.routes import router as retailer_router
-from schemas import UserRegister, UserLogin, Token, UserResponse
-from auth import verify_password, get_password_hash, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from farmer.routes import router as farmer_router
+from database import get_db, init_db, engine, SessionLocal, pool_stats, dispose_async_engine
+from models import User, Farmer, MandiOwner, Retailer, RetailerItem, RetailerMandiOrder, Alert, Base
+from retailer.routes import router as retailer_router, async_router as retailer_async_router
+from schemas import UserRegister, UserLogin, Token, TokenRefresh, LogoutRequest, UserResponse
+from auth import (
+    Principal, create_access_token, require_role, ACCESS_TOKEN_EXPIRE_MINUTES,
+    access_token_claims, get_current_user, verify_token, deny_list, load_token_versions, revoke_user_tokens,
+    revoke_access_token, revoke_refresh_token,
+    oauth2_scheme, issue_refresh_token, rotate_refresh_token,
+)
+from cache import cache_stats
+from config import settings
+from farmer.routes import (
+    router as farmer_router, async_router as farmer_async_router, MOCK_MANDIS, CROP_PRICE_RANGES,
+)
 from retailer.agent import run_demand_agent
-from mandi.routes import router as mandi_router
+from mandi.routes import router as mandi_router, async_router as mandi_async_router
 from mandi.agent import run_mandi_agent
 from farmer.agent import run_farmer_agent
+from http_client import init_http_clients, close_http_clients
+from password_pool import password_hasher
+from geo_index import index_user_location, load_registered_locations
+from export import export_router
+import rollup
+import price_history
 
 logger = logging.getLogger("server")
 
@@ -50,6 +67,47 @@ def _scheduled_agent_job():
         logger.error(f"Farmer agent failed: {e}", exc_info=True)
 
 
+def _reconcile_rollup_job():
+    """Nightly rebuild of recent daily_item_stats days from the order tables."""
+    days = settings.ROLLUP_RECONCILE_DAYS
+    since = (datetime.utcnow() - timedelta(days=days)).date() if days else None
+    db = SessionLocal()
+    try:
+        rollup.reconcile(db, since)
+        price_history.refresh_from_orders(db, since)
+    except Exception as e:
+        logger.error(f"daily_item_stats reconcile failed: {e}", exc_info=True)
+    finally:
+        db.close()
+
+
+def _price_history_job():
+    """Hourly: recent order prices into mandi_prices, and the simulated series up to today."""
+    since = (datetime.utcnow() - timedelta(days=settings.PRICE_HISTORY_REFRESH_DAYS)).date()
+    db = SessionLocal()
+    try:
+        price_history.refresh_from_orders(db, since)
+        price_history.extend_simulated(
+            db, CROP_PRICE_RANGES, [m["name"] for m in MOCK_MANDIS], datetime.utcnow().date(),
+        )
+    except Exception as e:
+        db.rollback()
+        logger.error(f"mandi_prices refresh failed: {e}", exc_info=True)
+    finally:
+        db.close()
+
+
+def _sync_token_revocations_job():
+    """Pull logouts recorded by other workers into this worker's deny-list."""
+    db = SessionLocal()
+    try:
+        deny_list.sync(db)
+    except Exception as e:
+        logger.error(f"Token revocation sync failed: {e}", exc_info=True)
+    finally:
+        db.close()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: schedule the agent to run daily at 06:00 UTC
@@ -59,10 +117,43 @@ async def lifespan(app: FastAPI):
         id="demand_alert_agent",
         replace_existing=True,
     )
+    scheduler.add_job(
+        _reconcile_rollup_job,
+        trigger=CronTrigger(hour=2, minute=30),
+        id="rollup_reconcile",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        _price_history_job,
+        trigger=CronTrigger(minute=5),
+        id="price_history_refresh",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        _sync_token_revocations_job,
+        trigger=IntervalTrigger(seconds=settings.AUTH_REVOCATION_SYNC_SECONDS),
+        id="token_revocation_sync",
+        replace_existing=True,
+    )
     scheduler.start()
-    logger.info("✅ APScheduler started — demand agent runs daily at 06:00 UTC")
+    logger.info("✅ APScheduler started — demand agent runs daily at 06:00 UTC, rollup reconcile at 02:30 UTC")
+    await init_http_clients()
+    # Price history must cover today before the first request (first run seeds the mock mandis)
+    await run_in_threadpool(_price_history_job)
+    db = SessionLocal()
+    try:
+        load_registered_locations(db)
+        load_token_versions(db)
+    except Exception as e:
+        logger.error(f"Startup DB load failed: {e}", exc_info=True)
+    finally:
+        db.close()
     yield
     # Shutdown
+    await close_http_clients()
+    logger.info("🛑 Outbound HTTP clients closed")
+    password_hasher.shutdown()
+    await dispose_async_engine()
     scheduler.shutdown(wait=False)
     logger.info("🛑 APScheduler shut down")
 
@@ -76,6 +167,7 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-LLM-Cache"],
 )
 
 # # Initialize database tables on startup
@@ -85,6 +177,12 @@ app.add_middleware(
 #     Base.metadata.create_all(bind=engine)
 #     print("Database tables created successfully!")
 
+# Async CRUD handlers go first so they take over the matching sync paths
+if settings.DB_ASYNC_CRUD:
+    app.include_router(farmer_async_router, prefix="/api/farmer")
+    app.include_router(retailer_async_router)
+    app.include_router(mandi_async_router)
+
 # Include farmer routes
 app.include_router(farmer_router, prefix="/api/farmer")
 
@@ -99,24 +197,7 @@ def read_root():
         }
     }
 
-@app.post("/api/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
-    """
-    Register a new user with role-based profile creation
-    
-    Roles: farmer, mandi_owner, retailer, admin
-    """
-    # Check if username already exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    
-    # Hash the password
-    hashed_password = get_password_hash(user_data.password)
-    
+def _create_user(user_data: UserRegister, hashed_password: str, db: Session) -> User:
     # Create user
     new_user = User(
         username=user_data.username,
@@ -152,16 +233,44 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
         db.add(retailer_profile)
     
     db.commit()
+    index_user_location(new_user)
     
     return new_user
 
+
+def _find_user(username: str, db: Session) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
+
+
+# register / login are async so that waiting on bcrypt (password_pool) holds no
+# request thread; their DB work is handed to the threadpool explicitly.
+@app.post("/api/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+    """
+    Register a new user with role-based profile creation
+    
+    Roles: farmer, mandi_owner, retailer, admin
+    """
+    # Check if username already exists
+    existing_user = await run_in_threadpool(_find_user, user_data.username, db)
+    if existing_user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered"
+        )
+    
+    # Hash the password
+    hashed_password = await password_hasher.hash(user_data.password)
+    
+    return await run_in_threadpool(_create_user, user_data, hashed_password, db)
+
 @app.post("/api/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     """
     Login with username and password, returns JWT token with role
     """
     # Find user by username
-    user = db.query(User).filter(User.username == user_credentials.username).first()
+    user = await run_in_threadpool(_find_user, user_credentials.username, db)
     
     if not user:
         raise HTTPException(
@@ -171,35 +280,78 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
         )
     
     # Verify password
-    if not verify_password(user_credentials.password, user.password_hash):
+    if not await password_hasher.verify(user_credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    return await run_in_threadpool(_issue_tokens, user, db)
+
+
+def _issue_tokens(user: User, db: Session, refresh_token: Optional[str] = None) -> dict:
+    """Access token for `user`, plus a refresh token (a new session family unless one is passed in)."""
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={
-            "sub": user.username,
-            "user_id": user.id,
-            "role": user.role
-        },
+        data=access_token_claims(user, db),
         expires_delta=access_token_expires
     )
+    if refresh_token is None:
+        refresh_token = issue_refresh_token(user.id, db)
+        db.commit()
     
     return {
         "access_token": access_token,
         "token_type": "bearer",
         "role": user.role,
         "username": user.username,
-        "user_id": user.id
+        "user_id": user.id,
+        "refresh_token": refresh_token,
     }
 
+
+@app.post("/api/token/refresh", response_model=Token)
+def refresh_access_token(body: TokenRefresh, db: Session = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token. The refresh token is
+    rotated; replaying an old one revokes every token from that login.
+    """
+    user, new_refresh_token = rotate_refresh_token(body.refresh_token, db)
+    return _issue_tokens(user, db, refresh_token=new_refresh_token)
+
+@app.post("/api/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    body: Optional[LogoutRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Revoke the presented token, and the refresh-token session of `refresh_token` if sent"""
+    payload = verify_token(token)
+    if body is not None and body.refresh_token:
+        revoke_refresh_token(body.refresh_token, current_user.id, db)  # committed below
+    if payload.get("jti"):
+        revoke_access_token(payload, db)
+    else:
+        # Tokens issued before jti existed can only be revoked all at once
+        revoke_user_tokens(current_user.id, db)
+
+
+@app.post("/api/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+def logout_all(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Revoke every access and refresh token issued to the current user"""
+    revoke_user_tokens(current_user.id, db)
+
 # Register routes
 app.include_router(retailer_router)
 app.include_router(mandi_router)
+# Any user's own alerts (the agents write them for every role)
+app.include_router(export_router(
+    path="/api/alerts/export", model=Alert, name="alerts",
+    owner_column="user_id", owner_id=lambda user: user.id, date_column="created_at",
+), tags=["Alerts"])
 
 @app.get("/api/health")
 def health_check():
@@ -207,6 +359,24 @@ def health_check():
     return {"status": "healthy", "service": "Supply Chain API"}
 
 
+@app.get("/api/admin/cache-stats", tags=["Admin"])
+def get_cache_stats(current_user: Principal = Depends(require_role("admin"))):
+    """Hit/miss counters for every in-process cache (weather, ...)."""
+    return cache_stats()
+
+
+@app.get("/api/admin/db-pool", tags=["Admin"])
+def get_db_pool_stats(current_user: Principal = Depends(require_role("admin"))):
+    """Connection pool checkouts, overflow and checkout wait times."""
+    return pool_stats()
+
+
+@app.get("/api/admin/password-pool", tags=["Admin"])
+def get_password_pool_stats(current_user: Principal = Depends(require_role("admin"))):
+    """Queue depth and wait/run percentiles for the bcrypt worker pool."""
+    return password_hasher.stats()
+
+
 @app.post("/api/agent/run", tags=["Agent"])
 def trigger_agent_manually():
     """Manually trigger the demand-alert agent (for testing)."""
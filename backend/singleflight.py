@@ -0,0 +1,52 @@
+"""
+Request coalescing ("single-flight") for outbound lookups.
+
+Concurrent calls with the same key share one in-flight task instead of each
+starting its own network call. Late arrivals simply await the leader's result
+(or its exception). The shared task is shielded, so a caller that gives up —
+e.g. a fan-out hitting its deadline — does not cancel it for everyone else.
+
+Usage:
+    market_flight = SingleFlight("market_info")
+    result = await market_flight.do(("tomato", "karnataka"), lambda: _fetch(...))
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger("singleflight")
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.calls = 0
+        self.collapsed = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t, k=key: self._finish(k))
+        else:
+            self.collapsed += 1
+            self._waiters[key] += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable):
+        self._inflight.pop(key, None)
+        waiters = self._waiters.pop(key, 0)
+        if waiters:
+            logger.info(
+                f"single-flight '{self.name}': collapsed {waiters} duplicate call(s) for {key!r} "
+                f"(total collapsed {self.collapsed}/{self.calls})"
+            )
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "collapsed": self.collapsed, "in_flight": len(self._inflight)}
@@ -214,7 +214,11 @@ export default function FarmerDashboard() {
 
     const bestMandi = mandis.length ? mandis.reduce((a, b) => a.price_per_kg > b.price_per_kg ? a : b) : null
     const currentMandi = mandis[activeMandi] || null
-    const handleLogout = () => { localStorage.removeItem('token'); localStorage.removeItem('user'); navigate('/login') }
+    const handleLogout = async () => {
+        const token = localStorage.getItem('token')
+        if (token) { try { await axios.post(`${API}/api/logout`, { refresh_token: localStorage.getItem('refresh_token') }, { headers: { Authorization: `Bearer ${token}` } }) } catch { } }
+        localStorage.removeItem('token'); localStorage.removeItem('refresh_token'); localStorage.removeItem('user'); navigate('/login')
+    }
 
     // Help items
     const HELP_ITEMS = [
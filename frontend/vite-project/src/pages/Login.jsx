@@ -152,6 +152,7 @@ const Login = () => {
         try {
             const response = await api.post('/login', formData);
             localStorage.setItem('token', response.data.access_token);
+            localStorage.setItem('refresh_token', response.data.refresh_token);
             localStorage.setItem('user', JSON.stringify(response.data));
 
             // Role-based redirection to dashboards
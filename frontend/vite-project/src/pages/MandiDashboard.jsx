@@ -4,7 +4,7 @@ import { MapContainer, TileLayer, Marker, Popup, Polyline, useMap } from 'react-
 import L from 'leaflet'
 import { Chart as ChartJS, CategoryScale, LinearScale, PointElement, LineElement, BarElement, Title, Tooltip, Legend, Filler } from 'chart.js'
 import { Line, Bar as BarChart } from 'react-chartjs-2'
-import api from '../services/api'
+import api, { logout } from '../services/api'
 
 ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, BarElement, Title, Tooltip, Legend, Filler)
 
@@ -145,7 +145,7 @@ export default function MandiDashboard() {
             .then(r => setScenarioResult(r.data)).catch(() => { })
     }, [rainDays, demandSurge, transportDelay])
 
-    const handleLogout = () => { localStorage.removeItem('token'); localStorage.removeItem('user'); navigate('/login') }
+    const handleLogout = async () => { await logout(); navigate('/login') }
 
     if (loading) return <div className="min-h-screen bg-[#0a0a0a] flex items-center justify-center text-white/40"><span className="animate-spin text-3xl mr-3">⏳</span>Loading supply chain data...</div>
 
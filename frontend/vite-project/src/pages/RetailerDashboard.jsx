@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import { Link, useNavigate } from 'react-router-dom'
-import api from '../services/api'
+import api, { logout } from '../services/api'
 
 export default function RetailerDashboard() {
     const navigate = useNavigate()
@@ -29,8 +29,8 @@ export default function RetailerDashboard() {
                 api.get('/retailer/orders'),
             ])
             if (profileRes.status === 'fulfilled') setProfile(profileRes.value.data)
-            if (itemsRes.status === 'fulfilled') setItems(itemsRes.value.data)
-            if (ordersRes.status === 'fulfilled') setOrders(ordersRes.value.data)
+            if (itemsRes.status === 'fulfilled') setItems(itemsRes.value.data.items)
+            if (ordersRes.status === 'fulfilled') setOrders(ordersRes.value.data.items)
         } catch (err) {
             console.error('Failed to load data:', err)
         }
@@ -62,9 +62,8 @@ export default function RetailerDashboard() {
         }
     }
 
-    const handleLogout = () => {
-        localStorage.removeItem('token')
-        localStorage.removeItem('user')
+    const handleLogout = async () => {
+        await logout()
         navigate('/login')
     }
 
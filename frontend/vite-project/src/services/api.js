@@ -21,4 +21,73 @@ api.interceptors.request.use(
     (error) => Promise.reject(error)
 );
 
+// On a 401, trade the refresh token for a new access token once and retry.
+// Refresh tokens are single-use, so concurrent 401s must share one refresh call.
+let refreshing = null;
+
+const refreshAccessToken = () => {
+    if (!refreshing) {
+        refreshing = api
+            .post('/token/refresh', { refresh_token: localStorage.getItem('refresh_token') })
+            .then(({ data }) => {
+                localStorage.setItem('token', data.access_token);
+                localStorage.setItem('refresh_token', data.refresh_token);
+            })
+            .catch((err) => {
+                localStorage.removeItem('token');
+                localStorage.removeItem('refresh_token');
+                throw err;
+            })
+            .finally(() => {
+                refreshing = null;
+            });
+    }
+    return refreshing;
+};
+
+api.interceptors.response.use(
+    (response) => response,
+    async (error) => {
+        const original = error.config;
+        if (
+            error.response?.status !== 401 ||
+            !original ||
+            original._retried ||
+            original.url === '/token/refresh' ||
+            !localStorage.getItem('refresh_token')
+        ) {
+            return Promise.reject(error);
+        }
+        original._retried = true;
+        // Skip the refresh if another request already renewed the token meanwhile
+        const sentToken = (original.headers?.Authorization || '').replace('Bearer ', '');
+        if (sentToken === localStorage.getItem('token')) {
+            try {
+                await refreshAccessToken();
+            } catch {
+                return Promise.reject(error);
+            }
+        }
+        original.headers.Authorization = `Bearer ${localStorage.getItem('token')}`;
+        return api(original);
+    }
+);
+
+// Revoke the access token and this login's refresh token server-side, then forget them.
+// Local state is cleared even if the server can't be reached.
+export const logout = async () => {
+    const refreshToken = localStorage.getItem('refresh_token');
+    try {
+        if (localStorage.getItem('token')) {
+            await api.post('/logout', { refresh_token: refreshToken });
+        }
+    } catch (err) {
+        console.error('Logout request failed:', err);
+    } finally {
+        localStorage.removeItem('token');
+        localStorage.removeItem('refresh_token');
+        localStorage.removeItem('user');
+    }
+};
+
 export default api;